@@ -0,0 +1,110 @@
+"""
+Async versions of the busiest task endpoints.
+
+Each view runs on the event loop and awaits the async ORM, so one server
+worker can have many of these requests waiting on PostgreSQL at once
+instead of queueing them behind Django's sync-to-async thread. The URLs
+switch to them with the ASYNC_TASK_VIEWS setting; responses are the same
+as from the sync views they extend.
+"""
+
+from asgiref.sync import sync_to_async
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.tasks.cache import aget_cached_feed, aset_cached_feed
+from apps.tasks.models import CreatedTask
+from apps.tasks.pagination import AsyncPageNumberPagination, AsyncTaskCursorPagination
+from apps.tasks.serializers import TaskCreateSerializer, TaskDetailSerializer, TaskSerializer
+from apps.tasks.views import (
+    TaskListView,
+    TasksAPIView,
+    TasksDetailAPIView,
+    conditional_feed_response,
+    create_task,
+    feed_etag,
+)
+from apps.users.utils import aget_user_from_cookie
+from trivial.views import AsyncAPIView
+
+
+class AsyncTasksAPIView(AsyncAPIView, TasksAPIView):
+    """
+    Async version of TasksAPIView.
+    """
+
+    async def get(self, request):
+        user = await aget_user_from_cookie(request=request)
+
+        if not user:
+            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        tasks = [task async for task in CreatedTask.objects.filter(creator=user).select_related('creator')]
+        serializer_class = TaskSerializer(tasks, many=True)
+        return Response({"tasks": serializer_class.data}, status=status.HTTP_200_OK)
+
+    async def post(self, request):
+        user = await aget_user_from_cookie(request=request)
+
+        if not user:
+            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        serializer_class = TaskCreateSerializer(data=request.data)
+        serializer_class.is_valid(raise_exception=True)
+        # The async ORM has no transactions; the insert and the counter
+        # bump run together in one thread hop.
+        await sync_to_async(create_task)(serializer_class, user)
+        return Response({"status": "Task created success", "task": serializer_class.data}, status=status.HTTP_201_CREATED)
+
+    async def delete(self, request):
+        user = await aget_user_from_cookie(request=request)
+
+        if not user:
+            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        task_id = request.data.get("task_id") if request.data.get("task_id") else request.query_params.get("task_id")
+        task = await CreatedTask.objects.filter(creator=user).filter(id=task_id).afirst()
+
+        if not task:
+            return Response({"status": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        await task.adelete()
+        return Response({"status": "Task deleted success"}, status=status.HTTP_204_NO_CONTENT)
+
+
+class AsyncTasksDetailAPIView(AsyncAPIView, TasksDetailAPIView):
+    """
+    Async version of TasksDetailAPIView.
+    """
+
+    async def get(self, request, task_id):
+        task = await CreatedTask.objects.filter(id=task_id).select_related('creator').afirst()
+
+        if not task:
+            return Response({"status": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        serializer_class = TaskDetailSerializer(task)
+        return Response({"task": serializer_class.data}, status=status.HTTP_200_OK)
+
+
+class AsyncTaskListView(AsyncAPIView, TaskListView):
+    """
+    Async version of TaskListView, with the same response cache and ETags.
+    """
+    pagination_class = AsyncPageNumberPagination
+    cursor_pagination_class = AsyncTaskCursorPagination
+
+    async def get(self, request, *args, **kwargs):
+        key, cached = await aget_cached_feed(request)
+        if cached is None:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = await self.paginator.apaginate_queryset(queryset, request, view=self)
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+            etag = feed_etag(response.data)
+            await aset_cached_feed(key, response.data, etag)
+        else:
+            data, etag = cached
+            response = Response(data)
+
+        return conditional_feed_response(request, response, etag)
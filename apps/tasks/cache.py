@@ -0,0 +1,102 @@
+"""
+Response cache for the public task feed.
+
+Entries are keyed on the feed "generation" plus the request URL, so a
+single counter bump (on any CreatedTask, TakedTask or User change)
+invalidates every cached page at once; stale entries simply age out.
+With the default local-memory backend each process has its own
+generation, so point TASK_FEED_CACHE at a shared backend when running
+several server processes.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import caches
+
+_config = getattr(settings, 'TASK_FEED_CACHE', {})
+
+GENERATION_KEY = 'tasks:feed:generation'
+TIMEOUT = _config.get('TIMEOUT', 60)
+
+
+def get_cache():
+    return caches[_config.get('ALIAS', 'default')]
+
+
+def get_feed_generation() -> int:
+    """
+    Get the current feed generation.
+    """
+    cache = get_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # add() keeps a value another process may have set meanwhile.
+        cache.add(GENERATION_KEY, 1, timeout=None)
+        generation = cache.get(GENERATION_KEY, 1)
+    return generation
+
+
+async def aget_feed_generation() -> int:
+    """
+    Async version of get_feed_generation for async views.
+    """
+    cache = get_cache()
+    generation = await cache.aget(GENERATION_KEY)
+    if generation is None:
+        await cache.aadd(GENERATION_KEY, 1, timeout=None)
+        generation = await cache.aget(GENERATION_KEY, 1)
+    return generation
+
+
+def bump_feed_generation() -> None:
+    """
+    Invalidate every cached feed page.
+    """
+    cache = get_cache()
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        cache.set(GENERATION_KEY, 2, timeout=None)
+
+
+def _request_digest(request) -> str:
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = f"{request.build_absolute_uri(request.path)}|{params}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def feed_cache_key(request) -> str:
+    """
+    Build the cache key for a feed request.
+
+    The key covers the generation, the absolute path (pagination links are
+    absolute) and the query params in a stable order.
+    """
+    return f"tasks:feed:{get_feed_generation()}:{_request_digest(request)}"
+
+
+def get_cached_feed(request):
+    """
+    Returns:
+        tuple: (key, (data, etag) or None)
+    """
+    key = feed_cache_key(request)
+    return key, get_cache().get(key)
+
+
+def set_cached_feed(key, data, etag) -> None:
+    get_cache().set(key, (data, etag), timeout=TIMEOUT)
+
+
+async def aget_cached_feed(request):
+    """
+    Async version of get_cached_feed. The cache is only reached through
+    the async cache API, so a Redis round trip never blocks the event loop.
+    """
+    key = f"tasks:feed:{await aget_feed_generation()}:{_request_digest(request)}"
+    return key, await get_cache().aget(key)
+
+
+async def aset_cached_feed(key, data, etag) -> None:
+    await get_cache().aset(key, (data, etag), timeout=TIMEOUT)
@@ -0,0 +1,71 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from apps.tasks.cache import bump_feed_generation
+from apps.tasks.models import CreatedTask
+
+
+def expire_batch(now, batch_size):
+    """
+    Mark one batch of expired open tasks as completed.
+
+    The rows are picked through created_tasks_open_expires_idx and locked
+    with SKIP LOCKED, so rows held by a concurrent close or a second sweeper
+    are left for the next batch instead of being waited on.
+
+    Args:
+        now (datetime): Tasks expiring at or before this moment are closed.
+        batch_size (int): Maximum number of tasks to close.
+
+    Returns:
+        int: The number of tasks closed.
+    """
+    with transaction.atomic():
+        ids = list(
+            CreatedTask.objects.filter(is_completed=False, expires_at__lte=now)
+            .order_by('expires_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+        return CreatedTask.objects.filter(id__in=ids).update(is_completed=True)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mark open tasks whose expires_at has passed as completed. Tasks are "
+        "closed in small batches, one short transaction each, so the sweep "
+        "never holds many row locks at once. Use --loop to keep sweeping."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Tasks closed per transaction")
+        parser.add_argument('--loop', action='store_true', help="Keep sweeping until interrupted")
+        parser.add_argument('--interval', type=float, default=60, help="Seconds between sweeps with --loop")
+
+    def handle(self, *args, **options):
+        while True:
+            expired = self.sweep(options['batch_size'])
+            if expired or options['verbosity'] > 1:
+                self.stdout.write(self.style.SUCCESS(f"{expired} expired tasks closed"))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def sweep(self, batch_size):
+        now = timezone.now()
+        expired = 0
+        try:
+            while True:
+                closed = expire_batch(now, batch_size)
+                expired += closed
+                if closed < batch_size:
+                    return expired
+        finally:
+            # update() sends no post_save, so drop the cached feed pages here.
+            if expired:
+                bump_feed_generation()
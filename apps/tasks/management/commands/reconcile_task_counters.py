@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Max, Min, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from apps.tasks.cache import bump_feed_generation
+from apps.tasks.models import CreatedTask, TakedTask
+from apps.users.models import User
+
+
+def count_per_user(queryset, user_field):
+    """
+    Correlated subquery counting the rows of queryset that belong to the outer user.
+    """
+    counts = (
+        queryset.filter(**{user_field: OuterRef('pk')})
+        .order_by()
+        .values(user_field)
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute users.created_tasks from the created_tasks table, and with "
+        "--include-completed users.completed_tasks from the closed taked_tasks "
+        "rows. Only counters that differ are rewritten, one id range per "
+        "transaction."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help="Users per UPDATE statement")
+        parser.add_argument(
+            '--only',
+            choices=['created', 'completed'],
+            help="Reconcile only one of the two counters",
+        )
+        parser.add_argument(
+            '--include-completed',
+            action='store_true',
+            help=(
+                "Also recompute completed_tasks. Closes made before migration 0009 "
+                "deleted their taked_tasks row, so for users who finished tasks "
+                "back then this LOWERS the counter and the lost completions cannot "
+                "be recovered. Run with --dry-run first."
+            ),
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Report mismatches without writing")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        counters = {
+            'created': ('created_tasks', count_per_user(CreatedTask.objects.all(), 'creator')),
+            'completed': ('completed_tasks', count_per_user(TakedTask.objects.filter(closed_at__isnull=False), 'executor')),
+        }
+        if options['only'] == 'completed' and not options['include_completed']:
+            raise CommandError("--only completed needs --include-completed, see --help")
+        if options['only']:
+            counters = {options['only']: counters[options['only']]}
+        elif not options['include_completed']:
+            del counters['completed']
+
+        bounds = User.objects.aggregate(low=Min('pk'), high=Max('pk'))
+        if bounds['low'] is None:
+            self.stdout.write("No users to reconcile.")
+            return
+
+        fixed = {name: 0 for name in counters}
+        for start in range(bounds['low'], bounds['high'] + 1, batch_size):
+            users = User.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+            with transaction.atomic():
+                for name, (field, expected) in counters.items():
+                    stale = users.exclude(**{field: expected})
+                    if options['dry_run']:
+                        fixed[name] += stale.count()
+                    else:
+                        fixed[name] += stale.update(**{field: expected})
+
+        # update() sends no post_save; feed pages embed the creators' profiles.
+        if not options['dry_run'] and any(fixed.values()):
+            bump_feed_generation()
+
+        verb = "would be fixed" if options['dry_run'] else "fixed"
+        for name, total in fixed.items():
+            self.stdout.write(self.style.SUCCESS(f"{name}_tasks: {total} counters {verb}"))
@@ -0,0 +1,100 @@
+from django.db import connections, models, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from apps.tasks.cache import bump_feed_generation
+
+
+class CreatedTaskManager(models.Manager):
+    def get_queryset(self):
+        """
+        Leave out search_vector, which only TaskSearchView filters and ranks
+        on. Filters and annotations can still use it; only loading it into
+        instances is skipped, so list and detail queries don't drag the
+        tsvector of every row over the wire.
+        """
+        return super().get_queryset().defer("search_vector")
+
+
+class TakedTaskManager(models.Manager):
+    def claim(self, task_id, executor):
+        """
+        Atomically assign an open task to an executor.
+
+        Runs a single INSERT ... SELECT ... ON CONFLICT DO NOTHING against the
+        unique constraint on taked_tasks.task_id, so concurrent claims for the
+        same task cannot both succeed and no row lock is held across round trips.
+
+        Args:
+            task_id (int): The ID of the task to claim.
+            executor (User): The user taking the task.
+
+        Returns:
+            int: The ID of the new TakedTask, or None if the task does not
+            exist, is completed or has already been taken.
+        """
+        taked_table = self.model._meta.db_table
+        task_table = self.model._meta.get_field("task").related_model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                INSERT INTO {taked_table} (task_id, executor_id, closed_at)
+                SELECT id, %s, NULL FROM {task_table}
+                WHERE id = %s AND NOT is_completed
+                ON CONFLICT (task_id) DO NOTHING
+                RETURNING id
+                """,
+                [executor.pk, task_id],
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    def close_many(self, ids, executor):
+        """
+        Close many taken tasks of one executor at once.
+
+        Has the effect of TakedTask.close on each of them, in one transaction
+        and a fixed number of queries: the open rows are locked and stamped,
+        their tasks marked completed, and the executor's completed_tasks
+        counter bumped once by the number of tasks they finished. Ids that
+        do not exist, are already closed or were taken by somebody else are
+        skipped, so repeating a call is safe.
+
+        Every row is locked before it is written, table by table (taken
+        tasks, tasks, users) and in id order within a table, the same order
+        TakedTask.close uses, so overlapping closes wait for each other
+        instead of deadlocking.
+
+        Args:
+            ids (list): IDs of TakedTask rows.
+            executor (User): The user closing them; only their takes close.
+
+        Returns:
+            list: The IDs of the rows closed by this call.
+        """
+        task_model = self.model._meta.get_field("task").related_model
+        user_model = self.model._meta.get_field("executor").related_model
+
+        with transaction.atomic(using=self.db):
+            rows = list(
+                self.select_for_update()
+                .filter(id__in=ids, executor=executor, closed_at__isnull=True)
+                .order_by("id")
+                .values_list("id", "task_id")
+            )
+            if not rows:
+                return []
+
+            closed_ids = [row[0] for row in rows]
+            task_ids = [row[1] for row in rows]
+            list(task_model.objects.select_for_update().filter(id__in=task_ids).order_by("id").values_list("id"))
+            list(user_model.objects.select_for_update().filter(pk=executor.pk).values_list("id"))
+
+            self.filter(id__in=closed_ids).update(closed_at=timezone.now())
+            task_model.objects.filter(id__in=task_ids).update(is_completed=True)
+            user_model.objects.filter(pk=executor.pk).update(completed_tasks=F("completed_tasks") + len(rows))
+
+        # update() sends no post_save, so drop the cached feed pages here.
+        bump_feed_generation()
+        return closed_ids
@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 19:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0005_rename_created_task_takedtask_task'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=models.Index(fields=['-created_at', 'id'], name='created_tasks_created_id_idx'),
+        ),
+    ]
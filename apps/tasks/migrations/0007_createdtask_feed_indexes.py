@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 19:55
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0006_createdtask_created_tasks_created_id_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['-created_at'], name='created_tasks_open_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['category', '-created_at'], name='created_tasks_open_cat_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=models.Index(fields=['creator', '-created_at'], name='created_tasks_creator_idx'),
+        ),
+        # Drop the plain creator_id index only once the composite one exists.
+        migrations.AlterField(
+            model_name='createdtask',
+            name='creator',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='tasks', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
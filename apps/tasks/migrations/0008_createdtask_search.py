@@ -0,0 +1,56 @@
+# Generated by Django 5.2 on 2026-10-18 19:57
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+SEARCH_VECTOR_TRIGGER = """
+CREATE FUNCTION created_tasks_search_vector_update() RETURNS trigger AS $$
+BEGIN
+    NEW.search_vector :=
+        setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(NEW.description, '')), 'B');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER created_tasks_search_vector_update
+    BEFORE INSERT OR UPDATE OF title, description ON created_tasks
+    FOR EACH ROW EXECUTE FUNCTION created_tasks_search_vector_update();
+
+UPDATE created_tasks SET title = title;
+"""
+
+DROP_SEARCH_VECTOR_TRIGGER = """
+DROP TRIGGER IF EXISTS created_tasks_search_vector_update ON created_tasks;
+DROP FUNCTION IF EXISTS created_tasks_search_vector_update();
+"""
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0007_createdtask_feed_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddField(
+            model_name='createdtask',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        # Fills search_vector for existing rows too (UPDATE ... SET title = title).
+        migrations.RunSQL(SEARCH_VECTOR_TRIGGER, DROP_SEARCH_VECTOR_TRIGGER),
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='created_tasks_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['title'], name='created_tasks_title_trgm_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0008_createdtask_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='takedtask',
+            name='closed_at',
+            field=models.DateTimeField(blank=True, default=None, null=True),
+        ),
+    ]
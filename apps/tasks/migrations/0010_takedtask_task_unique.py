@@ -0,0 +1,34 @@
+# Generated by Django 5.2 on 2026-10-18 20:00
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def delete_duplicate_claims(apps, schema_editor):
+    """
+    Keep only the earliest claim of every task so the unique constraint can be added.
+    """
+    TakedTask = apps.get_model('tasks', 'TakedTask')
+    first_claims = (
+        TakedTask.objects.values('task_id')
+        .annotate(first_id=Min('id'))
+        .values_list('first_id', flat=True)
+    )
+    TakedTask.objects.exclude(id__in=list(first_claims)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_takedtask_closed_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_claims, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='takedtask',
+            constraint=models.UniqueConstraint(fields=('task',), name='taked_tasks_task_unique'),
+        ),
+    ]
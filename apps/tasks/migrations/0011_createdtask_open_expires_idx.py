@@ -0,0 +1,19 @@
+# Generated by Django 5.2 on 2026-10-18 20:02
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0010_takedtask_task_unique'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='createdtask',
+            index=models.Index(condition=models.Q(('is_completed', False)), fields=['expires_at'], name='created_tasks_open_expires_idx'),
+        ),
+    ]
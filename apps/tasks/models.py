@@ -1,6 +1,10 @@
-from datetime import datetime
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, transaction
+from django.db.models import F, Q
+from django.utils import timezone
 
+from apps.tasks.managers import CreatedTaskManager, TakedTaskManager
 from apps.users.models import User
 
 class CreatedTask(models.Model):
@@ -20,18 +24,44 @@ class CreatedTask(models.Model):
     expires_at = models.DateTimeField()
     category = models.CharField(max_length=20, choices=CATEGORIES, default="OTHER")
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Weighted title + description vector, kept up to date by the
+    # created_tasks_search_vector_update trigger (see migration 0008).
+    search_vector = SearchVectorField(null=True, editable=False)
     
-    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks")
+    # Indexed by created_tasks_creator_idx, which leads with creator_id.
+    creator = models.ForeignKey(User, on_delete=models.CASCADE, related_name="tasks", db_index=False)
+
+    objects = CreatedTaskManager()
     
     class Meta:
         db_table = "created_tasks"
         ordering = ["-created_at"]
-        
-    def save(self, *args, **kwargs):
-        if self.expires_at == datetime.now():
-            self.is_completed = True
-        return super(CreatedTask, self).save(*args, **kwargs)
-    
+        indexes = [
+            # Serves the cursor-paginated task feed, see TaskCursorPagination.
+            models.Index(fields=["-created_at", "id"], name="created_tasks_created_id_idx"),
+            # The feed is almost always filtered to open tasks, optionally by category.
+            models.Index(
+                fields=["-created_at"],
+                condition=Q(is_completed=False),
+                name="created_tasks_open_idx",
+            ),
+            models.Index(
+                fields=["category", "-created_at"],
+                condition=Q(is_completed=False),
+                name="created_tasks_open_cat_idx",
+            ),
+            # Open tasks past their deadline, swept by the expire_tasks command.
+            models.Index(
+                fields=["expires_at"],
+                condition=Q(is_completed=False),
+                name="created_tasks_open_expires_idx",
+            ),
+            # A user's own tasks, newest first (TasksAPIView.get).
+            models.Index(fields=["creator", "-created_at"], name="created_tasks_creator_idx"),
+            # Full-text search and the trigram fallback for typos (TaskSearchView).
+            GinIndex(fields=["search_vector"], name="created_tasks_search_idx"),
+            GinIndex(fields=["title"], name="created_tasks_title_trgm_idx", opclasses=["gin_trgm_ops"]),
+        ]
 
     def __str__(self):
         """
@@ -46,9 +76,18 @@ class TakedTask(models.Model):
     id = models.AutoField(primary_key=True)
     task = models.ForeignKey(CreatedTask, on_delete=models.CASCADE, related_name="taked_tasks")
     executor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="assigned_tasks")
+    # Set when the task is closed; closed rows are kept so the executors'
+    # completed_tasks counters can be recomputed from them.
+    closed_at = models.DateTimeField(null=True, blank=True, default=None)
+
+    objects = TakedTaskManager()
     
     class Meta:
         db_table = "taked_tasks"
+        constraints = [
+            # A task has at most one executor; TakedTaskManager.claim relies on it.
+            models.UniqueConstraint(fields=["task"], name="taked_tasks_task_unique"),
+        ]
 
     def __str__(self):
         return str(self.task)
@@ -56,9 +95,18 @@ class TakedTask(models.Model):
     def close(self):
         """
         Close task.
+
+        Marks the task completed and bumps the executor's completed_tasks
+        counter in one transaction. The conditional update makes closing
+        idempotent, so concurrent closes count only once.
         """
-        self.task.is_completed = True
-        self.task.save()
-        self.delete()
+        with transaction.atomic():
+            closed = TakedTask.objects.filter(pk=self.pk, closed_at__isnull=True).update(closed_at=timezone.now())
+            if not closed:
+                return "already closed"
+
+            self.task.is_completed = True
+            self.task.save(update_fields=["is_completed"])
+            User.objects.filter(pk=self.executor_id).update(completed_tasks=F("completed_tasks") + 1)
         return "success"
     
@@ -2,9 +2,13 @@ from rest_framework import serializers
 
 from apps.tasks.models import CreatedTask
 from apps.users.serializers import UserProfileSerializer
+from trivial.metrics import TimedSerializerMixin
 
+# Largest number of tasks one bulk create or bulk close request may carry.
+BULK_MAX_TASKS = 500
 
-class TaskSerializer(serializers.ModelSerializer):
+
+class TaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for CreatedTask model.
     """
@@ -15,15 +19,25 @@ class TaskSerializer(serializers.ModelSerializer):
         fields = ['id','title', 'description', 'is_completed', 'expires_at', 'category', 'price', 'creator']
     
     
-class TaskCreateSerializer(serializers.ModelSerializer):
+class TaskCreateListSerializer(serializers.ListSerializer):
+    """
+    Creates the tasks of a bulk request with a single bulk_create.
+    """
+
+    def create(self, validated_data):
+        return CreatedTask.objects.bulk_create([CreatedTask(**attrs) for attrs in validated_data])
+
+
+class TaskCreateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for creating a new CreatedTask.
     """
     class Meta:
         model = CreatedTask
         fields = ['title', 'description', 'category', 'price', 'expires_at']
+        list_serializer_class = TaskCreateListSerializer
         
-class TaskDetailSerializer(serializers.ModelSerializer):
+class TaskDetailSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for a detailed view of a CreatedTask.
     """
@@ -32,10 +46,17 @@ class TaskDetailSerializer(serializers.ModelSerializer):
         model = CreatedTask
         fields = ['id', 'title', 'description', 'is_completed', 'created_at' ,'expires_at', 'category', 'price', 'creator']
 
-class TakeTaskSerializer(serializers.ModelSerializer):
+class TakeTaskSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for taking a task.
     """
     class Meta:
         model = CreatedTask
         fields = ['id']
+
+
+class BulkCloseSerializer(serializers.Serializer):
+    """
+    Serializer for closing many taken tasks at once.
+    """
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False, max_length=BULK_MAX_TASKS)
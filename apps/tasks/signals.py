@@ -0,0 +1,24 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.tasks.cache import bump_feed_generation
+from apps.tasks.models import CreatedTask, TakedTask
+from apps.users.models import User
+
+
+@receiver(post_save, sender=CreatedTask)
+@receiver(post_delete, sender=CreatedTask)
+@receiver(post_save, sender=TakedTask)
+@receiver(post_delete, sender=TakedTask)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_task_feed(sender, **kwargs):
+    """
+    Invalidate cached feed pages; tasks embed their creator's profile.
+
+    The bump waits for the commit: a feed request served between the save
+    and the commit would otherwise cache the old rows under the new
+    generation and keep serving them until the page times out.
+    """
+    transaction.on_commit(bump_feed_generation)
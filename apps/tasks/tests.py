@@ -1,3 +1,788 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
 
-# Create your tests here.
+import json
+
+import jwt
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.tasks.async_views import AsyncTaskListView, AsyncTasksAPIView, AsyncTasksDetailAPIView
+from apps.tasks.cache import GENERATION_KEY, get_feed_generation
+from apps.tasks.models import CreatedTask, TakedTask
+from apps.users.authentication import token_cache, user_cache
+from apps.users.models import User
+
+
+def create_user(email, name):
+    user = User(email=email, name=name, is_verified=True)
+    user.set_password('password')
+    user.save()
+    return user
+
+
+def create_tasks(creator, count):
+    return CreatedTask.objects.bulk_create([
+        CreatedTask(
+            title=f"Task {i}",
+            description="Description",
+            category="web",
+            price=10,
+            expires_at=timezone.now() + timedelta(days=1),
+            creator=creator,
+        )
+        for i in range(count)
+    ])
+
+
+class TaskQueryBudgetTests(TestCase):
+    """
+    Every task endpoint must run a fixed number of queries, no matter how
+    many tasks (and task creators) it returns.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        self.user = create_user('me@trivial.test', 'me')
+        token = jwt.encode({'id': self.user.id}, 'secret', algorithm='HS256')
+        self.client.cookies['jwt'] = token
+
+    def create_tasks_by_many_creators(self, count):
+        tasks = []
+        for i in range(count):
+            creator = create_user(f'creator{i}@trivial.test', f'creator{i}')
+            tasks.extend(create_tasks(creator, 1))
+        return tasks
+
+    def assert_budget(self, url, budget):
+        # The first request warms the per-process auth cache; the feed
+        # response cache is cleared so the queries are actually run.
+        self.client.get(url)
+        cache.clear()
+        with self.assertNumQueries(budget):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_task_list_budget(self):
+        self.create_tasks_by_many_creators(10)
+
+        # COUNT(*) for the page number paginator + one page of tasks.
+        response = self.assert_budget('/api/v1/tasks/', 2)
+        self.assertEqual(len(response.json()['results']), 10)
+
+    def test_task_list_cursor_budget(self):
+        self.create_tasks_by_many_creators(15)
+
+        # No COUNT(*): one page of tasks only.
+        response = self.assert_budget('/api/v1/tasks/?pagination=cursor', 1)
+        page = response.json()
+        self.assertEqual(len(page['results']), 10)
+
+        cache.clear()
+        with self.assertNumQueries(1):
+            response = self.client.get(page['next'])
+        self.assertEqual(len(response.json()['results']), 5)
+
+    def test_my_tasks_budget(self):
+        create_tasks(self.user, 15)
+
+        response = self.assert_budget('/api/v1/me/tasks/', 1)
+        self.assertEqual(len(response.json()['tasks']), 15)
+
+    def test_taken_tasks_budget(self):
+        tasks = self.create_tasks_by_many_creators(10)
+        TakedTask.objects.bulk_create([TakedTask(task=task, executor=self.user) for task in tasks])
+
+        response = self.assert_budget('/api/v1/me/taken-tasks/', 1)
+        self.assertEqual({task['id'] for task in response.json()['taken_tasks']}, {task.id for task in tasks})
+
+    def test_task_detail_budget(self):
+        task = self.create_tasks_by_many_creators(1)[0]
+
+        self.assert_budget(f'/api/v1/tasks/{task.id}/', 1)
+
+    def test_task_queries_skip_search_vector(self):
+        task = self.create_tasks_by_many_creators(1)[0]
+        create_tasks(self.user, 1)
+
+        for url in ['/api/v1/tasks/', f'/api/v1/tasks/{task.id}/', '/api/v1/me/tasks/']:
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse([query['sql'] for query in queries if 'search_vector' in query['sql']], url)
+
+
+class TaskFeedCacheTests(TestCase):
+    """
+    The public feed is served from the response cache until tasks change.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.creator = create_user('creator@trivial.test', 'creator')
+        create_tasks(self.creator, 3)
+
+    def test_cached_page_costs_no_queries(self):
+        first = self.client.get('/api/v1/tasks/')
+
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/v1/tasks/')
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_if_none_match_returns_304(self):
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_task_changes_invalidate_cache(self):
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+
+        task = CreatedTask.objects.first()
+        task.title = 'Renamed'
+        with self.captureOnCommitCallbacks(execute=True):
+            task.save()
+
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Renamed', [task['title'] for task in response.json()['results']])
+
+    def test_cache_is_invalidated_only_on_commit(self):
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+        generation = cache.get(GENERATION_KEY)
+
+        task = CreatedTask.objects.first()
+        task.title = 'Renamed'
+        with self.captureOnCommitCallbacks() as callbacks:
+            task.save()
+            # Before the commit the cached page is still the current one.
+            self.assertEqual(cache.get(GENERATION_KEY), generation)
+            self.assertEqual(self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        for callback in callbacks:
+            callback()
+        self.assertGreater(cache.get(GENERATION_KEY), generation)
+
+    def test_filters_are_cached_separately(self):
+        self.client.get('/api/v1/tasks/')
+
+        response = self.client.get('/api/v1/tasks/?category=design')
+        self.assertEqual(response.json()['count'], 0)
+
+
+class TaskClaimTests(TestCase):
+    """
+    Taking a task is a single conditional insert guarded by a unique constraint.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.creator = create_user('creator@trivial.test', 'creator')
+        self.executor = create_user('executor@trivial.test', 'executor')
+        self.task = create_tasks(self.creator, 1)[0]
+        self.client.cookies['jwt'] = jwt.encode({'id': self.executor.id}, 'secret', algorithm='HS256')
+
+    def test_claim_creates_taken_task(self):
+        response = self.client.post(f'/api/v1/take-task/{self.task.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        taked_task = TakedTask.objects.get(task=self.task)
+        self.assertEqual(taked_task.id, response.json()['taked_task_id'])
+        self.assertEqual(taked_task.executor, self.executor)
+
+    def test_second_claim_conflicts(self):
+        self.client.post(f'/api/v1/take-task/{self.task.id}/')
+
+        response = self.client.post(f'/api/v1/take-task/{self.task.id}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(TakedTask.objects.filter(task=self.task).count(), 1)
+
+    def test_completed_task_cannot_be_claimed(self):
+        CreatedTask.objects.filter(id=self.task.id).update(is_completed=True)
+
+        response = self.client.post(f'/api/v1/take-task/{self.task.id}/')
+        self.assertEqual(response.status_code, 409)
+        self.assertFalse(TakedTask.objects.exists())
+
+    def test_missing_task_returns_404(self):
+        response = self.client.post('/api/v1/take-task/0/')
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskSearchTests(TestCase):
+    """
+    /api/v1/tasks/search/ ranks full-text matches on the search_vector kept
+    by the trigger of migration 0008, and falls back to trigram similarity
+    on the title.
+    """
+
+    def setUp(self):
+        self.user = create_user('me@trivial.test', 'me')
+
+    def create_task(self, title, description="Description", **fields):
+        fields.setdefault('category', 'web')
+        return CreatedTask.objects.create(
+            title=title,
+            description=description,
+            price=10,
+            expires_at=timezone.now() + timedelta(days=1),
+            creator=self.user,
+            **fields,
+        )
+
+    def search(self, **params):
+        response = self.client.get('/api/v1/tasks/search/', params)
+        self.assertEqual(response.status_code, 200)
+        return [task['id'] for task in response.json()['results']]
+
+    def search_vector(self, task):
+        return CreatedTask.objects.values_list('search_vector', flat=True).get(pk=task.pk)
+
+    def test_ranks_title_matches_above_description_matches(self):
+        in_description = self.create_task("Landing page", "Written in Python")
+        in_title = self.create_task("Python scraper", "Collect prices")
+        self.create_task("Logo design", "Vector logo")
+
+        self.assertEqual(self.search(q="python"), [in_title.id, in_description.id])
+
+    def test_misspelled_query_falls_back_to_trigram_match(self):
+        logo = self.create_task("Logo design", "Vector logo")
+        self.create_task("Python scraper", "Collect prices")
+
+        self.assertEqual(self.search(q="logo desing"), [logo.id])
+
+    def test_empty_query_returns_empty_page(self):
+        self.create_task("Python scraper")
+
+        response = self.client.get('/api/v1/tasks/search/', {'q': '  '})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 0)
+        self.assertEqual(response.json()['results'], [])
+
+    def test_filters_by_category_and_is_completed(self):
+        web = self.create_task("Python scraper", category='web')
+        text = self.create_task("Python tutorial", category='text')
+        done = self.create_task("Python bot", category='web', is_completed=True)
+
+        self.assertEqual(set(self.search(q="python", category='text')), {text.id})
+        self.assertEqual(set(self.search(q="python", category='web', is_completed='false')), {web.id})
+        self.assertEqual(set(self.search(q="python", is_completed='true')), {done.id})
+
+    def test_trigger_fills_search_vector_on_insert_and_update(self):
+        task = self.create_task("Python scraper", "Collect prices")
+
+        self.assertIn("'python':1A", self.search_vector(task))
+        self.assertIn("'price':4B", self.search_vector(task))
+
+        task.title = "Django scraper"
+        task.save()
+        self.assertIn("'django':1A", self.search_vector(task))
+        self.assertNotIn("python", self.search_vector(task))
+
+        CreatedTask.objects.filter(pk=task.pk).update(description="Translate documents")
+        self.assertIn("'translat':3B", self.search_vector(task))
+        self.assertEqual(self.search(q="python"), [])
+        self.assertEqual(self.search(q="translate"), [task.id])
+
+
+class TaskCounterTests(TestCase):
+    """
+    users.created_tasks and users.completed_tasks are bumped with F()
+    expressions and can be rebuilt by reconcile_task_counters.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        self.user = create_user('me@trivial.test', 'me')
+        self.creator = create_user('creator@trivial.test', 'creator')
+
+    def login(self, user):
+        self.client.cookies['jwt'] = jwt.encode({'id': user.id}, 'secret', algorithm='HS256')
+
+    def create_payload(self):
+        return {
+            'title': 'Task',
+            'description': 'Description',
+            'category': 'web',
+            'price': '10.00',
+            'expires_at': (timezone.now() + timedelta(days=1)).isoformat(),
+        }
+
+    def take(self, task, executor):
+        return TakedTask.objects.create(task=task, executor=executor)
+
+    def test_create_increments_counter_in_the_database(self):
+        # Another request bumped the counter after this user was loaded.
+        User.objects.filter(pk=self.user.pk).update(created_tasks=5)
+        self.login(self.user)
+
+        response = self.client.post('/api/v1/me/tasks/', self.create_payload(), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.created_tasks, 6)
+
+    def test_close_increments_counter_in_the_database(self):
+        taken = self.take(create_tasks(self.creator, 1)[0], self.user)
+        User.objects.filter(pk=self.user.pk).update(completed_tasks=5)
+        self.login(self.user)
+
+        response = self.client.post(f'/api/v1/tasks/close/{taken.id}/')
+
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.completed_tasks, 6)
+        self.assertTrue(CreatedTask.objects.get(pk=taken.task_id).is_completed)
+
+    def test_second_close_counts_once(self):
+        taken = self.take(create_tasks(self.creator, 1)[0], self.user)
+        # Two requests that loaded the same open row.
+        first = TakedTask.objects.get(pk=taken.pk)
+        second = TakedTask.objects.get(pk=taken.pk)
+
+        self.assertEqual(first.close(), "success")
+        self.assertEqual(second.close(), "already closed")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.completed_tasks, 1)
+
+        self.login(self.user)
+        response = self.client.post(f'/api/v1/tasks/close/{taken.id}/')
+        self.assertEqual(response.status_code, 404)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.completed_tasks, 1)
+
+    def test_only_the_executor_can_close(self):
+        taken = self.take(create_tasks(self.creator, 1)[0], self.user)
+        self.login(self.creator)
+
+        response = self.client.post(f'/api/v1/tasks/close/{taken.id}/')
+
+        self.assertEqual(response.status_code, 404)
+        self.assertIsNone(TakedTask.objects.get(pk=taken.pk).closed_at)
+        self.assertFalse(CreatedTask.objects.get(pk=taken.task_id).is_completed)
+        self.assertEqual(self.counters(self.user), (0, 0))
+
+    def test_create_and_close_require_login(self):
+        taken = self.take(create_tasks(self.creator, 1)[0], self.user)
+
+        response = self.client.post('/api/v1/me/tasks/', self.create_payload(), content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        response = self.client.post(f'/api/v1/tasks/close/{taken.id}/')
+        self.assertEqual(response.status_code, 401)
+
+        self.assertEqual(CreatedTask.objects.count(), 1)
+        self.assertIsNone(TakedTask.objects.get(pk=taken.pk).closed_at)
+
+    def create_drift(self):
+        # bulk_create and a bare update skip the counters.
+        tasks = create_tasks(self.creator, 3)
+        for task in tasks[:2]:
+            self.take(task, self.user)
+        TakedTask.objects.update(closed_at=timezone.now())
+        User.objects.filter(pk=self.user.pk).update(created_tasks=7)
+
+    def reconcile(self, **options):
+        stdout = StringIO()
+        call_command('reconcile_task_counters', stdout=stdout, **options)
+        return stdout.getvalue()
+
+    def counters(self, user):
+        return tuple(User.objects.values_list('created_tasks', 'completed_tasks').get(pk=user.pk))
+
+    def test_reconcile_repairs_created_counters_only_by_default(self):
+        self.create_drift()
+
+        output = self.reconcile(batch_size=1)
+
+        self.assertIn("created_tasks: 2 counters fixed", output)
+        self.assertNotIn("completed_tasks", output)
+        self.assertEqual(self.counters(self.creator), (3, 0))
+        self.assertEqual(self.counters(self.user), (0, 0))
+        self.assertIn("0 counters fixed", self.reconcile())
+
+    def test_reconcile_completed_counters_on_request(self):
+        self.create_drift()
+
+        output = self.reconcile(include_completed=True)
+
+        self.assertIn("created_tasks: 2 counters fixed", output)
+        self.assertIn("completed_tasks: 1 counters fixed", output)
+        self.assertEqual(self.counters(self.creator), (3, 0))
+        self.assertEqual(self.counters(self.user), (0, 2))
+
+    def test_reconcile_dry_run_writes_nothing(self):
+        self.create_drift()
+        generation = get_feed_generation()
+
+        output = self.reconcile(dry_run=True, include_completed=True)
+
+        self.assertIn("created_tasks: 2 counters would be fixed", output)
+        self.assertIn("completed_tasks: 1 counters would be fixed", output)
+        self.assertEqual(self.counters(self.creator), (0, 0))
+        self.assertEqual(self.counters(self.user), (7, 0))
+        self.assertEqual(get_feed_generation(), generation)
+
+    def test_reconcile_only_one_counter(self):
+        self.create_drift()
+
+        with self.assertRaises(CommandError):
+            self.reconcile(only='completed')
+        output = self.reconcile(only='completed', include_completed=True)
+
+        self.assertNotIn("created_tasks", output)
+        self.assertIn("completed_tasks: 1 counters fixed", output)
+        self.assertEqual(self.counters(self.creator), (0, 0))
+        self.assertEqual(self.counters(self.user), (7, 2))
+
+    def test_reconcile_invalidates_feed_cache(self):
+        self.create_drift()
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+        self.assertEqual(self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.reconcile()
+
+        self.assertEqual(self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class ExpireTasksCommandTests(TestCase):
+    """
+    expire_tasks closes open tasks past their deadline, in batches.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.creator = create_user('creator@trivial.test', 'creator')
+
+    def test_closes_only_expired_tasks(self):
+        expired = create_tasks(self.creator, 5)
+        CreatedTask.objects.filter(id__in=[task.id for task in expired]).update(
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+        fresh = create_tasks(self.creator, 2)
+
+        call_command('expire_tasks', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(CreatedTask.objects.filter(is_completed=True).count(), 5)
+        self.assertFalse(CreatedTask.objects.filter(id__in=[task.id for task in fresh], is_completed=True).exists())
+
+    def test_sweep_invalidates_feed_cache(self):
+        task = create_tasks(self.creator, 1)[0]
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+        CreatedTask.objects.filter(id=task.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        call_command('expire_tasks', stdout=StringIO())
+
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.json()['results'][0]['is_completed'])
+
+    def test_sweep_invalidates_feed_cached_in_shared_backend(self):
+        # A file based cache keeps no state in the process, like Redis: what
+        # the sweeper writes is what every other process reads.
+        location = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, location, ignore_errors=True)
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+
+        with override_settings(CACHES=shared):
+            task = create_tasks(self.creator, 1)[0]
+            etag = self.client.get('/api/v1/tasks/')['ETag']
+            other_process = FileBasedCache(location, {})
+            generation = other_process.get(GENERATION_KEY)
+            CreatedTask.objects.filter(id=task.id).update(expires_at=timezone.now() - timedelta(minutes=1))
+
+            call_command('expire_tasks', stdout=StringIO())
+
+            self.assertGreater(other_process.get(GENERATION_KEY), generation)
+            response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertTrue(response.json()['results'][0]['is_completed'])
+
+
+class AsyncTaskViewTests(TestCase):
+    """
+    The async task views answer like the sync ones, with the same query budgets.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        self.user = create_user('me@trivial.test', 'me')
+        self.factory = RequestFactory()
+        self.factory.cookies['jwt'] = jwt.encode({'id': self.user.id}, 'secret', algorithm='HS256')
+
+    def call(self, view_class, request, **kwargs):
+        response = async_to_sync(view_class.as_view())(request, **kwargs)
+        body = json.loads(response.content) if response.content else None
+        return response, body
+
+    def test_task_detail(self):
+        task = create_tasks(self.user, 1)[0]
+
+        with self.assertNumQueries(1):
+            response, body = self.call(AsyncTasksDetailAPIView, self.factory.get(f'/api/v1/tasks/{task.id}/'), task_id=task.id)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, self.client.get(f'/api/v1/tasks/{task.id}/').json())
+
+    def test_missing_task_detail_returns_404(self):
+        response, _ = self.call(AsyncTasksDetailAPIView, self.factory.get('/api/v1/tasks/0/'), task_id=0)
+        self.assertEqual(response.status_code, 404)
+
+    def test_my_tasks(self):
+        create_tasks(self.user, 15)
+        # Warm the per-process auth cache.
+        self.call(AsyncTasksAPIView, self.factory.get('/api/v1/me/tasks/'))
+
+        with self.assertNumQueries(1):
+            response, body = self.call(AsyncTasksAPIView, self.factory.get('/api/v1/me/tasks/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(body['tasks']), 15)
+
+    def test_my_tasks_requires_login(self):
+        del self.factory.cookies['jwt']
+
+        response, _ = self.call(AsyncTasksAPIView, self.factory.get('/api/v1/me/tasks/'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_create_and_delete_task(self):
+        payload = {
+            'title': 'Async task',
+            'description': 'Description',
+            'category': 'web',
+            'price': '10.00',
+            'expires_at': (timezone.now() + timedelta(days=1)).isoformat(),
+        }
+        request = self.factory.post('/api/v1/me/tasks/', payload, content_type='application/json')
+        response, body = self.call(AsyncTasksAPIView, request)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(body['task']['title'], 'Async task')
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.created_tasks, 1)
+
+        task = CreatedTask.objects.get(creator=self.user)
+        response, _ = self.call(AsyncTasksAPIView, self.factory.delete(f'/api/v1/me/tasks/?task_id={task.id}'))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(CreatedTask.objects.exists())
+
+    def test_feed_matches_sync_view(self):
+        create_tasks(self.user, 15)
+        expected = self.client.get('/api/v1/tasks/?page=2')
+        cache.clear()
+
+        with self.assertNumQueries(2):
+            response, body = self.call(AsyncTaskListView, self.factory.get('/api/v1/tasks/?page=2'))
+        self.assertEqual(body, expected.json())
+        self.assertEqual(response['ETag'], expected['ETag'])
+
+        request = self.factory.get('/api/v1/tasks/?page=2', HTTP_IF_NONE_MATCH=expected['ETag'])
+        with self.assertNumQueries(0):
+            response, _ = self.call(AsyncTaskListView, request)
+        self.assertEqual(response.status_code, 304)
+
+    def test_feed_cursor_pages(self):
+        create_tasks(self.user, 15)
+
+        with self.assertNumQueries(1):
+            _, first = self.call(AsyncTaskListView, self.factory.get('/api/v1/tasks/?pagination=cursor'))
+        self.assertEqual(len(first['results']), 10)
+
+        _, second = self.call(AsyncTaskListView, self.factory.get(first['next']))
+        self.assertEqual(len(second['results']), 5)
+        self.assertIsNone(second['next'])
+        seen = [task['id'] for task in first['results'] + second['results']]
+        self.assertEqual(sorted(seen), sorted(CreatedTask.objects.values_list('id', flat=True)))
+
+
+class RequestMetricsTests(TestCase):
+    """
+    Requests are recorded per URL pattern and exported at /metrics.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.creator = create_user('creator@trivial.test', 'creator')
+        self.task = create_tasks(self.creator, 1)[0]
+
+    def sample(self, text, name, **labels):
+        for line in text.splitlines():
+            if line.startswith(name + '{') and all(f'{key}="{value}"' in line for key, value in labels.items()):
+                return float(line.rsplit(' ', 1)[1])
+        return 0.0
+
+    def test_detail_request_is_recorded(self):
+        route = 'api/v1/tasks/<int:task_id>/'
+        before = self.client.get('/metrics').content.decode()
+
+        self.client.get(f'/api/v1/tasks/{self.task.id}/')
+
+        after = self.client.get('/metrics').content.decode()
+        count = 'trivial_http_request_duration_seconds_count'
+        self.assertEqual(
+            self.sample(after, count, route=route, status=200) - self.sample(before, count, route=route, status=200), 1
+        )
+        queries = 'trivial_http_db_queries_sum'
+        self.assertEqual(self.sample(after, queries, route=route) - self.sample(before, queries, route=route), 1)
+        serializer = 'trivial_http_serializer_duration_seconds_sum'
+        self.assertGreater(self.sample(after, serializer, route=route), self.sample(before, serializer, route=route))
+
+    def test_metrics_are_local_only(self):
+        response = self.client.get('/metrics', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 403)
+
+
+class BulkTaskTests(TestCase):
+    """
+    Bulk create and bulk close do the work of many single calls in a fixed number of queries.
+    """
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        user_cache.clear()
+        self.user = create_user('me@trivial.test', 'me')
+        self.client.cookies['jwt'] = jwt.encode({'id': self.user.id}, 'secret', algorithm='HS256')
+
+    def payload(self, count):
+        return [
+            {
+                'title': f'Bulk {i}',
+                'description': 'Description',
+                'category': 'web',
+                'price': '10.00',
+                'expires_at': (timezone.now() + timedelta(days=1)).isoformat(),
+            }
+            for i in range(count)
+        ]
+
+    def test_bulk_create_uses_one_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/v1/me/tasks/bulk/', self.payload(20), content_type='application/json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['ids']), 20)
+        self.assertEqual(CreatedTask.objects.filter(creator=self.user).count(), 20)
+        inserts = [query for query in queries.captured_queries if query['sql'].startswith('INSERT INTO "created_tasks"')]
+        self.assertEqual(len(inserts), 1)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.created_tasks, 20)
+
+    def test_bulk_create_rejects_all_if_one_is_invalid(self):
+        payload = self.payload(3)
+        payload[1]['price'] = 'free'
+
+        response = self.client.post('/api/v1/me/tasks/bulk/', payload, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()
+        self.assertIsInstance(errors, list)
+        self.assertEqual(len(errors), 3)
+        self.assertEqual(errors[0], {})
+        self.assertEqual(list(errors[1]), ['price'])
+        self.assertEqual(errors[2], {})
+        self.assertFalse(CreatedTask.objects.exists())
+
+    def test_bulk_create_invalidates_feed_cache(self):
+        etag = self.client.get('/api/v1/tasks/')['ETag']
+
+        self.client.post('/api/v1/me/tasks/bulk/', self.payload(2), content_type='application/json')
+
+        response = self.client.get('/api/v1/tasks/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['count'], 2)
+
+    def test_bulk_close(self):
+        creator = create_user('creator@trivial.test', 'creator')
+        tasks = create_tasks(creator, 3)
+        taken = TakedTask.objects.bulk_create([TakedTask(task=task, executor=self.user) for task in tasks])
+        ids = [taked_task.id for taked_task in taken]
+
+        response = self.client.post('/api/v1/tasks/close/bulk/', {'ids': ids + [0]}, content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['closed']), sorted(ids))
+
+        # Closing again changes nothing.
+        response = self.client.post('/api/v1/tasks/close/bulk/', {'ids': ids}, content_type='application/json')
+        self.assertEqual(response.json()['closed'], [])
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.completed_tasks, 3)
+        self.assertEqual(CreatedTask.objects.filter(is_completed=True).count(), 3)
+        self.assertFalse(TakedTask.objects.filter(closed_at__isnull=True).exists())
+
+    def test_bulk_close_skips_takes_of_other_users(self):
+        creator = create_user('creator@trivial.test', 'creator')
+        other = create_user('other@trivial.test', 'other')
+        tasks = create_tasks(creator, 4)
+        mine = TakedTask.objects.bulk_create([TakedTask(task=task, executor=self.user) for task in tasks[:2]])
+        theirs = TakedTask.objects.bulk_create([TakedTask(task=task, executor=other) for task in tasks[2:]])
+
+        response = self.client.post(
+            '/api/v1/tasks/close/bulk/',
+            {'ids': [taked_task.id for taked_task in mine + theirs]},
+            content_type='application/json',
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(sorted(response.json()['closed']), sorted(taked_task.id for taked_task in mine))
+        other.refresh_from_db()
+        self.assertEqual(other.completed_tasks, 0)
+        self.assertEqual(TakedTask.objects.filter(executor=other, closed_at__isnull=True).count(), 2)
+        self.assertEqual(CreatedTask.objects.filter(id__in=[task.id for task in tasks[2:]], is_completed=True).count(), 0)
+
+
+class ConcurrentBulkCloseTests(TransactionTestCase):
+    """
+    Overlapping bulk closes lock rows in the same order and both finish.
+    """
+
+    def test_overlapping_closes_both_finish(self):
+        creator = create_user('creator@trivial.test', 'creator')
+        executor = create_user('executor@trivial.test', 'executor')
+        tasks = create_tasks(creator, 40)
+        taken = TakedTask.objects.bulk_create([TakedTask(task=task, executor=executor) for task in tasks])
+        ids = [taked_task.id for taked_task in taken]
+        batches = [ids[:30], list(reversed(ids[10:]))]
+
+        barrier = threading.Barrier(len(batches))
+        results, errors = [], []
+
+        def close(batch):
+            try:
+                barrier.wait()
+                results.append(TakedTask.objects.close_many(batch, executor=executor))
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=close, args=(batch,)) for batch in batches]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(results[0] + results[1]), sorted(ids))
+        executor.refresh_from_db()
+        self.assertEqual(executor.completed_tasks, 40)
+        self.assertEqual(CreatedTask.objects.filter(is_completed=True).count(), 40)
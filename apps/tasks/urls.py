@@ -1,13 +1,37 @@
-
+from django.conf import settings
 from django.urls import path
 
-from .views import TasksAPIView, TasksDetailAPIView, TasksTakeAPIView, TakenTasksAPIView, CloseTakenTaskAPIView, TaskListView
+from .async_views import AsyncTaskListView, AsyncTasksAPIView, AsyncTasksDetailAPIView
+from .views import (
+    CloseTakenTaskAPIView,
+    CloseTakenTasksBulkAPIView,
+    TakenTasksAPIView,
+    TaskListView,
+    TaskSearchView,
+    TasksAPIView,
+    TasksBulkAPIView,
+    TasksDetailAPIView,
+    TasksTakeAPIView,
+)
+
+# ASYNC_TASK_VIEWS serves these three from the async views in async_views.py.
+if settings.ASYNC_TASK_VIEWS:
+    my_tasks_view = AsyncTasksAPIView.as_view()
+    task_detail_view = AsyncTasksDetailAPIView.as_view()
+    task_list_view = AsyncTaskListView.as_view()
+else:
+    my_tasks_view = TasksAPIView.as_view()
+    task_detail_view = TasksDetailAPIView.as_view()
+    task_list_view = TaskListView.as_view()
 
 urlpatterns = [
-    path('me/tasks/', TasksAPIView.as_view(), name='tasks'),
+    path('me/tasks/', my_tasks_view, name='tasks'),
+    path('me/tasks/bulk/', TasksBulkAPIView.as_view(), name='tasks-bulk'),
     path('me/taken-tasks/', TakenTasksAPIView.as_view(), name='taken-tasks'),
+    path('tasks/close/bulk/', CloseTakenTasksBulkAPIView.as_view(), name='close-tasks-bulk'),
     path('tasks/close/<int:task_id>/', CloseTakenTaskAPIView.as_view(), name='close-task'),
-    path('tasks/<int:task_id>/', TasksDetailAPIView.as_view(), name='tasks'),
-    path('tasks/', TaskListView.as_view(), name='all-tasks'),
+    path('tasks/search/', TaskSearchView.as_view(), name='search-tasks'),
+    path('tasks/<int:task_id>/', task_detail_view, name='tasks'),
+    path('tasks/', task_list_view, name='all-tasks'),
     path('take-task/<int:task_id>/', TasksTakeAPIView.as_view(), name='take-task'),
 ]
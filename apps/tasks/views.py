@@ -1,15 +1,88 @@
+import hashlib
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import transaction
+from django.db.models import F
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics
+from rest_framework.renderers import JSONRenderer
+from drf_spectacular.types import OpenApiTypes
 
 
+from apps.tasks.cache import bump_feed_generation, get_cached_feed, set_cached_feed
 from apps.tasks.models import CreatedTask, TakedTask
-from apps.tasks.serializers import TakeTaskSerializer, TaskCreateSerializer, TaskSerializer, TaskDetailSerializer
+from apps.tasks.pagination import TaskCursorPagination
+from apps.tasks.serializers import (
+    BULK_MAX_TASKS,
+    BulkCloseSerializer,
+    TakeTaskSerializer,
+    TaskCreateSerializer,
+    TaskSerializer,
+    TaskDetailSerializer,
+)
+from apps.users.models import User
 from apps.users.utils import get_user_from_cookie
 
+def create_task(serializer, user):
+    """
+    Save a validated TaskCreateSerializer and bump the creator's counter.
+
+    Args:
+        serializer: Validated TaskCreateSerializer.
+        user: The task creator.
+
+    Returns:
+        CreatedTask: The new task.
+    """
+    with transaction.atomic():
+        task = serializer.save(creator=user)
+        User.objects.filter(pk=user.pk).update(created_tasks=F('created_tasks') + 1)
+    return task
+
+
+def bulk_create_tasks(serializer, user):
+    """
+    Save a validated many=True TaskCreateSerializer with one INSERT and
+    bump the creator's counter once by the number of tasks.
+
+    Args:
+        serializer: Validated TaskCreateSerializer(many=True).
+        user: The task creator.
+
+    Returns:
+        list: The new tasks.
+    """
+    with transaction.atomic():
+        tasks = serializer.save(creator=user)
+        User.objects.filter(pk=user.pk).update(created_tasks=F('created_tasks') + len(tasks))
+    # bulk_create sends no post_save, so drop the cached feed pages here.
+    bump_feed_generation()
+    return tasks
+
+
+def feed_etag(data) -> str:
+    """
+    Strong ETag of a rendered feed page.
+    """
+    return '"%s"' % hashlib.md5(JSONRenderer().render(data)).hexdigest()
+
+
+def conditional_feed_response(request, response, etag):
+    """
+    Tag a feed response with its ETag, or answer 304 if the client has it.
+    """
+    if_none_match = request.headers.get('If-None-Match', '')
+    if etag in [tag.strip() for tag in if_none_match.split(',')]:
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+
+    response['ETag'] = etag
+    return response
+
+
 class TasksAPIView(APIView):
     @extend_schema(
         summary="User's Task list",
@@ -32,7 +105,7 @@ class TasksAPIView(APIView):
         if not user:
             return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        queryset = CreatedTask.objects.filter(creator=user).all()
+        queryset = CreatedTask.objects.filter(creator=user).select_related('creator')
         serializer_class = TaskSerializer(queryset, many=True)
         return Response({"tasks": serializer_class.data}, status=status.HTTP_200_OK)
 
@@ -54,11 +127,13 @@ class TasksAPIView(APIView):
             Response: A response confirming task creation success or an error message.
         """
         user = get_user_from_cookie(request=request)
-        user.created_tasks += 1
-        user.save()
+
+        if not user:
+            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
         serializer_class = TaskCreateSerializer(data=request.data)
         serializer_class.is_valid(raise_exception=True)
-        serializer_class.save(creator=user)
+        create_task(serializer_class, user)
         return Response({"status": "Task created success", "task": serializer_class.data}, status=status.HTTP_201_CREATED)
     
     @extend_schema(
@@ -105,15 +180,173 @@ class TasksAPIView(APIView):
         return Response({"status": "Task deleted success"}, status=status.HTTP_204_NO_CONTENT)
 
 
-@extend_schema(summary="All Created Tasks", description="List of All Created Tasks")
+def per_item_errors(errors, count):
+    """
+    Return the errors of a many=True serializer as one entry per item.
+
+    DRF returns them as a list or, with LIST_SERIALIZER_ERRORS_AS_DICT
+    (the default in some releases), as a dict keyed by the index of the
+    invalid items only. The bulk endpoints always answer with the list.
+
+    Args:
+        errors: ListSerializer.errors.
+        count (int): Number of items in the request.
+
+    Returns:
+        list: An error dict per item, empty for valid items.
+    """
+    if isinstance(errors, dict):
+        return [errors.get(index, errors.get(str(index), {})) for index in range(count)]
+    return list(errors)
+
+
+class TasksBulkAPIView(APIView):
+    @extend_schema(
+        summary="Create Tasks in bulk",
+        description=f"Create up to {BULK_MAX_TASKS} tasks from a list of task payloads. Nothing is created if any payload is invalid.",
+        request=TaskCreateSerializer(many=True),
+        responses={
+            201: OpenApiResponse(description="Tasks created success"),
+            400: OpenApiResponse(description="Invalid payloads, with one error object per task"),
+        }
+    )
+    def post(self, request):
+        """Handles POST request to create many tasks at once.
+
+        All payloads are validated first; the tasks are then written with
+        one bulk INSERT and the creator's counter is bumped once.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            Response: A response with the new task ids or the validation errors.
+        """
+        user = get_user_from_cookie(request=request)
+
+        if not user:
+            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        if not isinstance(request.data, list) or not 0 < len(request.data) <= BULK_MAX_TASKS:
+            return Response(
+                {"status": f"Expected a list of 1 to {BULK_MAX_TASKS} tasks"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer_class = TaskCreateSerializer(data=request.data, many=True)
+        if not serializer_class.is_valid():
+            return Response(per_item_errors(serializer_class.errors, len(request.data)), status=status.HTTP_400_BAD_REQUEST)
+        tasks = bulk_create_tasks(serializer_class, user)
+        return Response(
+            {"status": "Tasks created success", "ids": [task.id for task in tasks], "tasks": serializer_class.data},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+@extend_schema(
+    summary="All Created Tasks",
+    description="List of All Created Tasks. Pass pagination=cursor to page by cursor instead of page number.",
+    parameters=[
+        OpenApiParameter(
+            name="pagination",
+            description="'cursor' for keyset pagination without totals; page numbers otherwise",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            enum=["page", "cursor"],
+        ),
+    ],
+)
 class TaskListView(generics.ListAPIView):
     """API view for listing all created tasks."""
-    queryset = CreatedTask.objects.all()
+    queryset = CreatedTask.objects.select_related('creator')
     serializer_class = TaskSerializer
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['title', 'is_completed', 'category']
+    cursor_pagination_class = TaskCursorPagination
+
+    @property
+    def paginator(self):
+        """
+        Use cursor pagination when the client opts in with ?pagination=cursor.
+
+        Page number pagination stays the default for clients that need the
+        total count.
+        """
+        if not hasattr(self, '_paginator'):
+            if self.request is not None and self.request.query_params.get('pagination') == 'cursor':
+                self._paginator = self.cursor_pagination_class()
+            else:
+                self._paginator = super().paginator
+        return self._paginator
+
+    def list(self, request, *args, **kwargs):
+        """
+        Serve feed pages from the response cache.
+
+        Pages are cached per filter/page query (see apps/tasks/cache.py)
+        with an ETag, so clients can revalidate with If-None-Match and get
+        an empty 304 while the feed has not changed.
+        """
+        key, cached = get_cached_feed(request)
+        if cached is None:
+            response = super().list(request, *args, **kwargs)
+            etag = feed_etag(response.data)
+            set_cached_feed(key, response.data, etag)
+        else:
+            data, etag = cached
+            response = Response(data)
+
+        return conditional_feed_response(request, response, etag)
     
 
+@extend_schema(
+    summary="Search Tasks",
+    description="Tasks ranked by full-text match on title and description, with a fuzzy title match as fallback.",
+    parameters=[
+        OpenApiParameter(
+            name="q",
+            description="Search text",
+            type=OpenApiTypes.STR,
+            location=OpenApiParameter.QUERY,
+            required=True,
+        ),
+    ],
+)
+class TaskSearchView(generics.ListAPIView):
+    """API view for searching created tasks."""
+    serializer_class = TaskSerializer
+    filter_backends = [DjangoFilterBackend]
+    filterset_fields = ['is_completed', 'category']
+
+    def get_queryset(self):
+        """
+        Rank tasks by full-text match against the search_vector column.
+
+        If nothing matches (typically a typo), fall back to trigram
+        similarity on the title. Both paths are served by GIN indexes.
+        """
+        text = self.request.query_params.get('q', '').strip()
+        queryset = CreatedTask.objects.select_related('creator')
+
+        if not text:
+            return queryset.none()
+
+        query = SearchQuery(text, search_type='websearch', config='english')
+        matches = (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-created_at', 'id')
+        )
+        if matches.exists():
+            return matches
+
+        return (
+            queryset.filter(title__trigram_similar=text)
+            .annotate(similarity=TrigramSimilarity('title', text))
+            .order_by('-similarity', '-created_at', 'id')
+        )
+
+
 class TasksDetailAPIView(APIView):
     @extend_schema(
         summary="Task detail",
@@ -132,7 +365,7 @@ class TasksDetailAPIView(APIView):
         Returns:
             Response: A response containing task details or an error message.
         """
-        task = CreatedTask.objects.filter(id=task_id).first()
+        task = CreatedTask.objects.filter(id=task_id).select_related('creator').first()
         
         if not task:
             return Response({"status": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
@@ -148,11 +381,17 @@ class TasksTakeAPIView(APIView):
         request=TakeTaskSerializer,
         responses={
             200: OpenApiResponse(description="Task taken success"),
+            404: OpenApiResponse(description="Task not found"),
+            409: OpenApiResponse(description="Task already taken or completed"),
         }    
     )
     def post(self, request, task_id):
         """Handles POST request to take a task.
 
+        The claim is a single conditional insert (see TakedTaskManager.claim),
+        so when several executors race for a task exactly one of them wins
+        and the others get a 409.
+
         Args:
             request: The HTTP request object.
             task_id: The ID of the task.
@@ -165,15 +404,15 @@ class TasksTakeAPIView(APIView):
         if not user:
             return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        task = CreatedTask.objects.get(id=task_id)
-    
-        if not task:
-            return Response({"status": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
-        
-        taked_task = TakedTask.objects.create(task=task, executor=user)
-        taked_task.save()
+        taked_task_id = TakedTask.objects.claim(task_id, user)
+
+        if taked_task_id is None:
+            # Only the losing path pays for finding out why.
+            if not CreatedTask.objects.filter(id=task_id).exists():
+                return Response({"status": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
+            return Response({"status": "Task already taken"}, status=status.HTTP_409_CONFLICT)
                 
-        return Response({"status": "Task taken success"}, status=status.HTTP_200_OK)
+        return Response({"status": "Task taken success", "taked_task_id": taked_task_id}, status=status.HTTP_200_OK)
 
 class TakenTasksAPIView(APIView):
     @extend_schema(
@@ -197,8 +436,8 @@ class TakenTasksAPIView(APIView):
         if not user:
             return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        taken_tasks = TakedTask.objects.filter(executor=user).all()
-        quertset = CreatedTask.objects.filter(id__in=taken_tasks).all()
+        taken_tasks = TakedTask.objects.filter(executor=user, closed_at__isnull=True).values('task_id')
+        quertset = CreatedTask.objects.filter(id__in=taken_tasks).select_related('creator')
         serializer_class = TaskSerializer(quertset, many=True)
         return Response({"taken_tasks": serializer_class.data}, status=status.HTTP_200_OK)
 
@@ -214,6 +453,9 @@ class CloseTakenTaskAPIView(APIView):
     def post(self, request, task_id):
         """Handles POST request to close a taken task.
 
+        Only the executor may close a take; for anybody else it is not
+        found, as in the bulk close.
+
         Args:
             request: The HTTP request object.
             task_id: The ID of the task.
@@ -222,16 +464,51 @@ class CloseTakenTaskAPIView(APIView):
             Response: A response confirming task closing success or an error message.
         """
         user = get_user_from_cookie(request=request)
-        user.completed_tasks += 1
-        user.save()
         
         if not user:
             return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
         try:
-            task = TakedTask.objects.get(id=task_id)
+            task = (
+                TakedTask.objects.select_related('task').defer('task__search_vector')
+                .get(id=task_id, executor=user, closed_at__isnull=True)
+            )
         except TakedTask.DoesNotExist:
             return Response({"status": "Task not found"}, status=status.HTTP_404_NOT_FOUND)
 
         
         task.close()
         return Response({"status": "Task closed success"}, status=status.HTTP_200_OK)
+
+
+class CloseTakenTasksBulkAPIView(APIView):
+    @extend_schema(
+        summary="Close Taken Tasks in bulk",
+        description=(
+            f"Close up to {BULK_MAX_TASKS} taken tasks of the current user. "
+            "Ids that are unknown, already closed or taken by somebody else are skipped."
+        ),
+        request=BulkCloseSerializer,
+        responses={
+            200: OpenApiResponse(description="Tasks closed success"),
+        }
+    )
+    def post(self, request):
+        """Handles POST request to close many taken tasks at once.
+
+        Only takes of the current user are closed; other ids are skipped.
+
+        Args:
+            request: The HTTP request object.
+
+        Returns:
+            Response: A response with the ids that were closed by this request.
+        """
+        user = get_user_from_cookie(request=request)
+
+        if not user:
+            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        serializer_class = BulkCloseSerializer(data=request.data)
+        serializer_class.is_valid(raise_exception=True)
+        closed = TakedTask.objects.close_many(serializer_class.validated_data["ids"], executor=user)
+        return Response({"status": "Tasks closed success", "closed": closed}, status=status.HTTP_200_OK)
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from apps.users.models import User
+from apps.users.models import OutboxEmail, User
 
 # Register your models here.
-admin.site.register(User)
\ No newline at end of file
+admin.site.register(User)
+admin.site.register(OutboxEmail)
\ No newline at end of file
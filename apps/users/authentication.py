@@ -0,0 +1,143 @@
+"""
+Authentication from the 'jwt' cookie.
+
+Verified tokens and a slim snapshot of their users are cached per process,
+so an authenticated request normally costs neither a signature check nor a
+users-table round trip. Snapshots are dropped when the User is saved or
+deleted (see apps/users/signals.py).
+"""
+
+import time
+
+import jwt
+from django.conf import settings
+from rest_framework.authentication import BaseAuthentication
+
+from apps.users.models import User
+from trivial.cache import LRUCache
+
+# Fields loaded into the cached snapshot; other fields are deferred and
+# fetched from the database on first access. Model.from_db expects them in
+# model field order.
+SNAPSHOT_FIELDS = tuple(
+    field.attname for field in User._meta.concrete_fields
+    if field.attname in ('id', 'email', 'name', 'is_active', 'is_verified', 'is_staff', 'is_superuser')
+)
+
+_config = getattr(settings, 'AUTH_CACHE', {})
+
+token_cache = LRUCache(maxsize=_config.get('MAX_SIZE', 10000), ttl=_config.get('TTL', 300))
+user_cache = LRUCache(maxsize=_config.get('MAX_SIZE', 10000), ttl=_config.get('TTL', 300))
+
+
+def decode_token(token: str) -> dict:
+    """
+    Verify a jwt token and return its payload.
+
+    Args:
+        token: Encoded jwt token
+
+    Returns:
+        dict payload if the token is valid, None otherwise
+    """
+    payload = token_cache.get(token)
+    if payload is not None:
+        if payload.get('exp', float('inf')) > time.time():
+            return payload
+        token_cache.pop(token)
+        return None
+
+    try:
+        payload = jwt.decode(token, 'secret', algorithms=['HS256'])
+    except jwt.InvalidTokenError:
+        return None
+
+    ttl = token_cache.ttl
+    if 'exp' in payload:
+        ttl = min(ttl, payload['exp'] - time.time())
+    token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+
+def get_user_snapshot(user_id: int) -> User:
+    """
+    Get a User with SNAPSHOT_FIELDS loaded, from the cache if possible.
+
+    A fresh instance is built on every call, so callers may modify and
+    save it without affecting other requests.
+
+    Args:
+        user_id: Primary key of the user
+
+    Returns:
+        User instance, or None if the user does not exist
+    """
+    values = user_cache.get(user_id)
+    if values is None:
+        values = User.objects.filter(id=user_id).values_list(*SNAPSHOT_FIELDS).first()
+        if values is None:
+            return None
+        user_cache.set(user_id, values)
+    return User.from_db('default', SNAPSHOT_FIELDS, values)
+
+
+async def aget_user_snapshot(user_id: int) -> User:
+    """
+    Async version of get_user_snapshot for async views.
+    """
+    values = user_cache.get(user_id)
+    if values is None:
+        values = await User.objects.filter(id=user_id).values_list(*SNAPSHOT_FIELDS).afirst()
+        if values is None:
+            return None
+        user_cache.set(user_id, values)
+    return User.from_db('default', SNAPSHOT_FIELDS, values)
+
+
+def authenticate_token(token: str) -> User:
+    """
+    Get the user a jwt token belongs to.
+
+    Args:
+        token: Encoded jwt token
+
+    Returns:
+        User instance if token is valid, None otherwise
+    """
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return get_user_snapshot(payload['id'])
+
+
+async def aauthenticate_token(token: str) -> User:
+    """
+    Async version of authenticate_token for async views.
+    """
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    return await aget_user_snapshot(payload['id'])
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Drop the cached snapshot of a user.
+    """
+    user_cache.pop(user_id)
+
+
+class JWTCookieAuthentication(BaseAuthentication):
+    """
+    DRF authentication class for the 'jwt' cookie set by LoginAPIView.
+    """
+
+    def authenticate(self, request):
+        token = request.COOKIES.get('jwt')
+        if not token:
+            return None
+
+        user = authenticate_token(token)
+        if user is None:
+            return None
+        return user, token
@@ -0,0 +1,53 @@
+import logging
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users import outbox
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deliver queued outbox emails. Each batch is sent over one SMTP "
+        "connection; failed emails are retried with exponential backoff and "
+        "marked dead after --max-attempts failures. Use --loop to keep running."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=outbox.BATCH_SIZE, help="Emails sent per SMTP connection")
+        parser.add_argument('--max-attempts', type=int, default=outbox.MAX_ATTEMPTS, help="Failures before an email is marked dead")
+        parser.add_argument('--loop', action='store_true', help="Keep delivering until interrupted")
+        parser.add_argument('--interval', type=float, default=5, help="Seconds to sleep when the outbox is empty")
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                totals = self.drain(options['batch_size'], options['max_attempts'])
+            except Exception as error:
+                # The mail server is unreachable; the claimed rows were released.
+                if not options['loop']:
+                    raise CommandError(f"Could not deliver outbox emails: {error}") from error
+                logger.warning("Could not deliver outbox emails: %s", error)
+                totals = None
+
+            if totals and (any(totals.values()) or options['verbosity'] > 1):
+                self.stdout.write(self.style.SUCCESS(
+                    f"{totals['sent']} sent, {totals['retried']} retried, {totals['dead']} dead"
+                ))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def drain(self, batch_size, max_attempts):
+        """
+        Deliver batches until no due email is left.
+        """
+        totals = {"sent": 0, "retried": 0, "dead": 0}
+        while True:
+            result = outbox.deliver_batch(batch_size, max_attempts)
+            for key, value in result.items():
+                totals[key] += value
+            if sum(result.values()) < batch_size:
+                return totals
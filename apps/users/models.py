@@ -1,5 +1,6 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.utils import timezone
 from apps.users.managers import CustomUserManager
 
 class User(AbstractUser):
@@ -75,3 +76,55 @@ class User(AbstractUser):
             rating (int): Rating to subtract.
         """
         self.rating -= rating
+
+
+class OutboxEmail(models.Model):
+    """
+    Email waiting to be delivered by the send_outbox worker.
+
+    Rows are written in the same transaction as the change that triggers the
+    email, so a message is queued if and only if that change is committed.
+
+    Attributes:
+        subject (CharField): Email subject.
+        body (TextField): Plain text body.
+        html_body (TextField): Optional HTML alternative.
+        from_email (CharField): Sender address.
+        to (JSONField): List of recipient addresses.
+        status (CharField): pending, sent or dead.
+        attempts (IntegerField): Number of failed delivery attempts.
+        next_attempt_at (DateTimeField): Earliest time of the next attempt.
+        last_error (TextField): Error of the last failed attempt.
+        created_at (DateTimeField): When the email was queued.
+        sent_at (DateTimeField): When the email was delivered.
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    DEAD = "dead"
+    STATUSES = {PENDING: "pending", SENT: "sent", DEAD: "dead"}
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(null=True, blank=True, default=None)
+    from_email = models.CharField(max_length=255)
+    to = models.JSONField()
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(null=True, blank=True, default=None)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True, default=None)
+
+    class Meta:
+        db_table = 'outbox_emails'
+        indexes = [
+            # The worker only ever scans pending rows that are due.
+            models.Index(
+                fields=['next_attempt_at'],
+                condition=models.Q(status='pending'),
+                name='outbox_emails_pending_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {', '.join(self.to)}"
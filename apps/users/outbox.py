@@ -0,0 +1,163 @@
+"""
+Transactional email outbox.
+
+Code that needs to send an email calls ``enqueue_email`` inside its own
+transaction; the ``send_outbox`` management command delivers the queued rows
+over one reused SMTP connection, holding no lock or transaction while
+talking to the mail server. Failed deliveries are retried with
+exponential backoff and end up in the ``dead`` state after
+``MAX_ATTEMPTS`` failures.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from apps.users.models import OutboxEmail
+
+logger = logging.getLogger(__name__)
+
+_config = getattr(settings, 'EMAIL_OUTBOX', {})
+
+BATCH_SIZE = _config.get('BATCH_SIZE', 100)
+MAX_ATTEMPTS = _config.get('MAX_ATTEMPTS', 5)
+BACKOFF_SECONDS = _config.get('BACKOFF_SECONDS', 30)
+MAX_BACKOFF_SECONDS = _config.get('MAX_BACKOFF_SECONDS', 3600)
+CLAIM_SECONDS = _config.get('CLAIM_SECONDS', 300)
+
+
+def enqueue_email(subject, body, to, html_body=None, from_email=None) -> OutboxEmail:
+    """
+    Queue an email for delivery.
+
+    Args:
+        subject (str): Email subject.
+        body (str): Plain text body.
+        to (list[str]): Recipient addresses.
+        html_body (str): Optional HTML alternative.
+        from_email (str): Sender, DEFAULT_FROM_EMAIL if not given.
+
+    Returns:
+        OutboxEmail: The queued row.
+    """
+    return OutboxEmail.objects.create(
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=list(to),
+    )
+
+
+def build_message(email: OutboxEmail, connection=None) -> EmailMultiAlternatives:
+    """
+    Build the Django email message for an outbox row.
+    """
+    message = EmailMultiAlternatives(email.subject, email.body, email.from_email, email.to, connection=connection)
+    if email.html_body:
+        message.attach_alternative(email.html_body, "text/html")
+    return message
+
+
+def backoff(attempts: int) -> timedelta:
+    """
+    Delay before the next attempt after the given number of failures.
+    """
+    return timedelta(seconds=min(BACKOFF_SECONDS * 2 ** (attempts - 1), MAX_BACKOFF_SECONDS))
+
+
+def claim_batch(batch_size=BATCH_SIZE) -> list:
+    """
+    Claim up to batch_size due emails for this worker.
+
+    The rows are locked with SKIP LOCKED only for as long as it takes to push
+    their next_attempt_at CLAIM_SECONDS ahead, so other workers skip them
+    without a lock being held while they are sent. If the worker dies before
+    recording the result, the claim runs out and the emails are sent again.
+
+    Returns:
+        list[OutboxEmail]: The claimed rows, with next_attempt_at as it was
+            before the claim.
+    """
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.filter(status=OutboxEmail.PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at')
+            .select_for_update(skip_locked=True)[:batch_size]
+        )
+        if batch:
+            OutboxEmail.objects.filter(pk__in=[email.pk for email in batch]).update(
+                next_attempt_at=timezone.now() + timedelta(seconds=CLAIM_SECONDS)
+            )
+    return batch
+
+
+def release_batch(batch) -> None:
+    """
+    Give claimed emails back without counting an attempt.
+    """
+    OutboxEmail.objects.bulk_update(batch, ['next_attempt_at'])
+
+
+def deliver_batch(batch_size=BATCH_SIZE, max_attempts=MAX_ATTEMPTS) -> dict:
+    """
+    Deliver one batch of due emails.
+
+    The batch is claimed in a short transaction (see claim_batch), sent with
+    no transaction open, and the results are written in a second one. All
+    messages of the batch go through one SMTP connection; each one is sent on
+    its own so a rejected recipient only fails its own row.
+
+    Args:
+        batch_size (int): Maximum number of emails to send.
+        max_attempts (int): Failures after which an email is marked dead.
+
+    Returns:
+        dict: Number of emails sent, retried and marked dead.
+
+    Raises:
+        Exception: Whatever the email backend raises when it cannot connect.
+            The claim is released and no attempt is counted in that case.
+    """
+    result = {"sent": 0, "retried": 0, "dead": 0}
+    batch = claim_batch(batch_size)
+    if not batch:
+        return result
+
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception:
+        release_batch(batch)
+        raise
+
+    try:
+        for email in batch:
+            try:
+                build_message(email, connection).send()
+            except Exception as error:
+                email.attempts += 1
+                email.last_error = f"{type(error).__name__}: {error}"
+                if email.attempts >= max_attempts:
+                    email.status = OutboxEmail.DEAD
+                    result["dead"] += 1
+                    logger.error("Giving up on outbox email %s after %d attempts: %s", email.pk, email.attempts, email.last_error)
+                else:
+                    email.next_attempt_at = timezone.now() + backoff(email.attempts)
+                    result["retried"] += 1
+            else:
+                email.status = OutboxEmail.SENT
+                email.sent_at = timezone.now()
+                result["sent"] += 1
+    finally:
+        connection.close()
+
+    with transaction.atomic():
+        OutboxEmail.objects.bulk_update(
+            batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+        )
+    return result
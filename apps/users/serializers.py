@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
 from apps.users.models import User
+from trivial.metrics import TimedSerializerMixin
 
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     User serializer for registration.
     
@@ -36,7 +37,7 @@ class UserSerializer(serializers.ModelSerializer):
         return instance        
 
 
-class UserUpdateSerializer(serializers.ModelSerializer):
+class UserUpdateSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     User serializer for updating user information.
     
@@ -66,7 +67,7 @@ class UserLoginSerializer(serializers.Serializer):
         fields = ('email', 'password')
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     """
     User serializer for the user profile.
     
@@ -1,3 +1,214 @@
-from django.test import TestCase
+import time
+from datetime import timedelta
+from io import StringIO
+from smtplib import SMTPRecipientsRefused
+from unittest import mock
 
-# Create your tests here.
+import jwt
+
+from django.core import mail
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import call_command
+from django.db import connection as db_connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.users.authentication import authenticate_token, decode_token, token_cache, user_cache
+from apps.users.models import OutboxEmail, User
+from apps.users.outbox import claim_batch, deliver_batch, enqueue_email
+from apps.users.utils import send_verification_email
+
+
+class RejectingEmailBackend(EmailBackend):
+    """
+    Accepts the connection but refuses every message.
+    """
+
+    def send_messages(self, messages):
+        raise SMTPRecipientsRefused({})
+
+
+class UnreachableEmailBackend(EmailBackend):
+    """
+    Cannot connect to the mail server.
+    """
+
+    def open(self):
+        raise ConnectionRefusedError("mail server down")
+
+
+class TransactionCheckingEmailBackend(EmailBackend):
+    """
+    Records whether a database transaction was open while sending.
+    """
+    in_transaction = []
+
+    def send_messages(self, messages):
+        self.in_transaction.append(db_connection.in_atomic_block)
+        return super().send_messages(messages)
+
+
+class AuthCacheTests(TestCase):
+    """
+    Verified tokens and user snapshots are cached per process and dropped
+    when the user changes.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.user = User(email='me@trivial.test', name='me')
+        self.user.set_password('password')
+        self.user.save()
+
+    def token(self, **claims):
+        return jwt.encode({'id': self.user.id, **claims}, 'secret', algorithm='HS256')
+
+    def test_token_ttl_is_capped_by_exp(self):
+        token = self.token(exp=int(time.time()) + 2)
+
+        self.assertEqual(decode_token(token)['id'], self.user.id)
+        self.assertEqual(len(token_cache), 1)
+
+        # Well within the cache TTL, but past the token's own expiry.
+        with mock.patch('trivial.cache.time.monotonic', return_value=time.monotonic() + 5):
+            self.assertIsNone(token_cache.get(token))
+
+    def test_cached_snapshot_needs_no_users_query(self):
+        token = self.token()
+        self.assertEqual(authenticate_token(token).pk, self.user.pk)
+
+        with self.assertNumQueries(0):
+            user = authenticate_token(token)
+        self.assertEqual((user.pk, user.email, user.name), (self.user.pk, 'me@trivial.test', 'me'))
+
+    def test_saving_user_drops_snapshot(self):
+        token = self.token()
+        authenticate_token(token)
+
+        self.user.name = 'renamed'
+        self.user.save()
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.assertEqual(authenticate_token(token).name, 'renamed')
+
+    def test_deleting_user_drops_snapshot(self):
+        token = self.token()
+        authenticate_token(token)
+
+        self.user.delete()
+
+        self.assertIsNone(user_cache.get(self.user.pk))
+        self.assertIsNone(authenticate_token(token))
+
+    def test_bad_and_expired_tokens_are_anonymous_and_not_cached(self):
+        bad = jwt.encode({'id': self.user.id}, 'wrong secret', algorithm='HS256')
+        expired = self.token(exp=int(time.time()) - 10)
+
+        for token in (bad, expired, 'not a token'):
+            self.assertIsNone(authenticate_token(token))
+        self.assertEqual(len(token_cache), 0)
+        self.assertEqual(len(user_cache), 0)
+
+        self.client.cookies['jwt'] = expired
+        self.assertEqual(self.client.get('/api/v1/me/tasks/').status_code, 401)
+        self.assertEqual(len(token_cache), 0)
+
+
+class EmailOutboxTests(TestCase):
+    """
+    Emails are queued with the change that causes them and delivered by send_outbox.
+    """
+
+    def setUp(self):
+        self.user = User(email='new@trivial.test', name='new')
+        self.user.set_password('password')
+        self.user.save()
+
+    def test_verification_email_is_queued_not_sent(self):
+        send_verification_email(self.user)
+
+        self.assertEqual(len(mail.outbox), 0)
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.to, ['new@trivial.test'])
+        self.assertIn(User.objects.get(pk=self.user.pk).verification_code, email.body)
+
+    def test_registration_queues_verification_email(self):
+        response = self.client.post(
+            '/api/v1/auth/register/', {'email': 'other@trivial.test', 'password': 'password', 'name': 'other'}
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(OutboxEmail.objects.get().to, ['other@trivial.test'])
+
+    def test_worker_sends_batch(self):
+        for i in range(3):
+            enqueue_email('Subject', 'Body', [f'user{i}@trivial.test'], html_body='<p>Body</p>')
+
+        call_command('send_outbox', batch_size=2, stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].alternatives[0][1], 'text/html')
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT, sent_at__isnull=False).count(), 3)
+
+    @override_settings(EMAIL_BACKEND='apps.users.tests.RejectingEmailBackend')
+    def test_failed_email_is_retried_with_backoff_then_dead(self):
+        email = enqueue_email('Subject', 'Body', ['user@trivial.test'])
+
+        self.assertEqual(deliver_batch(max_attempts=2), {'sent': 0, 'retried': 1, 'dead': 0})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+        # Not due yet.
+        self.assertEqual(deliver_batch(max_attempts=2), {'sent': 0, 'retried': 0, 'dead': 0})
+
+        OutboxEmail.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+        with self.assertLogs('apps.users.outbox', 'ERROR'):
+            self.assertEqual(deliver_batch(max_attempts=2), {'sent': 0, 'retried': 0, 'dead': 1})
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutboxEmail.DEAD)
+        self.assertIn('SMTPRecipientsRefused', email.last_error)
+
+    @override_settings(EMAIL_BACKEND='apps.users.tests.UnreachableEmailBackend')
+    def test_unreachable_server_leaves_rows_untouched(self):
+        enqueue_email('Subject', 'Body', ['user@trivial.test'])
+
+        queued = OutboxEmail.objects.get()
+
+        with self.assertRaises(ConnectionRefusedError):
+            deliver_batch()
+        email = OutboxEmail.objects.get()
+        self.assertEqual(email.attempts, 0)
+        # The claim is released, so the email is due again right away.
+        self.assertEqual(email.next_attempt_at, queued.next_attempt_at)
+
+    def test_claimed_emails_are_skipped_by_other_workers(self):
+        for i in range(3):
+            enqueue_email('Subject', 'Body', [f'user{i}@trivial.test'])
+
+        claimed = claim_batch(batch_size=2)
+
+        self.assertEqual(len(claimed), 2)
+        remaining = OutboxEmail.objects.exclude(pk__in=[email.pk for email in claimed]).get()
+        self.assertEqual([email.pk for email in claim_batch()], [remaining.pk])
+        self.assertEqual(claim_batch(), [])
+        self.assertTrue(all(email.next_attempt_at > timezone.now() for email in OutboxEmail.objects.all()))
+
+
+class EmailOutboxTransactionTests(TransactionTestCase):
+    """
+    No transaction is open while the outbox talks to the mail server.
+    """
+
+    @override_settings(EMAIL_BACKEND='apps.users.tests.TransactionCheckingEmailBackend')
+    def test_emails_are_sent_outside_a_transaction(self):
+        TransactionCheckingEmailBackend.in_transaction.clear()
+        for i in range(2):
+            enqueue_email('Subject', 'Body', [f'user{i}@trivial.test'])
+
+        self.assertEqual(deliver_batch(), {'sent': 2, 'retried': 0, 'dead': 0})
+
+        self.assertEqual(TransactionCheckingEmailBackend.in_transaction, [False, False])
+        self.assertEqual(OutboxEmail.objects.filter(status=OutboxEmail.SENT).count(), 2)
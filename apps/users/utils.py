@@ -1,14 +1,17 @@
-import jwt
 import random
-from django.core.mail import EmailMultiAlternatives
+from django.db import transaction
 
+from apps.users.authentication import aauthenticate_token, authenticate_token
 from apps.users.models import User
+from apps.users.outbox import enqueue_email
 
 
 def get_user_from_cookie(*, request: object) -> User:
     """
     Get user from jwt token in cookies.
 
+    Verified tokens and users are cached, see apps/users/authentication.py.
+
     Args:
         request: django request object
 
@@ -19,17 +22,26 @@ def get_user_from_cookie(*, request: object) -> User:
 
     if not token:
         return None
-    try:
-        payload = jwt.decode(token, 'secret', algorithms=['HS256'])
-    except jwt.ExpiredSignatureError:
-        return None
 
-    user = User.objects.filter(id=payload['id']).first()
-    
-    if not user:
+    return authenticate_token(token)
+
+
+async def aget_user_from_cookie(*, request: object) -> User:
+    """
+    Async version of get_user_from_cookie for async views.
+
+    Args:
+        request: django request object
+
+    Returns:
+        User instance if token is valid, None otherwise
+    """
+    token = request.COOKIES.get('jwt')
+
+    if not token:
         return None
-    
-    return user
+
+    return await aauthenticate_token(token)
 
 
 def generate_code() -> str:
@@ -46,15 +58,16 @@ def send_verification_email(user: User) -> None:
     """
     Send verification email to user.
 
+    The new code and the email are committed together; the email itself is
+    delivered by the send_outbox worker, see apps/users/outbox.py.
+
     Args:
         user: User instance
     """
     code = generate_code()
     user.verification_code = code
-    user.save()
 
     subject = 'Your verification code!'
-    from_email = 'trivial6@gmail.com'
     to_email = user.email
 
     # HTML and plain text versions
@@ -69,8 +82,7 @@ def send_verification_email(user: User) -> None:
     """
     text_content = f"Hello, {user.email}! Your verification code is: {code}"
 
-    # Construct message
-    msg = EmailMultiAlternatives(subject, text_content, from_email, [to_email])
-    msg.attach_alternative(html_content, "text/html")
-    msg.send()
+    with transaction.atomic():
+        user.save()
+        enqueue_email(subject, text_content, [to_email], html_body=html_content)
 
@@ -1,3 +1,5 @@
+import logging
+
 from django.shortcuts import render
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -6,11 +8,16 @@ from apps.users.models import User
 from apps.users.utils import get_user_from_cookie
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiTypes
 import jwt
+from django.db import transaction
 from datetime import datetime, timedelta
 
 from apps.users.serializers import UserProfileSerializer, UserSerializer, UserLoginSerializer, UserUpdateSerializer, VerifyEmailSerializer
 
 from apps.users.utils import send_verification_email
+from trivial.log import log_event
+
+logger = logging.getLogger(__name__)
+
 class RegisterAPIView(APIView):
     """
     Register user
@@ -29,7 +36,10 @@ class RegisterAPIView(APIView):
     def post(self, request):
         serializer = UserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            user = serializer.save()
+            # Only queued here; the send_outbox worker talks to SMTP.
+            send_verification_email(user)
         return Response({"status": "User registered successfully", "user": serializer.data}, status=status.HTTP_201_CREATED)
 
 
@@ -138,19 +148,13 @@ class UserAPIView(APIView):
         }
     )
     def get(self, request):
-        token = request.COOKIES.get('jwt')
-        print("COOKIES:", request.COOKIES)
+        # Cookie names only: the values are credentials.
+        log_event(logger, 'users.me', level=logging.DEBUG, cookies=sorted(request.COOKIES))
+        user = get_user_from_cookie(request=request)
 
-        if not token:
-            return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
-        
-        try:
-            payload = jwt.decode(token, 'secret', algorithms=['HS256'])
-        except jwt.ExpiredSignatureError:
+        if not user:
             return Response({"status": "Unauthorized"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        user = User.objects.get(id=payload["id"])
-        
         serializer = UserSerializer(user)
         
         return Response({"user": serializer.data}, status=status.HTTP_200_OK)
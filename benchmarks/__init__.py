@@ -0,0 +1,19 @@
+"""
+Load tests and benchmarks for Trivial.
+
+Every script in this package is runnable with ``python -m benchmarks.<name>``
+from the project root and talks to the database configured in
+``trivial.settings``.
+"""
+
+import os
+
+
+def setup_django():
+    """
+    Configure Django so a benchmark script can use the ORM and the ASGI app.
+    """
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trivial.settings')
+
+    import django
+    django.setup()
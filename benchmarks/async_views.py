@@ -0,0 +1,88 @@
+"""
+Sync vs async task views under high concurrency.
+
+Seeds a task, then starts the app twice on a local port, once with the
+sync views and once with ASYNC_TASK_VIEWS=true, and drives
+``GET /api/v1/tasks/<id>/`` with many keep-alive connections. Each run
+reports requests/s and latency percentiles. The prod server mode
+(gunicorn with uvicorn workers) is used by default; pass --workers 1 to
+see what a single event loop can overlap. Seeded rows are deleted
+afterwards.
+
+Usage:
+    python -m benchmarks.async_views --connections 256 --duration 20
+    python -m benchmarks.async_views --workers 1 --connections 512
+"""
+
+import argparse
+import asyncio
+from datetime import timedelta
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.utils import timezone  # noqa: E402
+
+from apps.tasks.models import CreatedTask  # noqa: E402
+from apps.users.models import User  # noqa: E402
+from benchmarks.http_bench import load, report, start_server, stop_server, wait_until_ready  # noqa: E402
+
+SEED_EMAIL = "bench-async-views@bench.local"
+
+VARIANTS = {
+    "sync": {"ASYNC_TASK_VIEWS": "false"},
+    "async": {"ASYNC_TASK_VIEWS": "true"},
+}
+
+
+def seed():
+    creator, _ = User.objects.get_or_create(email=SEED_EMAIL, defaults={"name": "async bench"})
+    return CreatedTask.objects.create(
+        title="Async views benchmark",
+        description="Seeded for the async views benchmark",
+        category="web",
+        price=10,
+        expires_at=timezone.now() + timedelta(days=1),
+        creator=creator,
+    )
+
+
+def cleanup():
+    User.objects.filter(email=SEED_EMAIL).delete()
+
+
+def main(args):
+    cleanup()
+    task = seed()
+    url = f"http://127.0.0.1:{args.port}/api/v1/tasks/{task.id}/"
+
+    try:
+        print(f"{'views':<8} {'requests':>9} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}   statuses")
+        for name in args.variants:
+            env = dict(VARIANTS[name])
+            if args.workers:
+                env["WEB_CONCURRENCY"] = str(args.workers)
+            process = start_server(args.mode, args.port, env=env)
+            try:
+                wait_until_ready(url)
+                stats = asyncio.run(load(url, args.connections, args.duration, args.warmup))
+            finally:
+                stop_server(process)
+            report(name, stats, args.duration)
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variants", nargs="+", choices=sorted(VARIANTS), default=["sync", "async"])
+    parser.add_argument("--mode", choices=["dev", "prod"], default="prod", help="server mode, see http_bench")
+    parser.add_argument("--workers", type=int, default=None, help="WEB_CONCURRENCY for the prod server")
+    parser.add_argument("--port", type=int, default=8765, help="port for the servers started by the script")
+    parser.add_argument("--connections", type=int, default=256, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured per variant")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows afterwards")
+    main(parser.parse_args())
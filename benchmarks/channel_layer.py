@@ -0,0 +1,142 @@
+"""
+Cross-process channel layer benchmark.
+
+Starts the Redis stand-in (or uses a real Redis with --redis-url), spawns
+several worker processes that each join a number of channels to one room
+group, and publishes messages to that group from a separate process. Every
+receiver must get every message; the script reports delivery completeness,
+throughput and latency.
+
+Usage:
+    python -m benchmarks.channel_layer --workers 4 --receivers 50 --messages 1000
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+from benchmarks import redis_standin
+
+GROUP = "room_bench"
+
+
+def make_layer(redis_url):
+    from channels_redis.pubsub import RedisPubSubChannelLayer
+
+    return RedisPubSubChannelLayer(hosts=[redis_url])
+
+
+async def receive_all(redis_url, receivers, messages, ready, start, timeout):
+    layer = make_layer(redis_url)
+    channels = [await layer.new_channel() for _ in range(receivers)]
+    for channel in channels:
+        await layer.group_add(GROUP, channel)
+    ready.release()
+    start.wait()
+
+    latencies = []
+    received = 0
+
+    async def drain(channel):
+        nonlocal received
+        for _ in range(messages):
+            message = await layer.receive(channel)
+            latencies.append(time.time() - message["sent"])
+            received += 1
+
+    try:
+        await asyncio.wait_for(asyncio.gather(*(drain(channel) for channel in channels)), timeout)
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        await layer.flush()
+    return received, latencies
+
+
+def receiver_process(redis_url, receivers, messages, ready, start, results, timeout):
+    received, latencies = asyncio.run(receive_all(redis_url, receivers, messages, ready, start, timeout))
+    results.put((received, latencies))
+
+
+async def publish_all(redis_url, messages):
+    layer = make_layer(redis_url)
+    started = time.perf_counter()
+    for seq in range(messages):
+        await layer.group_send(GROUP, {"type": "send_message", "seq": seq, "sent": time.time()})
+    elapsed = time.perf_counter() - started
+    await layer.flush()
+    return elapsed
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main(args):
+    standin = None
+    redis_url = args.redis_url
+    if redis_url is None:
+        listening = multiprocessing.Event()
+        standin = multiprocessing.Process(target=redis_standin.run, args=("127.0.0.1", args.port, listening), daemon=True)
+        standin.start()
+        listening.wait(10)
+        redis_url = f"redis://127.0.0.1:{args.port}/0"
+
+    ready = multiprocessing.Semaphore(0)
+    start = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(
+            target=receiver_process,
+            args=(redis_url, args.receivers, args.messages, ready, start, results, args.timeout),
+        )
+        for _ in range(args.workers)
+    ]
+    for worker in workers:
+        worker.start()
+    for _ in workers:
+        ready.acquire()
+
+    start.set()
+    wall_started = time.perf_counter()
+    publish_seconds = asyncio.run(publish_all(redis_url, args.messages))
+
+    received = 0
+    latencies = []
+    for _ in workers:
+        worker_received, worker_latencies = results.get()
+        received += worker_received
+        latencies.extend(worker_latencies)
+    wall_seconds = time.perf_counter() - wall_started
+
+    for worker in workers:
+        worker.join()
+    if standin is not None:
+        standin.terminate()
+
+    expected = args.workers * args.receivers * args.messages
+    print(f"backend:            {'stand-in' if args.redis_url is None else args.redis_url}")
+    print(f"worker processes:   {args.workers}")
+    print(f"room members:       {args.workers * args.receivers}")
+    print(f"delivered:          {received}/{expected}")
+    print(f"publish rate:       {args.messages / publish_seconds:,.0f} messages/s per room")
+    print(f"end-to-end rate:    {args.messages / wall_seconds:,.0f} messages/s per room")
+    print(f"deliveries:         {received / wall_seconds:,.0f} frames/s")
+    if latencies:
+        print(f"latency p50/p99:    {statistics.median(latencies) * 1000:.1f} / {percentile(latencies, 0.99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4, help="receiver processes")
+    parser.add_argument("--receivers", type=int, default=50, help="room members per process")
+    parser.add_argument("--messages", type=int, default=1000, help="messages sent to the room")
+    parser.add_argument("--port", type=int, default=6390, help="port for the stand-in server")
+    parser.add_argument("--redis-url", default=None, help="use a real Redis instead of the stand-in")
+    parser.add_argument("--timeout", type=float, default=60.0, help="seconds a worker waits for messages")
+    main(parser.parse_args())
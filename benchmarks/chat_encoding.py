@@ -0,0 +1,80 @@
+"""
+CPU cost of encoding chat fan-out.
+
+For rooms of growing size, measures the CPU time spent building the
+frames of 1,000 fan-outs (one message delivered to every member):
+
+- per-recipient: json.dumps of the whole frame for every member, as
+  ChatCosumer.send_message used to do;
+- json / msgpack: the message encoded once per group event
+  (chat.codecs.encode_message, both encodings) and each member's frame
+  wrapped around the encoded bytes.
+
+It only exercises the encoding path, so it needs neither the database nor
+a channel layer.
+
+Usage:
+    python -m benchmarks.chat_encoding --sizes 10 100 500
+"""
+
+import argparse
+import json
+import time
+
+from chat.codecs import CODECS, encode_message
+
+FANOUTS = 1000
+
+
+def sample_message(i):
+    return {"user": f"member{i % 50}", "message": f"Message {i}: " + "lorem ipsum dolor sit amet " * 3}
+
+
+def per_recipient(size, fanouts):
+    for i in range(fanouts):
+        message = sample_message(i)
+        for _ in range(size):
+            json.dumps({"message": message})
+
+
+def encoded_once(codec):
+    def run(size, fanouts):
+        for i in range(fanouts):
+            encoded = encode_message(sample_message(i))[codec.name]
+            for _ in range(size):
+                codec.message_frame(encoded)
+    return run
+
+
+def frame_bytes(codec):
+    frame = codec.message_frame(encode_message(sample_message(0))[codec.name])
+    return len(frame.encode() if isinstance(frame, str) else frame)
+
+
+def measure(run, size, fanouts):
+    started = time.process_time()
+    run(size, fanouts)
+    return (time.process_time() - started) * FANOUTS / fanouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--fanouts", type=int, default=FANOUTS, help="fan-outs measured per room size")
+    args = parser.parse_args()
+
+    modes = {"per-recipient": per_recipient}
+    modes.update({name: encoded_once(codec) for name, codec in CODECS.items()})
+
+    print("frame bytes: " + ", ".join(
+        [f"per-recipient {len(json.dumps({'message': sample_message(0)}))}"]
+        + [f"{name} {frame_bytes(codec)}" for name, codec in CODECS.items()]
+    ))
+    print(f"{'room size':>10}" + "".join(f"{name + ' ms':>20}" for name in modes) + "   (CPU per 1,000 fan-outs)")
+    for size in args.sizes:
+        row = [measure(run, size, args.fanouts) * 1000 for run in modes.values()]
+        print(f"{size:>10}" + "".join(f"{ms:>20.1f}" for ms in row))
+
+
+if __name__ == "__main__":
+    main()
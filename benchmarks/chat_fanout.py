@@ -0,0 +1,105 @@
+"""
+Chat fan-out load test.
+
+Connects rooms of growing size to ``ChatCosumer``, sends one message per
+room and reports how many ``Message`` rows were written. With persistence
+out of the fan-out path the write count stays at one per message no matter
+how many sockets are in the room. The batched writer's flush counters are
+printed at the end.
+
+Usage:
+    python -m benchmarks.chat_fanout --sizes 1 10 50 200
+"""
+
+import argparse
+import asyncio
+import time
+
+import jwt
+
+from benchmarks import setup_django
+
+setup_django()
+
+from channels.db import database_sync_to_async  # noqa: E402
+from channels.routing import URLRouter  # noqa: E402
+from channels.sessions import CookieMiddleware  # noqa: E402
+from channels.testing import WebsocketCommunicator  # noqa: E402
+
+from apps.users.models import User  # noqa: E402
+from chat.models import Message, Room  # noqa: E402
+from chat.routing import ws_pattern  # noqa: E402
+from chat.writer import message_writer  # noqa: E402
+
+
+@database_sync_to_async
+def prepare_room(size):
+    user, _ = User.objects.get_or_create(email="fanout@bench.local", defaults={"name": "fanout"})
+    room = Room.objects.create(name=f"fanout-{size}")
+    return user, room
+
+
+@database_sync_to_async
+def count_messages(room):
+    return Message.objects.filter(room=room).count()
+
+
+@database_sync_to_async
+def drop_room(room):
+    room.delete()
+
+
+async def receive_chat_frame(client):
+    # Presence events for the joining sockets may arrive in between.
+    while True:
+        frame = await client.receive_json_from(timeout=10)
+        if frame.get("type") != "presence":
+            return frame
+
+
+async def run_room(size):
+    user, room = await prepare_room(size)
+    application = CookieMiddleware(URLRouter(ws_pattern))
+    # The consumer only accepts signed-in users.
+    cookie = f"jwt={jwt.encode({'id': user.id}, 'secret', algorithm='HS256')}".encode()
+    clients = [
+        WebsocketCommunicator(application, f"/ws/room/{room.id}/", headers=[(b"cookie", cookie)])
+        for _ in range(size)
+    ]
+
+    try:
+        for client in clients:
+            connected, _ = await client.connect()
+            assert connected
+            # Every socket gets the room's presence when it connects.
+            await client.receive_json_from(timeout=10)
+
+        before = await count_messages(room)
+        started = time.perf_counter()
+        await clients[0].send_json_to({"message": "hello", "room_id": room.id})
+        for client in clients:
+            await receive_chat_frame(client)
+        elapsed = time.perf_counter() - started
+        await message_writer.close()
+        writes = await count_messages(room) - before
+    finally:
+        for client in clients:
+            await client.disconnect()
+        await drop_room(room)
+
+    return writes, elapsed
+
+
+async def main(sizes):
+    print(f"{'room size':>10} {'db writes':>10} {'fan-out ms':>12}")
+    for size in sizes:
+        writes, elapsed = await run_room(size)
+        print(f"{size:>10} {writes:>10} {elapsed * 1000:>12.1f}")
+    print("writer:", message_writer.stats.as_dict())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 10, 50, 200])
+    args = parser.parse_args()
+    asyncio.run(main(args.sizes))
@@ -0,0 +1,143 @@
+"""
+Task claim concurrency stress test.
+
+Seeds a handful of open tasks and many executors, then fires thousands of
+parallel ``POST /api/v1/take-task/<id>/`` requests from a thread pool, each
+thread holding its own database connection. Every task must end up with
+exactly one executor: one 200 per task, a 409 for every other claim and no
+duplicate ``TakedTask`` rows. Seeded rows are deleted afterwards.
+
+Usage:
+    python -m benchmarks.claim_stress --tasks 50 --claims 5000 --concurrency 64
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+
+from benchmarks import setup_django
+
+setup_django()
+
+import jwt  # noqa: E402
+from django.db import connection  # noqa: E402
+from django.db.models import Count  # noqa: E402
+from django.test import Client  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from apps.tasks.models import CreatedTask, TakedTask  # noqa: E402
+from apps.users.models import User  # noqa: E402
+
+SEED_EMAIL = "bench-claims-{}@bench.local"
+SEED_EMAIL_PREFIX = "bench-claims-"
+
+
+def seed(tasks, executors):
+    User.objects.bulk_create(
+        [User(email=SEED_EMAIL.format(i), name=f"claimer{i}") for i in range(executors + 1)],
+        ignore_conflicts=True,
+    )
+    users = list(User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).order_by("id"))
+    creator, executors = users[0], users[1:]
+    created = CreatedTask.objects.bulk_create([
+        CreatedTask(
+            title=f"Claim {i}",
+            description="Seeded for the claim stress test",
+            category="web",
+            price=10,
+            expires_at=timezone.now() + timedelta(days=1),
+            creator=creator,
+        )
+        for i in range(tasks)
+    ])
+    return [task.id for task in created], executors
+
+
+def cleanup():
+    User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).delete()
+
+
+def claim_worker(jobs, start, results):
+    """
+    Send a share of the claims from one thread and its own DB connection.
+    """
+    client = Client()
+    start.wait()
+    try:
+        for task_id, executor_id in jobs:
+            client.cookies["jwt"] = jwt.encode({"id": executor_id}, "secret", algorithm="HS256")
+            started = time.perf_counter()
+            response = client.post(f"/api/v1/take-task/{task_id}/")
+            results.append((task_id, response.status_code, time.perf_counter() - started))
+    finally:
+        connection.close()
+
+
+def main(args):
+    # Every losing claim is a 409, which django.request logs as a warning.
+    logging.getLogger("django.request").setLevel(logging.ERROR)
+    cleanup()
+    task_ids, executors = seed(args.tasks, args.executors)
+    rng = random.Random(args.seed)
+    jobs = [(rng.choice(task_ids), rng.choice(executors).id) for _ in range(args.claims)]
+
+    try:
+        results = []
+        start = threading.Barrier(args.concurrency + 1)
+        threads = [
+            threading.Thread(target=claim_worker, args=(jobs[i::args.concurrency], start, results))
+            for i in range(args.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        start.wait()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        statuses = Counter(status for _, status, _ in results)
+        winners = Counter(task_id for task_id, status, _ in results if status == 200)
+        duplicates = (
+            TakedTask.objects.filter(task_id__in=task_ids)
+            .values("task_id")
+            .annotate(claims=Count("id"))
+            .filter(claims__gt=1)
+            .count()
+        )
+        contested = len(set(task_id for task_id, _ in jobs))
+        latencies = sorted(seconds for _, _, seconds in results)
+
+        print(f"claims:             {args.claims} over {args.tasks} tasks, {args.concurrency} threads")
+        print(f"responses:          {dict(sorted(statuses.items()))}")
+        print(f"tasks claimed:      {len(winners)}/{contested}")
+        print(f"double 200s:        {sum(1 for count in winners.values() if count > 1)}")
+        print(f"duplicate rows:     {duplicates}")
+        print(f"throughput:         {args.claims / elapsed:,.0f} claims/s")
+        print(f"latency p50/p99:    {statistics.median(latencies) * 1000:.1f} / "
+              f"{latencies[int(len(latencies) * 0.99) - 1] * 1000:.1f} ms")
+
+        ok = len(winners) == contested and max(winners.values()) == 1 and not duplicates
+        ok = ok and set(statuses) <= {200, 409}
+        print("result:            ", "OK" if ok else "FAILED")
+        if not ok:
+            raise SystemExit(1)
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tasks", type=int, default=50, help="open tasks to fight over")
+    parser.add_argument("--executors", type=int, default=200, help="distinct users sending claims")
+    parser.add_argument("--claims", type=int, default=5000, help="total claim requests")
+    parser.add_argument("--concurrency", type=int, default=64, help="parallel client threads")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for the claim order")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows afterwards")
+    main(parser.parse_args())
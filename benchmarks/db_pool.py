@@ -0,0 +1,104 @@
+"""
+Latency of /api/v1/me/tasks/ with and without database connection pooling.
+
+Seeds a user with a page of tasks, then starts the app once per
+DB_POOL_MODE (off, persistent, pool) on a local port and drives
+``GET /api/v1/me/tasks/`` as that user with many keep-alive connections.
+Each run reports requests/s and p50/p99 latency, followed by the pool
+statistics of the worker that answered /internal/db-pool/ (pool mode
+only). Seeded rows are deleted afterwards.
+
+Usage:
+    python -m benchmarks.db_pool --connections 128 --duration 20
+    python -m benchmarks.db_pool --modes off pool --pool-max-size 5
+"""
+
+import argparse
+import asyncio
+import json
+import urllib.request
+from datetime import timedelta
+
+from benchmarks import setup_django
+
+setup_django()
+
+import jwt  # noqa: E402
+from django.utils import timezone  # noqa: E402
+
+from apps.tasks.models import CreatedTask  # noqa: E402
+from apps.users.models import User  # noqa: E402
+from benchmarks.http_bench import load, report, start_server, stop_server, wait_until_ready  # noqa: E402
+
+SEED_EMAIL = "bench-db-pool@bench.local"
+
+POOL_MODES = ["off", "persistent", "pool"]
+
+
+def seed(tasks):
+    # Staff, so the same cookie can read /internal/db-pool/.
+    user, _ = User.objects.get_or_create(email=SEED_EMAIL, defaults={"name": "pool bench", "is_staff": True})
+    CreatedTask.objects.bulk_create([
+        CreatedTask(
+            title=f"Pool {i}",
+            description="Seeded for the connection pool benchmark",
+            category="web",
+            price=10,
+            expires_at=timezone.now() + timedelta(days=1),
+            creator=user,
+        )
+        for i in range(tasks)
+    ])
+    return user
+
+
+def cleanup():
+    User.objects.filter(email=SEED_EMAIL).delete()
+
+
+def fetch_pool_stats(port, headers):
+    request = urllib.request.Request(f"http://127.0.0.1:{port}/internal/db-pool/", headers=headers)
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())
+
+
+def main(args):
+    cleanup()
+    user = seed(args.tasks)
+    headers = {"Cookie": f"jwt={jwt.encode({'id': user.id}, 'secret', algorithm='HS256')}"}
+    url = f"http://127.0.0.1:{args.port}/api/v1/me/tasks/"
+
+    try:
+        print(f"{'pooling':<8} {'requests':>9} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}   statuses")
+        for mode in args.modes:
+            env = {"DB_POOL_MODE": mode, "DB_POOL_MAX_SIZE": str(args.pool_max_size)}
+            if args.workers:
+                env["WEB_CONCURRENCY"] = str(args.workers)
+            process = start_server(args.server_mode, args.port, env=env)
+            try:
+                wait_until_ready(url, headers=headers)
+                stats = asyncio.run(load(url, args.connections, args.duration, args.warmup, headers=headers))
+                pool = fetch_pool_stats(args.port, headers)
+            finally:
+                stop_server(process)
+            report(mode, stats, args.duration)
+            if len(pool) > 1:
+                print(f"{'':<8} pool: {pool}")
+    finally:
+        if not args.keep:
+            cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=POOL_MODES, default=POOL_MODES, help="DB_POOL_MODE values to compare")
+    parser.add_argument("--server-mode", choices=["dev", "prod"], default="prod", help="server mode, see http_bench")
+    parser.add_argument("--workers", type=int, default=None, help="WEB_CONCURRENCY for the prod server")
+    parser.add_argument("--pool-max-size", type=int, default=10, help="DB_POOL_MAX_SIZE per worker")
+    parser.add_argument("--tasks", type=int, default=20, help="tasks owned by the benchmark user")
+    parser.add_argument("--port", type=int, default=8765, help="port for the servers started by the script")
+    parser.add_argument("--connections", type=int, default=128, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured per mode")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows afterwards")
+    main(parser.parse_args())
@@ -0,0 +1,162 @@
+"""
+Bulk factories for benchmark data.
+
+Every row is written with bulk_create in batches and can be removed again
+with cleanup(): seeded users share an email prefix, and tasks, takes and
+messages cascade from them; seeded rooms share a name prefix.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db.models import F
+from django.utils import timezone
+
+from apps.tasks.models import CreatedTask, TakedTask
+from apps.users.models import User
+from chat.models import Message, Room
+
+SEED_EMAIL = "bench-suite-{}@bench.local"
+SEED_EMAIL_PREFIX = "bench-suite-"
+SEED_ROOM_PREFIX = "bench-suite-room-"
+PASSWORD = "bench-password"
+BATCH_SIZE = 5000
+
+CATEGORIES = [choice for choice in CreatedTask.CATEGORIES if choice != "all"]
+
+
+@dataclass
+class Seeded:
+    """
+    Ids of the seeded rows the load flows work with.
+    """
+    users: list = field(default_factory=list)
+    open_tasks: list = field(default_factory=list)
+    rooms: list = field(default_factory=list)
+    counts: dict = field(default_factory=dict)
+
+
+def create_users(count):
+    """
+    Verified users sharing one password, hashed once.
+    """
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        [
+            User(
+                email=SEED_EMAIL.format(i),
+                name=f"suite{i}",
+                password=password,
+                is_verified=True,
+                rating=i % 100,
+                about_me="Seeded for the benchmark suite",
+            )
+            for i in range(count)
+        ],
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    return list(User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).order_by("id").values_list("id", flat=True))
+
+
+def create_tasks(user_ids, count, rng):
+    """
+    Tasks spread over the users; every fifth one is completed and a few
+    have already expired, like a live feed.
+    """
+    now = timezone.now()
+    tasks = [
+        CreatedTask(
+            title=f"{rng.choice(['Build', 'Fix', 'Design', 'Write', 'Edit'])} {rng.choice(CATEGORIES)} task {i}",
+            description=f"Seeded task {i} for the benchmark suite. " * rng.randint(1, 5),
+            is_completed=i % 5 == 0,
+            expires_at=now + timedelta(days=rng.randint(-2, 30)),
+            category=rng.choice(CATEGORIES),
+            price=rng.randint(5, 2000),
+            creator_id=user_ids[i % len(user_ids)],
+        )
+        for i in range(count)
+    ]
+    CreatedTask.objects.bulk_create(tasks, batch_size=BATCH_SIZE)
+    # Keep the denormalized counters consistent with the rows.
+    per_user = {}
+    for task in tasks:
+        per_user[task.creator_id] = per_user.get(task.creator_id, 0) + 1
+    for user_id, created in per_user.items():
+        User.objects.filter(id=user_id).update(created_tasks=F("created_tasks") + created)
+    return [task.id for task in tasks]
+
+
+def create_takes(user_ids, task_ids, ratio, rng):
+    """
+    Give a share of the tasks an executor other than their creator.
+    """
+    creators = dict(CreatedTask.objects.filter(id__in=task_ids).values_list("id", "creator_id"))
+    taken = rng.sample(task_ids, int(len(task_ids) * ratio))
+    takes = []
+    for task_id in taken:
+        executor_id = rng.choice(user_ids)
+        if executor_id == creators[task_id]:
+            executor_id = user_ids[(user_ids.index(executor_id) + 1) % len(user_ids)]
+        takes.append(TakedTask(task_id=task_id, executor_id=executor_id))
+    TakedTask.objects.bulk_create(takes, batch_size=BATCH_SIZE, ignore_conflicts=True)
+    return set(taken)
+
+
+def create_rooms(count, messages_per_room, user_ids, rng):
+    """
+    Rooms with a history of messages from random users.
+    """
+    rooms = Room.objects.bulk_create([Room(name=f"{SEED_ROOM_PREFIX}{i}") for i in range(count)])
+    Message.objects.bulk_create(
+        [
+            Message(room_id=room.id, user_id=rng.choice(user_ids), content=f"Seeded message {n} in {room.name}")
+            for room in rooms
+            for n in range(messages_per_room)
+        ],
+        batch_size=BATCH_SIZE,
+    )
+    return [room.id for room in rooms]
+
+
+def seed(users=1000, tasks=20000, take_ratio=0.2, rooms=50, messages_per_room=200, seed=0):
+    """
+    Seed the whole data set.
+
+    Returns:
+        Seeded: Ids the flows need, plus the row counts.
+    """
+    rng = random.Random(seed)
+    user_ids = create_users(users)
+    task_ids = create_tasks(user_ids, tasks, rng)
+    taken = create_takes(user_ids, task_ids, take_ratio, rng)
+    room_ids = create_rooms(rooms, messages_per_room, user_ids, rng)
+
+    open_tasks = list(
+        CreatedTask.objects.filter(id__in=task_ids, is_completed=False, expires_at__gt=timezone.now())
+        .exclude(id__in=taken)
+        .values_list("id", flat=True)
+    )
+    rng.shuffle(open_tasks)
+    return Seeded(
+        users=user_ids,
+        open_tasks=open_tasks,
+        rooms=room_ids,
+        counts={
+            "users": len(user_ids),
+            "tasks": len(task_ids),
+            "takes": len(taken),
+            "rooms": len(room_ids),
+            "messages": len(room_ids) * messages_per_room,
+        },
+    )
+
+
+def cleanup():
+    """
+    Delete every seeded row.
+    """
+    Room.objects.filter(name__startswith=SEED_ROOM_PREFIX).delete()
+    User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).delete()
@@ -0,0 +1,189 @@
+"""
+HTTP throughput benchmark: dev server vs production server.
+
+Starts the app in each requested mode on a local port, drives it with a
+fixed number of keep-alive connections for a fixed time and reports
+requests/s and latency percentiles:
+
+    dev   python manage.py runserver (what SERVER_MODE=dev runs)
+    prod  gunicorn with uvicorn workers and docker/gunicorn.conf.py
+          (what SERVER_MODE=prod runs; WEB_CONCURRENCY sets the workers)
+
+Pass --url to measure an already running server instead. The numbers
+depend on the machine, the database and the seeded data, so compare the
+modes on the same box in the same run.
+
+Usage:
+    python -m benchmarks.http_bench --modes dev prod --connections 64 --duration 20
+    python -m benchmarks.http_bench --url http://localhost:8002/api/v1/tasks/
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+SERVER_COMMANDS = {
+    "dev": lambda port: [sys.executable, "manage.py", "runserver", f"127.0.0.1:{port}"],
+    "prod": lambda port: [
+        "gunicorn", "trivial.asgi:application",
+        "-c", "docker/gunicorn.conf.py",
+        "--bind", f"127.0.0.1:{port}",
+    ],
+}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+        self.statuses = {}
+
+
+async def read_response(reader):
+    """
+    Read one HTTP/1.1 response and return (status, keep_alive).
+    """
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            name, value = line.split(":", 1)
+            headers[name.strip().lower()] = value.strip()
+
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    elif headers.get("transfer-encoding") == "chunked":
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    return status, headers.get("connection", "").lower() != "close"
+
+
+async def connection_loop(url, deadline, measure_from, stats, headers=None):
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    extra = "".join(f"{name}: {value}\r\n" for name, value in (headers or {}).items())
+    request = (
+        f"GET {target or '/'} HTTP/1.1\r\n"
+        f"Host: {parts.netloc}\r\n"
+        "Accept: application/json\r\n"
+        f"{extra}"
+        "Connection: keep-alive\r\n\r\n"
+    ).encode()
+
+    writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(parts.hostname, parts.port or 80)
+            started = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+            if started >= measure_from:
+                stats.latencies.append(time.perf_counter() - started)
+                stats.statuses[status] = stats.statuses.get(status, 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            stats.errors += 1
+            if writer is not None:
+                writer.close()
+                writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+async def load(url, connections, duration, warmup, headers=None):
+    stats = Stats()
+    measure_from = time.perf_counter() + warmup
+    deadline = measure_from + duration
+    await asyncio.gather(*(
+        connection_loop(url, deadline, measure_from, stats, headers) for _ in range(connections)
+    ))
+    return stats
+
+
+def wait_until_ready(url, timeout=60, headers=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(urllib.request.Request(url, headers=headers or {}), timeout=5).read()
+            return
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"Server at {url} did not come up in {timeout}s")
+
+
+def start_server(mode, port, env=None):
+    process = subprocess.Popen(
+        SERVER_COMMANDS[mode](port),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        # Own process group, so the autoreloader child and the gunicorn
+        # workers are stopped together with the parent.
+        start_new_session=True,
+        env={**os.environ, **(env or {})},
+    )
+    return process
+
+
+def stop_server(process):
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def report(name, stats, duration):
+    latencies = sorted(stats.latencies)
+    count = len(latencies)
+    p50 = statistics.median(latencies) * 1000 if latencies else 0.0
+    p99 = latencies[max(0, int(count * 0.99) - 1)] * 1000 if latencies else 0.0
+    statuses = ", ".join(f"{code}: {total}" for code, total in sorted(stats.statuses.items()))
+    print(f"{name:<8} {count:>9} {count / duration:>10,.0f} {p50:>9.1f} {p99:>9.1f} {stats.errors:>7}   {statuses}")
+
+
+def main(args):
+    print(f"{'mode':<8} {'requests':>9} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}   statuses")
+    if args.url:
+        report("url", asyncio.run(load(args.url, args.connections, args.duration, args.warmup)), args.duration)
+        return
+
+    for mode in args.modes:
+        url = f"http://127.0.0.1:{args.port}{args.path}"
+        process = start_server(mode, args.port)
+        try:
+            wait_until_ready(url)
+            stats = asyncio.run(load(url, args.connections, args.duration, args.warmup))
+        finally:
+            stop_server(process)
+        report(mode, stats, args.duration)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=sorted(SERVER_COMMANDS), default=["dev", "prod"])
+    parser.add_argument("--path", default="/api/v1/tasks/", help="endpoint to request")
+    parser.add_argument("--url", default=None, help="benchmark a running server instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="port for the servers started by the script")
+    parser.add_argument("--connections", type=int, default=64, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds measured per mode")
+    parser.add_argument("--warmup", type=float, default=3.0, help="seconds of unmeasured load first")
+    main(parser.parse_args())
@@ -0,0 +1,253 @@
+"""
+Minimal Redis stand-in for channel layer tests.
+
+Speaks just enough of the RESP2/RESP3 protocol for
+``channels_redis.pubsub.RedisPubSubChannelLayer``: HELLO, PING, ECHO,
+SELECT, CLIENT, PUBLISH, SUBSCRIBE and UNSUBSCRIBE, plus the sorted set
+commands chat presence uses (ZADD, ZREM, ZRANGE, ZREMRANGEBYSCORE, ZCARD,
+EXPIRE and DEL; expiry is ignored). It keeps everything in memory and exists so cross-process fan-out can be exercised on one box
+without a real Redis server. It is not meant to run in production.
+
+Usage:
+    python -m benchmarks.redis_standin --port 6390
+"""
+
+import argparse
+import asyncio
+
+
+class RespError(Exception):
+    """
+    Error reply sent back to the client.
+    """
+
+
+class Push(list):
+    """
+    Out-of-band pub/sub reply; a plain array under RESP2.
+    """
+
+
+def encode(value, resp3=False):
+    """
+    Encode a Python value as a RESP reply.
+
+    Args:
+        value: None, int, bytes, str, RespError, or a list, Push or dict of those.
+        resp3 (bool): Use RESP3 types for nulls, maps and pushes.
+
+    Returns:
+        bytes: The encoded reply.
+    """
+    if value is None:
+        return b"_\r\n" if resp3 else b"$-1\r\n"
+    if isinstance(value, RespError):
+        return b"-ERR " + str(value).encode() + b"\r\n"
+    if isinstance(value, int):
+        return b":%d\r\n" % value
+    if isinstance(value, str):
+        return b"+" + value.encode() + b"\r\n"
+    if isinstance(value, bytes):
+        return b"$%d\r\n%s\r\n" % (len(value), value)
+    if isinstance(value, dict):
+        if not resp3:
+            return encode([item for pair in value.items() for item in pair])
+        return b"%%%d\r\n" % len(value) + b"".join(
+            encode(key, resp3) + encode(item, resp3) for key, item in value.items()
+        )
+    if isinstance(value, list):
+        marker = b">" if resp3 and isinstance(value, Push) else b"*"
+        return marker + b"%d\r\n" % len(value) + b"".join(encode(item, resp3) for item in value)
+    raise TypeError(f"Cannot encode {type(value)!r}")
+
+
+async def read_command(reader):
+    """
+    Read one command from the client.
+
+    Returns:
+        list[bytes]: The command and its arguments, or None on EOF.
+    """
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # Inline command, as sent by telnet or redis-cli --no-raw.
+        return line.split()
+
+    args = []
+    for _ in range(int(line[1:])):
+        header = await reader.readline()
+        length = int(header[1:])
+        data = await reader.readexactly(length + 2)
+        args.append(data[:-2])
+    return args
+
+
+class Client:
+    """
+    A connected client and the channels it is subscribed to.
+    """
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.channels = set()
+        self.resp3 = False
+
+    def send(self, value):
+        self.writer.write(encode(value, self.resp3))
+
+
+class RedisStandIn:
+    """
+    In-memory publish/subscribe server.
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.published = 0
+        self.sorted_sets = {}
+
+    async def handle(self, reader, writer):
+        client = Client(writer)
+        try:
+            while True:
+                command = await read_command(reader)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                self.dispatch(client, command[0].upper(), command[1:])
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self.unsubscribe(client, list(client.channels), reply=False)
+            writer.close()
+
+    def dispatch(self, client, name, args):
+        if name == b"HELLO":
+            if args and args[0] not in (b"2", b"3"):
+                client.send(RespError("NOPROTO unsupported protocol version"))
+                return
+            client.resp3 = bool(args) and args[0] == b"3"
+            client.send({
+                b"server": b"redis-standin",
+                b"version": b"7.0.0",
+                b"proto": 3 if client.resp3 else 2,
+                b"id": id(client),
+                b"mode": b"standalone",
+                b"role": b"master",
+                b"modules": [],
+            })
+        elif name == b"PING":
+            if client.channels and not client.resp3:
+                client.send([b"pong", args[0] if args else b""])
+            else:
+                client.send(args[0] if args else "PONG")
+        elif name == b"ECHO":
+            client.send(args[0])
+        elif name in (b"SELECT", b"CLIENT"):
+            client.send("OK")
+        elif name == b"PUBLISH":
+            client.send(self.publish(args[0], args[1]))
+        elif name == b"SUBSCRIBE":
+            self.subscribe(client, args)
+        elif name == b"UNSUBSCRIBE":
+            self.unsubscribe(client, args or list(client.channels))
+        elif name == b"ZADD":
+            members = self.sorted_sets.setdefault(args[0], {})
+            pairs = args[1:]
+            added = 0
+            for score, member in zip(pairs[::2], pairs[1::2]):
+                added += member not in members
+                members[member] = float(score)
+            client.send(added)
+        elif name == b"ZREM":
+            members = self.sorted_sets.get(args[0], {})
+            client.send(sum(members.pop(member, None) is not None for member in args[1:]))
+        elif name == b"ZRANGE":
+            ranked = sorted(self.sorted_sets.get(args[0], {}).items(), key=lambda item: (item[1], item[0]))
+            start, stop = int(args[1]), int(args[2])
+            stop = len(ranked) if stop == -1 else stop + 1
+            client.send([member for member, _ in ranked[start:stop]])
+        elif name == b"ZREMRANGEBYSCORE":
+            members = self.sorted_sets.get(args[0], {})
+            low, high = float(args[1]), float(args[2])
+            expired = [member for member, score in members.items() if low <= score <= high]
+            for member in expired:
+                del members[member]
+            client.send(len(expired))
+        elif name == b"ZCARD":
+            client.send(len(self.sorted_sets.get(args[0], {})))
+        elif name == b"EXPIRE":
+            client.send(int(args[0] in self.sorted_sets))
+        elif name == b"DEL":
+            client.send(sum(self.sorted_sets.pop(key, None) is not None for key in args))
+        elif name == b"QUIT":
+            client.send("OK")
+            client.writer.close()
+        else:
+            client.send(RespError(f"unknown command '{name.decode(errors='replace')}'"))
+
+    def publish(self, channel, message):
+        self.published += 1
+        receivers = self.subscribers.get(channel, ())
+        for receiver in receivers:
+            receiver.send(Push([b"message", channel, message]))
+        return len(receivers)
+
+    def subscribe(self, client, channels):
+        for channel in channels:
+            self.subscribers.setdefault(channel, set()).add(client)
+            client.channels.add(channel)
+            client.send(Push([b"subscribe", channel, len(client.channels)]))
+
+    def unsubscribe(self, client, channels, reply=True):
+        for channel in channels:
+            receivers = self.subscribers.get(channel)
+            if receivers is not None:
+                receivers.discard(client)
+                if not receivers:
+                    del self.subscribers[channel]
+            client.channels.discard(channel)
+            if reply:
+                client.send(Push([b"unsubscribe", channel, len(client.channels)]))
+        if reply and not channels:
+            client.send(Push([b"unsubscribe", None, 0]))
+
+
+async def serve(host="127.0.0.1", port=6390, ready=None):
+    """
+    Run the stand-in server until cancelled.
+
+    Args:
+        host (str): Interface to listen on.
+        port (int): Port to listen on.
+        ready: Optional multiprocessing event set once the server listens.
+    """
+    standin = RedisStandIn()
+    server = await asyncio.start_server(standin.handle, host, port)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def run(host="127.0.0.1", port=6390, ready=None):
+    """
+    Blocking entry point, usable as a multiprocessing target.
+    """
+    try:
+        asyncio.run(serve(host, port, ready))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6390)
+    args = parser.parse_args()
+    print(f"Redis stand-in listening on {args.host}:{args.port}")
+    run(args.host, args.port)
@@ -0,0 +1,391 @@
+"""
+Load-testing suite for the whole API.
+
+Seeds a realistic data set (users, tasks, takes, rooms and messages, see
+benchmarks/factories.py), starts the app on a local port (or uses --url)
+and drives each flow in turn with --concurrency workers for --duration
+seconds:
+
+    login       POST /api/v1/auth/login/ as a random seeded user
+    feed        GET /api/v1/tasks/, random page and category filters
+    my_tasks    GET /api/v1/me/tasks/ as a random seeded user
+    take_close  POST /api/v1/take-task/<id>/, then /api/v1/tasks/close/<id>/
+                on a fresh open task; recorded as 'take' and 'close'
+    chat        one sender and --room-size listeners per seeded room over
+                WebSocket; records the time until every listener has the
+                message
+
+The results (throughput, latency percentiles, status counts) are written
+as JSON, to stdout or --output, with the commit and the arguments, so runs
+can be compared over time; --compare prints the change against an older
+file. Seeded rows are deleted afterwards unless --keep is passed.
+
+Usage:
+    python -m benchmarks.suite --concurrency 32 --duration 20 --output run.json
+    python -m benchmarks.suite --flows feed my_tasks --compare run.json
+    python -m benchmarks.suite --url http://localhost:8002 --no-seed --keep
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import random
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+from urllib.parse import urlsplit
+
+from benchmarks import setup_django
+
+setup_django()
+
+import jwt  # noqa: E402
+
+from apps.tasks.models import CreatedTask  # noqa: E402
+from apps.users.models import User  # noqa: E402
+from benchmarks import factories  # noqa: E402
+from benchmarks.http_bench import start_server, stop_server, wait_until_ready  # noqa: E402
+from chat.models import Room  # noqa: E402
+
+try:
+    from websockets.asyncio.client import connect as ws_connect  # websockets >= 13
+    WS_HEADERS_ARG = "additional_headers"
+except ImportError:
+    from websockets import connect as ws_connect
+    WS_HEADERS_ARG = "extra_headers"
+
+FLOWS = ["login", "feed", "my_tasks", "take_close", "chat"]
+
+
+class HTTPClient:
+    """
+    One keep-alive HTTP/1.1 connection that reads whole responses.
+    """
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or 80
+        self.netloc = parts.netloc
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        """
+        Returns:
+            tuple: (status, body bytes)
+        """
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+        payload = json.dumps(body).encode() if body is not None else b""
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.netloc}", "Accept: application/json"]
+        lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+        if body is not None:
+            lines.extend(["Content-Type: application/json", f"Content-Length: {len(payload)}"])
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + payload)
+
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        response_headers = {}
+        for line in header_lines:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                response_headers[name.strip().lower()] = value.strip()
+
+        if "content-length" in response_headers:
+            content = await self.reader.readexactly(int(response_headers["content-length"]))
+        elif response_headers.get("transfer-encoding") == "chunked":
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunks.append((await self.reader.readexactly(size + 2))[:-2])
+                if size == 0:
+                    break
+            content = b"".join(chunks)
+        else:
+            content = b""
+
+        if response_headers.get("connection", "").lower() == "close":
+            self.close()
+        return int(status_line.split()[1]), content
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+
+class FlowStats:
+    """
+    Latencies and status counts of every operation of one flow.
+    """
+
+    def __init__(self):
+        self.operations = {}
+
+    def record(self, name, status, seconds):
+        latencies, statuses = self.operations.setdefault(name, ([], {}))
+        latencies.append(seconds)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def summary(self, duration):
+        results = {}
+        for name, (latencies, statuses) in self.operations.items():
+            latencies = sorted(latencies)
+            results[name] = {
+                "operations": len(latencies),
+                "throughput": round(len(latencies) / duration, 2),
+                "latency_ms": {
+                    "mean": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else None,
+                    "p50": percentile(latencies, 50),
+                    "p90": percentile(latencies, 90),
+                    "p99": percentile(latencies, 99),
+                    "max": round(latencies[-1] * 1000, 3) if latencies else None,
+                },
+                "statuses": dict(sorted(statuses.items())),
+            }
+        return results
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, int(round(len(sorted_values) * pct / 100)) - 1)
+    return round(sorted_values[index] * 1000, 3)
+
+
+def token_for(user_id):
+    return jwt.encode({"id": user_id}, "secret", algorithm="HS256")
+
+
+class Flows:
+    """
+    The flows, sharing the seeded ids and one random generator.
+    """
+
+    def __init__(self, base_url, seeded, args):
+        self.base_url = base_url
+        self.seeded = seeded
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.cookies = {user_id: f"jwt={token_for(user_id)}" for user_id in seeded.users}
+        self.names = dict(User.objects.filter(id__in=seeded.users).values_list("id", "name"))
+
+    def cookie(self):
+        return {"Cookie": self.cookies[self.rng.choice(self.seeded.users)]}
+
+    async def timed(self, stats, name, client, method, path, **kwargs):
+        started = time.perf_counter()
+        try:
+            status, content = await client.request(method, path, **kwargs)
+        except (OSError, asyncio.IncompleteReadError, ValueError):
+            client.close()
+            stats.record(name, "error", time.perf_counter() - started)
+            return None, None
+        stats.record(name, status, time.perf_counter() - started)
+        return status, content
+
+    async def login(self, stats, deadline):
+        client = HTTPClient(self.base_url)
+        while time.perf_counter() < deadline:
+            user = self.rng.randrange(len(self.seeded.users))
+            body = {"email": factories.SEED_EMAIL.format(user), "password": factories.PASSWORD}
+            await self.timed(stats, "login", client, "POST", "/api/v1/auth/login/", body=body)
+        client.close()
+
+    async def feed(self, stats, deadline):
+        client = HTTPClient(self.base_url)
+        while time.perf_counter() < deadline:
+            query = f"?page={self.rng.randint(1, 20)}"
+            if self.rng.random() < 0.3:
+                query += f"&category={self.rng.choice(factories.CATEGORIES)}"
+            if self.rng.random() < 0.5:
+                query += "&is_completed=false"
+            await self.timed(stats, "feed", client, "GET", f"/api/v1/tasks/{query}")
+        client.close()
+
+    async def my_tasks(self, stats, deadline):
+        client = HTTPClient(self.base_url)
+        while time.perf_counter() < deadline:
+            await self.timed(stats, "my_tasks", client, "GET", "/api/v1/me/tasks/", headers=self.cookie())
+        client.close()
+
+    async def take_close(self, stats, deadline):
+        client = HTTPClient(self.base_url)
+        while time.perf_counter() < deadline and self.seeded.open_tasks:
+            task_id = self.seeded.open_tasks.pop()
+            headers = self.cookie()
+            status, content = await self.timed(stats, "take", client, "POST", f"/api/v1/take-task/{task_id}/", headers=headers)
+            if status != 200:
+                continue
+            taked_task_id = json.loads(content)["taked_task_id"]
+            await self.timed(stats, "close", client, "POST", f"/api/v1/tasks/close/{taked_task_id}/", headers=headers)
+        client.close()
+
+    async def chat(self, stats, deadline, room_id):
+        url = self.base_url.replace("http", "ws", 1) + f"/ws/room/{room_id}/"
+        user_id = self.rng.choice(self.seeded.users)
+        name = self.names[user_id]
+        headers = {WS_HEADERS_ARG: {"Cookie": self.cookies[user_id]}}
+        sockets = []
+        try:
+            for _ in range(self.args.room_size + 1):
+                sockets.append(await ws_connect(url, **headers))
+            sender, listeners = sockets[0], sockets[1:]
+            while time.perf_counter() < deadline:
+                text = uuid.uuid4().hex
+                started = time.perf_counter()
+                await sender.send(json.dumps({"message": text, "room_id": room_id, "user": name}))
+                try:
+                    await asyncio.wait_for(
+                        asyncio.gather(*(wait_for_message(listener, text) for listener in listeners)),
+                        timeout=10,
+                    )
+                except asyncio.TimeoutError:
+                    stats.record("chat_fanout", "timeout", time.perf_counter() - started)
+                    continue
+                stats.record("chat_fanout", "ok", time.perf_counter() - started)
+                # The sender hears its own message too; drain it.
+                await wait_for_message(sender, text)
+        except OSError:
+            stats.record("chat_fanout", "error", 0.0)
+        finally:
+            for socket in sockets:
+                await socket.close()
+
+
+async def wait_for_message(socket, text):
+    while True:
+        frame = json.loads(await socket.recv())
+        messages = frame.get("messages") or [frame.get("message", {})]
+        if any(message.get("message") == text for message in messages):
+            return
+
+
+async def run_flow(flows, name, args):
+    stats = FlowStats()
+    deadline = time.perf_counter() + args.duration
+    if name == "chat":
+        rooms = flows.seeded.rooms[:args.concurrency]
+        workers = [flows.chat(stats, deadline, room_id) for room_id in rooms]
+    else:
+        workers = [getattr(flows, name)(stats, deadline) for _ in range(args.concurrency)]
+    started = time.perf_counter()
+    await asyncio.gather(*workers)
+    return stats.summary(time.perf_counter() - started)
+
+
+def existing_seed():
+    """
+    Ids of a data set left by an earlier run with --keep.
+    """
+    users = list(User.objects.filter(email__startswith=factories.SEED_EMAIL_PREFIX).order_by("id").values_list("id", flat=True))
+    open_tasks = list(
+        CreatedTask.objects.filter(creator_id__in=users, is_completed=False, taked_tasks__isnull=True)
+        .values_list("id", flat=True)
+    )
+    rooms = list(Room.objects.filter(name__startswith=factories.SEED_ROOM_PREFIX).values_list("id", flat=True))
+    return factories.Seeded(users=users, open_tasks=open_tasks, rooms=rooms, counts={"users": len(users)})
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous, current):
+    """
+    Print throughput and p50/p99 changes per operation.
+    """
+    print(f"{'operation':<14} {'ops/s':>18} {'p50 ms':>20} {'p99 ms':>20}", file=sys.stderr)
+    for flow, operations in current["flows"].items():
+        for name, now in operations.items():
+            before = previous.get("flows", {}).get(flow, {}).get(name)
+            if before is None:
+                continue
+            cells = [
+                f"{before['throughput']:>7} -> {now['throughput']:<7}",
+                f"{before['latency_ms']['p50']} -> {now['latency_ms']['p50']}",
+                f"{before['latency_ms']['p99']} -> {now['latency_ms']['p99']}",
+            ]
+            print(f"{name:<14} {cells[0]:>18} {cells[1]:>20} {cells[2]:>20}", file=sys.stderr)
+
+
+def main(args):
+    if args.no_seed:
+        seeded = existing_seed()
+    else:
+        factories.cleanup()
+        seeded = factories.seed(
+            users=args.users,
+            tasks=args.tasks,
+            take_ratio=args.take_ratio,
+            rooms=args.rooms,
+            messages_per_room=args.messages,
+            seed=args.seed,
+        )
+
+    process = None
+    base_url = args.url.rstrip("/") if args.url else f"http://127.0.0.1:{args.port}"
+    try:
+        if not args.url:
+            process = start_server(args.mode, args.port)
+        wait_until_ready(f"{base_url}/api/v1/tasks/")
+
+        flows = Flows(base_url, seeded, args)
+        results = {}
+        for name in args.flows:
+            results[name] = asyncio.run(run_flow(flows, name, args))
+            print(f"{name} done", file=sys.stderr)
+    finally:
+        if process is not None:
+            stop_server(process)
+        if not args.keep:
+            factories.cleanup()
+
+    report = {
+        "started_at": datetime.now(dt_timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "server": args.url or args.mode,
+        "arguments": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "seeded": seeded.counts,
+        "flows": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as previous:
+            compare(json.load(previous), report)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flows", nargs="+", choices=FLOWS, default=FLOWS)
+    parser.add_argument("--concurrency", type=int, default=32, help="workers per flow (rooms for chat)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per flow")
+    parser.add_argument("--room-size", type=int, default=20, help="listeners per chat room")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--take-ratio", type=float, default=0.2, help="share of tasks already taken")
+    parser.add_argument("--rooms", type=int, default=50)
+    parser.add_argument("--messages", type=int, default=200, help="history messages per room")
+    parser.add_argument("--seed", type=int, default=0, help="random seed for data and requests")
+    parser.add_argument("--mode", choices=["dev", "prod"], default="prod", help="server mode, see http_bench")
+    parser.add_argument("--port", type=int, default=8765, help="port for the server started by the script")
+    parser.add_argument("--url", default=None, help="use a running server instead of starting one")
+    parser.add_argument("--no-seed", action="store_true", help="reuse the data kept by an earlier --keep run")
+    parser.add_argument("--keep", action="store_true", help="keep the seeded rows afterwards")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    parser.add_argument("--compare", default=None, help="earlier JSON report to compare against")
+    main(parser.parse_args())
@@ -0,0 +1,136 @@
+"""
+Task feed index benchmark (PostgreSQL).
+
+Seeds a large number of tasks and runs EXPLAIN ANALYZE for the query
+shapes of the task endpoints, once with the feed indexes and once without
+them. The "without" run drops the indexes inside a transaction that is
+rolled back, so the schema is never changed.
+
+Usage:
+    python -m benchmarks.task_indexes --seed 1000000
+    python -m benchmarks.task_indexes
+    python -m benchmarks.task_indexes --cleanup
+"""
+
+import argparse
+import re
+import time
+
+from benchmarks import setup_django
+
+setup_django()
+
+from django.db import connection, transaction  # noqa: E402
+
+from apps.tasks.models import CreatedTask  # noqa: E402
+from apps.users.models import User  # noqa: E402
+
+SEED_EMAIL = "bench-indexes-{}@bench.local"
+SEED_EMAIL_PREFIX = "bench-indexes-"
+
+# Indexes added for the feed; dropped for the "before" run.
+FEED_INDEXES = ["created_tasks_open_idx", "created_tasks_open_cat_idx", "created_tasks_creator_idx"]
+
+
+def seed(tasks, users):
+    """
+    Insert seed users and tasks with server-side generate_series.
+    """
+    User.objects.bulk_create(
+        [User(email=SEED_EMAIL.format(i), name=f"bench{i}") for i in range(users)],
+        ignore_conflicts=True,
+    )
+    creator_ids = list(User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).values_list("id", flat=True))
+    categories = [choice for choice in CreatedTask.CATEGORIES if choice != "all"]
+
+    started = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO created_tasks
+                (title, description, is_completed, created_at, expires_at, category, price, creator_id)
+            SELECT
+                'Task ' || n,
+                'Seeded task ' || n,
+                n %% 5 = 0,
+                now() - (n || ' seconds')::interval,
+                now() + ((n %% 30) || ' days')::interval,
+                (%s::text[])[1 + n %% %s],
+                (n %% 1000) + 0.99,
+                (%s::bigint[])[1 + n %% %s]
+            FROM generate_series(1, %s) AS n
+            """,
+            [categories, len(categories), creator_ids, len(creator_ids), tasks],
+        )
+        cursor.execute("ANALYZE created_tasks")
+    print(f"Seeded {tasks:,} tasks for {len(creator_ids):,} users in {time.perf_counter() - started:.1f}s")
+
+
+def cleanup():
+    deleted, _ = User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).delete()
+    print(f"Deleted {deleted:,} rows")
+
+
+def query_shapes():
+    """
+    Querysets shaped like the ones the task endpoints run.
+    """
+    creator_id = User.objects.filter(email__startswith=SEED_EMAIL_PREFIX).values_list("id", flat=True).first()
+    feed = CreatedTask.objects.select_related("creator")
+    return {
+        "open feed, first page": feed.filter(is_completed=False)[:10],
+        "open feed, page 500": feed.filter(is_completed=False)[5000:5010],
+        "open feed by category": feed.filter(is_completed=False, category="design")[:10],
+        "open feed, cursor page": feed.filter(is_completed=False).order_by("-created_at", "id")[:10],
+        "tasks of one creator": CreatedTask.objects.filter(creator_id=creator_id).select_related("creator"),
+    }
+
+
+def explain(queryset):
+    plan = queryset.explain(analyze=True, buffers=True)
+    match = re.search(r"Execution Time: ([\d.]+) ms", plan)
+    return float(match.group(1)) if match else float("nan"), plan
+
+
+def run(with_indexes, show_plans):
+    results = {}
+    with transaction.atomic():
+        if not with_indexes:
+            with connection.cursor() as cursor:
+                for name in FEED_INDEXES:
+                    cursor.execute(f"DROP INDEX IF EXISTS {name}")
+                # The plain creator_id index the composite one replaced.
+                cursor.execute("CREATE INDEX bench_created_tasks_creator_id ON created_tasks (creator_id)")
+        for name, queryset in query_shapes().items():
+            # Warm the cache so both runs read from shared buffers.
+            explain(queryset)
+            results[name], plan = explain(queryset)
+            if show_plans:
+                print(f"--- {name} ({'with' if with_indexes else 'without'} indexes)\n{plan}\n")
+        transaction.set_rollback(True)
+    return results
+
+
+def main(args):
+    if args.cleanup:
+        cleanup()
+        return
+    if args.seed:
+        seed(args.seed, args.users)
+
+    before = run(with_indexes=False, show_plans=args.plans)
+    after = run(with_indexes=True, show_plans=args.plans)
+
+    print(f"{'query':<26} {'without (ms)':>13} {'with (ms)':>10} {'speedup':>8}")
+    for name in before:
+        speedup = before[name] / after[name] if after[name] else float("inf")
+        print(f"{name:<26} {before[name]:>13.2f} {after[name]:>10.2f} {speedup:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", type=int, default=0, help="number of tasks to insert before measuring")
+    parser.add_argument("--users", type=int, default=1000, help="number of task creators to seed")
+    parser.add_argument("--plans", action="store_true", help="print the full EXPLAIN output")
+    parser.add_argument("--cleanup", action="store_true", help="delete seeded users and tasks")
+    main(parser.parse_args())
@@ -0,0 +1,106 @@
+"""
+Wire encodings for chat sockets, negotiated as WebSocket subprotocols.
+
+A client that offers 'trivial.msgpack' gets binary MessagePack frames and
+may send them; everybody else gets JSON text frames, as before. Frames
+have the same shape in both encodings.
+
+A chat message is encoded once per group event, in every encoding, by
+the consumer that received it (see encode_message). Recipients then
+build their frame by wrapping the pre-encoded bytes in a small envelope
+instead of serializing the payload again. A batch of messages is wrapped
+the same way, so fan-out to N sockets costs one encoding per format, not
+N.
+"""
+
+import json
+
+import msgpack
+
+JSON_PROTOCOL = "trivial.json"
+MSGPACK_PROTOCOL = "trivial.msgpack"
+
+
+class JSONCodec:
+    """
+    JSON text frames.
+    """
+    name = "json"
+    protocol = JSON_PROTOCOL
+
+    def encode(self, value):
+        return json.dumps(value, separators=(",", ":"))
+
+    def decode(self, data):
+        return json.loads(data)
+
+    def message_frame(self, encoded):
+        return '{"message":' + encoded + '}'
+
+    def batch_frame(self, encoded):
+        return '{"messages":[' + ",".join(encoded) + ']}'
+
+
+class MsgPackCodec:
+    """
+    MessagePack binary frames.
+    """
+    name = "msgpack"
+    protocol = MSGPACK_PROTOCOL
+
+    def __init__(self):
+        # A one-entry map: fixmap marker, then the packed key.
+        self._message_prefix = b"\x81" + msgpack.packb("message")
+        self._batch_prefix = b"\x81" + msgpack.packb("messages")
+
+    def encode(self, value):
+        return msgpack.packb(value)
+
+    def decode(self, data):
+        return msgpack.unpackb(data)
+
+    def message_frame(self, encoded):
+        return self._message_prefix + encoded
+
+    def batch_frame(self, encoded):
+        return self._batch_prefix + self._array_header(len(encoded)) + b"".join(encoded)
+
+    @staticmethod
+    def _array_header(length):
+        if length < 16:
+            return bytes((0x90 | length,))
+        if length < 1 << 16:
+            return b"\xdc" + length.to_bytes(2, "big")
+        return b"\xdd" + length.to_bytes(4, "big")
+
+
+json_codec = JSONCodec()
+msgpack_codec = MsgPackCodec()
+CODECS = {codec.name: codec for codec in (json_codec, msgpack_codec)}
+
+PROTOCOLS = {codec.protocol: codec for codec in CODECS.values()}
+
+
+def negotiate(subprotocols):
+    """
+    Pick the codec for a socket from the subprotocols the client offered.
+
+    Returns:
+        tuple: (codec, subprotocol to accept or None). The client's first
+        supported choice wins; without one the socket speaks JSON.
+    """
+    for protocol in subprotocols:
+        if protocol in PROTOCOLS:
+            return PROTOCOLS[protocol], protocol
+    return json_codec, None
+
+
+def encode_message(message):
+    """
+    Encode a chat message once in every encoding.
+
+    Returns:
+        dict: Codec name to encoded message, ready to be put in a group
+        event and wrapped by each recipient's codec.
+    """
+    return {name: codec.encode(message) for name, codec in CODECS.items()}
@@ -6,18 +6,34 @@ in the URL), and broadcasts any messages it receives to all members
 of the room.
 
 The consumer also handles sending messages from the room to the
-connected clients.
+connected clients, through a per-socket buffer that batches them and
+sheds clients that fall behind (see outbound.py), and keeps the room's
+presence (see presence.py) up to date. Only users signed in with the jwt
+cookie can connect, and messages are sent in their name.
+
+Sockets speak JSON, or MessagePack when the client offers the
+'trivial.msgpack' subprotocol (see codecs.py). Each chat message is
+encoded once, by the consumer that received it, and the encoded bytes
+travel with the group event to every member of the room.
 """
 
-import json
+import logging
 from channels.generic.websocket import AsyncWebsocketConsumer
-from channels.db import database_sync_to_async
 
-from apps.users.models import User
-from .models import Room, Message
+from apps.users.authentication import aauthenticate_token
+from trivial.log import log_event
+from trivial.metrics import InstrumentedConsumerMixin
+from .codecs import encode_message, negotiate
+from .models import Message
+from .outbound import outbound_buffer
+from .presence import presence, presence_notifier
+from .rooms import aget_room
+from .writer import message_writer
+
+logger = logging.getLogger(__name__)
 
 
-class ChatCosumer(AsyncWebsocketConsumer):
+class ChatCosumer(InstrumentedConsumerMixin, AsyncWebsocketConsumer):
     """
     A consumer for handling WebSocket connections for chat rooms.
     """
@@ -27,11 +43,32 @@ class ChatCosumer(AsyncWebsocketConsumer):
         Connect to a room (identified by the room_id parameter in the URL).
 
         This method is called when a WebSocket connection is established.
+        The user is authenticated here, once, from the jwt cookie (see
+        get_user_from_cookie), the room comes from the room cache (see
+        rooms.py), and both are kept on the consumer for the life of the
+        socket. Anonymous sockets and unknown rooms are
+        rejected. The encoding is picked from the offered subprotocols.
         """
-        self.room_id = f"room_{self.scope['url_route']['kwargs']['room_id']}"
+        self.room_pk = self.scope['url_route']['kwargs']['room_id']
+        self.room_id = f"room_{self.room_pk}"
+        token = self.scope.get('cookies', {}).get('jwt')
+        self.user = await aauthenticate_token(token) if token else None
+        self.room = await aget_room(self.room_pk) if self.user is not None else None
+        if self.room is None:
+            await self.close()
+            return
+
+        self.codec, subprotocol = negotiate(self.scope.get('subprotocols', []))
+        self.outbound = outbound_buffer(self)
         await self.channel_layer.group_add(self.room_id, self.channel_name)
         
-        await self.accept()
+        await self.accept(subprotocol=subprotocol)
+
+        await presence.join(self.room_pk, self.channel_name, self.user.id, self.user.name)
+        presence_notifier.changed(self.channel_layer, self.room_pk, self.user.id, 1)
+        # The new socket gets the current users right away; the others
+        # hear about it with the next coalesced presence event.
+        await self.send_presence(await presence.online(self.room_pk))
 
     async def disconnect(self, close_code):
         """
@@ -39,50 +76,85 @@ class ChatCosumer(AsyncWebsocketConsumer):
 
         This method is called when a WebSocket connection is closed.
         """
+        if getattr(self, 'room', None) is None:
+            # Rejected in connect; never joined the group or the presence.
+            return
         await self.channel_layer.group_discard(self.room_id, self.channel_name)
+        self.outbound.cancel()
+        await presence.leave(self.room_pk, self.channel_name)
+        presence_notifier.changed(self.channel_layer, self.room_pk, self.user.id, -1)
         self.close(close_code)
 
-    async def receive(self, text_data):
+    async def receive(self, text_data=None, bytes_data=None):
         """
         Receive a message from the client.
 
         This method is called when a message is received from the client.
+        The message is persisted here, exactly once, before it is broadcast
+        to the room. Heartbeat frames only keep the socket's presence alive.
+
+        The author is always the user the socket was authenticated as; a
+        'user' field sent by the client is ignored.
         """
-        print("Recieved data")
-        data_json = json.loads(text_data)
-        print(data_json)
+        raw = text_data if text_data is not None else bytes_data
+        data = self.codec.decode(raw)
+        if data.get("type") == "heartbeat":
+            await presence.heartbeat(self.room_pk, self.channel_name)
+            return
+        log_event(logger, 'chat.receive', level=logging.DEBUG, room=self.room_pk, bytes=len(raw))
+        await self.create_message(data=data)
+
         event = {
             "type": "send_message",
-            "message": data_json,
+            "encoded": encode_message({
+                "user": self.user.name,
+                "message": data["message"],
+            }),
         }
-        
+
         await self.channel_layer.group_send(self.room_id, event)
         
     async def send_message(self, event):
         """
         Send a message from the room to the connected clients.
 
-        This method is called when a message is received from the room.
+        This method is called for every member of the room, so it only
+        queues the already persisted and encoded message for the socket; it
+        neither serializes nor waits for a slow client.
         """
-        print("Sending message")
-        data = event["message"]
-        await self.create_message(data=data)
-        
-        response = {
-            "user": data["user"],
-            "message": data["message"],
-        }
-        
-        await self.send(text_data=json.dumps({"message": response}))
-    
-    @database_sync_to_async
-    def create_message(self, data):
+        log_event(logger, 'chat.send', level=logging.DEBUG, room=self.room_pk)
+        self.outbound.push_message(event["encoded"][self.codec.name])
+
+    async def presence_update(self, event):
+        """
+        Send the room's online users, coalesced by the presence notifier.
         """
-        Create a new message in the database.
+        await self.send_presence(event["users"])
 
-        This method is called when a message is received from the room.
+    async def send_presence(self, users):
+        self.outbound.push_frame({
+            "type": "presence",
+            "room_id": self.room_pk,
+            "users": users,
+            "count": len(users),
+        })
+
+    async def send_frame(self, frame):
+        """
+        Write one encoded frame from the outbound buffer to the socket.
         """
-        user = User.objects.filter(name=data["user"]).first()
-        room = Room.objects.get(id=data["room_id"])
-        Message.objects.create(room=room, user=user, content=data["message"])
+        if isinstance(frame, bytes):
+            await self.send(bytes_data=frame)
+        else:
+            await self.send(text_data=frame)
 
+    async def create_message(self, data):
+        """
+        Queue a new message for the background writer.
+
+        This method is called once per message, by the consumer that
+        received it from the client. It does not query the database:
+        user and room were resolved in connect.
+        """
+        message = Message(room_id=self.room.id, user_id=self.user.id, content=data["message"])
+        await message_writer.submit(message)
@@ -0,0 +1,43 @@
+from django.db import connections, models
+
+
+class RoomManager(models.Manager):
+    def ensure(self, room_id, name):
+        """
+        Get the room with the given id, creating it if it does not exist.
+
+        Runs a single INSERT ... ON CONFLICT DO NOTHING, combined with a read
+        of the existing row, so concurrent first joins of the same room
+        cannot fail on the primary key and an existing room is not written.
+
+        Args:
+            room_id (int): The ID of the room.
+            name (str): Name given to the room if it is created.
+
+        Returns:
+            tuple: (id, name) of the room.
+        """
+        table = self.model._meta.db_table
+
+        with connections[self.db].cursor() as cursor:
+            cursor.execute(
+                f"""
+                WITH created AS (
+                    INSERT INTO {table} (id, name) VALUES (%s, %s)
+                    ON CONFLICT (id) DO NOTHING
+                    RETURNING id, name
+                )
+                SELECT id, name FROM created
+                UNION ALL
+                SELECT id, name FROM {table} WHERE id = %s
+                LIMIT 1
+                """,
+                [room_id, name, room_id],
+            )
+            row = cursor.fetchone()
+
+        if row is None:
+            # The room was created by a transaction that committed after
+            # this statement's snapshot; it is visible to a new one.
+            row = self.filter(id=room_id).values_list("id", "name").get()
+        return row
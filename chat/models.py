@@ -1,6 +1,7 @@
 from django.db import models
 
 from apps.users.models import User
+from chat.managers import RoomManager
 
 
 class Room(models.Model):
@@ -9,6 +10,8 @@ class Room(models.Model):
     """
     id = models.AutoField(primary_key=True)
     name = models.CharField(max_length=100)
+
+    objects = RoomManager()
     
     class Meta:
         db_table = 'rooms'
@@ -30,6 +33,10 @@ class Message(models.Model):
     
     class Meta:
         db_table = 'messages'
+        indexes = [
+            # Serves the keyset-paginated room history, see RoomHistoryView.
+            models.Index(fields=['room', 'time_stamp', 'id'], name='messages_room_ts_id_idx'),
+        ]
     
     def __str__(self):
         return self.content
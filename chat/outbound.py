@@ -0,0 +1,163 @@
+"""
+Per-connection outbound buffer for chat sockets.
+
+Group events only append to the buffer, so a consumer keeps reading its
+channel even while its client is slow to receive, and the channel layer
+never has to drop messages for the rest of the room. A background task
+per socket writes the buffer out:
+
+- chat messages arriving within WINDOW_MS, or while the previous frame
+  was still being written, go out as one frame of up to MAX_BATCH
+  messages: {"messages": [...]} ({"message": ...} when there is only one),
+  wrapped around the pre-encoded messages (see codecs.py);
+- other frames (presence) are written as they are, in order;
+- a socket with MAX_PENDING frames waiting is too far behind: its backlog
+  is dropped and it is closed with 1013 (try again later), so the client
+  reconnects and reloads the history instead of lagging forever.
+"""
+
+import asyncio
+import logging
+
+from django.conf import settings
+
+from trivial.metrics import Counter, Histogram
+from .codecs import json_codec
+
+logger = logging.getLogger(__name__)
+
+SLOW_CLIENT_CLOSE_CODE = 1013
+
+ws_frames_coalesced = Counter(
+    'trivial_ws_messages_coalesced', 'Chat messages sent inside a frame with other messages.',
+    ('consumer',),
+)
+ws_messages_dropped = Counter(
+    'trivial_ws_messages_dropped', 'Outbound frames dropped because the client fell behind.',
+    ('consumer',),
+)
+ws_slow_disconnects = Counter(
+    'trivial_ws_slow_disconnects', 'Sockets closed because the client fell behind.',
+    ('consumer',),
+)
+ws_batch_size = Histogram(
+    'trivial_ws_batch_size', 'Chat messages per outbound frame.',
+    ('consumer',), buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+
+
+class OutboundBuffer:
+    """
+    Buffers a socket's outgoing frames and writes them from one task.
+
+    Args:
+        send_frame: Coroutine function writing one encoded frame.
+        close: Coroutine function closing the socket with a code.
+        consumer (str): Consumer name for the metrics.
+        codec: Encoding of the socket, from codecs.py.
+        window_ms (int): How long the first message waits for others.
+        max_batch (int): Most chat messages in one frame.
+        max_pending (int): Frames waiting before the socket is closed.
+    """
+
+    def __init__(self, send_frame, close, consumer, codec=json_codec, window_ms=20, max_batch=50, max_pending=500):
+        self.send_frame = send_frame
+        self.close = close
+        self.consumer = consumer
+        self.codec = codec
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.max_pending = max_pending
+        self.closed = False
+        # (is_chat_message, payload) in the order they were queued.
+        self._pending = []
+        self._task = None
+
+    def push_message(self, encoded):
+        """
+        Queue a chat message, already encoded with the socket's codec; it
+        may share a frame with others.
+        """
+        self._enqueue(True, encoded)
+
+    def push_frame(self, frame):
+        """
+        Queue a frame (a dict) that is encoded and sent on its own.
+        """
+        self._enqueue(False, frame)
+
+    def cancel(self):
+        """
+        Stop writing and forget the backlog, e.g. on disconnect.
+        """
+        self.closed = True
+        self._pending.clear()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _enqueue(self, coalesce, payload):
+        if self.closed:
+            return
+        if len(self._pending) >= self.max_pending:
+            self._shed()
+            return
+        self._pending.append((coalesce, payload))
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def _shed(self):
+        ws_messages_dropped.inc(len(self._pending) + 1, consumer=self.consumer)
+        ws_slow_disconnects.inc(consumer=self.consumer)
+        logger.warning("Closing %s socket %d frames behind", self.consumer, len(self._pending))
+        self.cancel()
+        asyncio.get_running_loop().create_task(self.close(SLOW_CLIENT_CLOSE_CODE))
+
+    async def _run(self):
+        try:
+            if self.window:
+                await asyncio.sleep(self.window)
+            while self._pending:
+                await self.send_frame(self._next_frame())
+        except Exception:
+            logger.exception("Could not write to %s socket", self.consumer)
+            self.cancel()
+        finally:
+            if self._task is asyncio.current_task():
+                self._task = None
+
+    def _next_frame(self):
+        coalesce, payload = self._pending[0]
+        if not coalesce:
+            del self._pending[0]
+            return self.codec.encode(payload)
+
+        count = 1
+        while count < min(len(self._pending), self.max_batch) and self._pending[count][0]:
+            count += 1
+        batch = [message for _, message in self._pending[:count]]
+        del self._pending[:count]
+
+        ws_batch_size.observe(count, consumer=self.consumer)
+        if count == 1:
+            return self.codec.message_frame(batch[0])
+        ws_frames_coalesced.inc(count, consumer=self.consumer)
+        return self.codec.batch_frame(batch)
+
+
+_config = getattr(settings, "CHAT_OUTBOUND", {})
+
+
+def outbound_buffer(consumer):
+    """
+    Buffer for a consumer instance, configured from CHAT_OUTBOUND.
+    """
+    return OutboundBuffer(
+        consumer.send_frame,
+        lambda code: consumer.close(code=code),
+        type(consumer).__name__,
+        codec=consumer.codec,
+        window_ms=_config.get("WINDOW_MS", 20),
+        max_batch=_config.get("MAX_BATCH", 50),
+        max_pending=_config.get("MAX_PENDING", 500),
+    )
@@ -0,0 +1,223 @@
+"""
+Who is connected to which chat room.
+
+Every authenticated socket is registered under its room with an expiry.
+The client refreshes it with a heartbeat frame every HEARTBEAT_INTERVAL
+seconds, so sockets of a crashed server process drop out after TTL
+seconds even though they never disconnected cleanly.
+
+Two registries share one interface: MemoryPresence keeps one process's
+sockets (for the in-memory channel layer) and RedisPresence keeps them in
+one sorted set per room, shared by all server processes. Asking who is
+online reads that one key; it never broadcasts to the room.
+
+PresenceNotifier turns joins and leaves into 'presence' events for the
+room, at most one per room and window, and none when the users in the
+window only reconnected. Sockets that expire without a leave are not
+announced; they are missing from the next event or query.
+"""
+
+import asyncio
+import json
+import logging
+import time
+import weakref
+
+from django.conf import settings
+
+from trivial.metrics import Counter
+
+logger = logging.getLogger(__name__)
+
+presence_changes = Counter(
+    'trivial_chat_presence_changes', 'Joins and leaves seen by the presence notifier.',
+    ('outcome',),
+)
+
+
+def room_group(room_id):
+    """
+    Channel layer group of a room, as used by ChatCosumer.
+    """
+    return f"room_{room_id}"
+
+
+def distinct_users(members):
+    """
+    One entry per user, ordered by name, from (user_id, name) pairs.
+    """
+    users = {user_id: name for user_id, name in members}
+    return [{"id": user_id, "name": name} for user_id, name in sorted(users.items(), key=lambda item: (item[1] or "", item[0]))]
+
+
+class MemoryPresence:
+    """
+    Presence registry in the memory of one process.
+
+    Args:
+        ttl (float): Seconds a socket stays listed without a heartbeat.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._rooms = {}
+        self._sockets = {}
+
+    async def join(self, room_id, channel_name, user_id, name):
+        self._sockets[channel_name] = (user_id, name)
+        self._rooms.setdefault(room_id, {})[channel_name] = (user_id, name, time.monotonic() + self.ttl)
+
+    async def heartbeat(self, room_id, channel_name):
+        # Re-adds a socket that already expired, e.g. after a long GC pause.
+        if channel_name in self._sockets:
+            await self.join(room_id, channel_name, *self._sockets[channel_name])
+
+    async def leave(self, room_id, channel_name):
+        self._sockets.pop(channel_name, None)
+        members = self._rooms.get(room_id)
+        if members is not None:
+            members.pop(channel_name, None)
+            if not members:
+                del self._rooms[room_id]
+
+    async def online(self, room_id):
+        """
+        Returns:
+            list: {'id', 'name'} of every user with a live socket in the room.
+        """
+        members = self._rooms.get(room_id, {})
+        now = time.monotonic()
+        for channel_name in [channel for channel, (_, _, expires_at) in members.items() if expires_at <= now]:
+            del members[channel_name]
+        return distinct_users((user_id, name) for user_id, name, _ in members.values())
+
+
+class RedisPresence:
+    """
+    Presence registry in Redis, shared by all server processes.
+
+    Each room is one sorted set; members are the sockets (channel name,
+    user id and name) scored by their expiry time. The key itself expires
+    when a room has been idle for twice the TTL.
+
+    Args:
+        url (str): Redis URL.
+        ttl (float): Seconds a socket stays listed without a heartbeat.
+    """
+
+    def __init__(self, url, ttl=60):
+        self.url = url
+        self.ttl = ttl
+        # redis.asyncio clients are bound to the loop they were made on;
+        # sync views reach the registry through async_to_sync loops.
+        self._clients = weakref.WeakKeyDictionary()
+        self._sockets = {}
+
+    def client(self):
+        from redis import asyncio as aioredis
+
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = self._clients[loop] = aioredis.Redis.from_url(self.url)
+        return client
+
+    @staticmethod
+    def key(room_id):
+        return f"chat:presence:{room_id}"
+
+    async def join(self, room_id, channel_name, user_id, name):
+        member = json.dumps([channel_name, user_id, name])
+        self._sockets[channel_name] = member
+        await self._add(room_id, member)
+
+    async def heartbeat(self, room_id, channel_name):
+        # Re-adds a socket that already expired, e.g. after a long GC pause.
+        member = self._sockets.get(channel_name)
+        if member is not None:
+            await self._add(room_id, member)
+
+    async def _add(self, room_id, member):
+        async with self.client().pipeline(transaction=False) as pipe:
+            pipe.zadd(self.key(room_id), {member: time.time() + self.ttl})
+            pipe.expire(self.key(room_id), int(self.ttl * 2))
+            await pipe.execute()
+
+    async def leave(self, room_id, channel_name):
+        member = self._sockets.pop(channel_name, None)
+        if member is not None:
+            await self.client().zrem(self.key(room_id), member)
+
+    async def online(self, room_id):
+        """
+        Returns:
+            list: {'id', 'name'} of every user with a live socket in the room.
+        """
+        async with self.client().pipeline(transaction=False) as pipe:
+            pipe.zremrangebyscore(self.key(room_id), "-inf", time.time())
+            pipe.zrange(self.key(room_id), 0, -1)
+            _, members = await pipe.execute()
+        return distinct_users(tuple(json.loads(member)[1:]) for member in members)
+
+
+class PresenceNotifier:
+    """
+    Coalesces a room's joins and leaves into one 'presence' event.
+
+    The first change in a room starts a window of WINDOW_MS; when it ends
+    the room's current users are sent to the room group once. If every
+    user who joined or left in the window did both equally often (a
+    reconnect), nothing is sent. Windows are per process, so with N server
+    processes a room gets at most N events per window.
+
+    Args:
+        registry: MemoryPresence or RedisPresence.
+        window_ms (int): Length of the coalescing window.
+    """
+
+    def __init__(self, registry, window_ms=1000):
+        self.registry = registry
+        self.window = window_ms / 1000
+        self._pending = {}
+
+    def changed(self, channel_layer, room_id, user_id, delta):
+        """
+        Record a join (delta=1) or leave (delta=-1) of a user in a room.
+        """
+        pending = self._pending.get(room_id)
+        if pending is None:
+            pending = self._pending[room_id] = {}
+            asyncio.get_running_loop().create_task(self._flush_later(channel_layer, room_id))
+        else:
+            presence_changes.inc(outcome='coalesced')
+        pending[user_id] = pending.get(user_id, 0) + delta
+
+    async def _flush_later(self, channel_layer, room_id):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            deltas = self._pending.pop(room_id, {})
+
+        if not any(deltas.values()):
+            presence_changes.inc(outcome='suppressed')
+            return
+        try:
+            users = await self.registry.online(room_id)
+            await channel_layer.group_send(room_group(room_id), {
+                "type": "presence_update",
+                "room_id": room_id,
+                "users": users,
+            })
+            presence_changes.inc(outcome='sent')
+        except Exception:
+            logger.exception("Could not send presence for room %s", room_id)
+
+
+_config = getattr(settings, "CHAT_PRESENCE", {})
+
+if _config.get("BACKEND", "memory") == "redis":
+    presence = RedisPresence(_config.get("REDIS_URL", "redis://localhost:6379/0"), ttl=_config.get("TTL", 60))
+else:
+    presence = MemoryPresence(ttl=_config.get("TTL", 60))
+
+presence_notifier = PresenceNotifier(presence, window_ms=_config.get("NOTIFY_WINDOW_MS", 1000))
@@ -0,0 +1,70 @@
+"""
+Room lookup shared by ChatView, RoomView and ChatCosumer.
+
+Rooms are cached per process as (id, name), so opening an existing room
+normally costs no query. Entries are dropped when a Room is saved or
+deleted (see chat/signals.py). Missing rooms are not cached: another
+process may create them at any time.
+"""
+
+from django.conf import settings
+
+from chat.models import Room
+from trivial.cache import LRUCache
+
+_config = getattr(settings, 'CHAT_ROOM_CACHE', {})
+
+room_cache = LRUCache(maxsize=_config.get('MAX_SIZE', 10000), ttl=_config.get('TTL', 300))
+
+
+def _room(values):
+    return Room.from_db('default', ('id', 'name'), values)
+
+
+def get_room(room_id: int) -> Room:
+    """
+    Get a room.
+
+    Returns:
+        Room instance, or None if it does not exist
+    """
+    values = room_cache.get(room_id)
+    if values is None:
+        values = Room.objects.filter(id=room_id).values_list('id', 'name').first()
+        if values is None:
+            return None
+        room_cache.set(room_id, values)
+    return _room(values)
+
+
+async def aget_room(room_id: int) -> Room:
+    """
+    Async version of get_room for consumers.
+    """
+    values = room_cache.get(room_id)
+    if values is None:
+        values = await Room.objects.filter(id=room_id).values_list('id', 'name').afirst()
+        if values is None:
+            return None
+        room_cache.set(room_id, values)
+    return _room(values)
+
+
+def ensure_room(room_id: int) -> Room:
+    """
+    Get a room, creating it as 'Room <id>' if it does not exist.
+
+    Safe to call concurrently for the same id, see RoomManager.ensure.
+    """
+    values = room_cache.get(room_id)
+    if values is None:
+        values = Room.objects.ensure(room_id, f"Room {room_id}")
+        room_cache.set(room_id, values)
+    return _room(values)
+
+
+def invalidate_room(room_id: int) -> None:
+    """
+    Drop the cached room.
+    """
+    room_cache.pop(room_id)
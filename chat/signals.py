@@ -0,0 +1,14 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from chat.models import Room
+from chat.rooms import invalidate_room
+
+
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+def drop_cached_room(sender, instance, **kwargs):
+    """
+    Drop the cached room when it changes or is deleted.
+    """
+    invalidate_room(instance.pk)
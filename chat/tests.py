@@ -1,3 +1,509 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from datetime import timedelta
 
-# Create your tests here.
+import jwt
+from asgiref.sync import async_to_sync
+from channels.routing import URLRouter
+from channels.sessions import CookieMiddleware
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from apps.users.authentication import token_cache, user_cache
+from apps.users.models import User
+from chat import presence as presence_module
+from chat.codecs import MSGPACK_PROTOCOL, encode_message, json_codec, msgpack, msgpack_codec, negotiate
+from chat.models import Message, Room
+from chat.outbound import SLOW_CLIENT_CLOSE_CODE, OutboundBuffer
+from chat.presence import MemoryPresence, PresenceNotifier
+from chat.rooms import ensure_room, get_room, room_cache
+from chat.routing import ws_pattern
+from chat.views import HISTORY_MAX_PAGE_SIZE, HISTORY_PAGE_SIZE
+from chat.writer import MessageWriter, message_writer
+
+
+class RecordingLayer:
+    """
+    Channel layer stand-in that records group messages.
+    """
+
+    def __init__(self):
+        self.sent = []
+
+    async def group_send(self, group, message):
+        self.sent.append((group, message))
+
+
+class PresenceRegistryTests(TestCase):
+    def test_online_lists_each_user_once(self):
+        registry = MemoryPresence(ttl=60)
+
+        async def scenario():
+            await registry.join(1, 'a', 10, 'bob')
+            await registry.join(1, 'b', 10, 'bob')
+            await registry.join(1, 'c', 11, 'alice')
+            await registry.join(2, 'd', 12, 'carol')
+            await registry.leave(1, 'c')
+            return await registry.online(1)
+
+        self.assertEqual(async_to_sync(scenario)(), [{'id': 10, 'name': 'bob'}])
+
+    def test_sockets_without_heartbeat_expire(self):
+        registry = MemoryPresence(ttl=0)
+
+        async def scenario():
+            await registry.join(1, 'a', 10, 'bob')
+            return await registry.online(1)
+
+        self.assertEqual(async_to_sync(scenario)(), [])
+
+
+class PresenceNotifierTests(TestCase):
+    def test_changes_in_one_window_are_sent_once(self):
+        registry = MemoryPresence()
+        notifier = PresenceNotifier(registry, window_ms=10)
+        layer = RecordingLayer()
+
+        async def scenario():
+            for user_id in range(5):
+                await registry.join(1, f'socket-{user_id}', user_id, f'user{user_id}')
+                notifier.changed(layer, 1, user_id, 1)
+            await asyncio.sleep(0.05)
+
+        async_to_sync(scenario)()
+        self.assertEqual(len(layer.sent), 1)
+        group, message = layer.sent[0]
+        self.assertEqual(group, 'room_1')
+        self.assertEqual(len(message['users']), 5)
+
+    def test_reconnects_are_not_sent(self):
+        notifier = PresenceNotifier(MemoryPresence(), window_ms=10)
+        layer = RecordingLayer()
+
+        async def scenario():
+            notifier.changed(layer, 1, 10, -1)
+            notifier.changed(layer, 1, 10, 1)
+            await asyncio.sleep(0.05)
+
+        async_to_sync(scenario)()
+        self.assertEqual(layer.sent, [])
+
+
+class RecordingSocket:
+    """
+    Socket stand-in for OutboundBuffer that takes a while per frame.
+    """
+
+    def __init__(self):
+        self.frames = []
+        self.close_codes = []
+
+    async def send_frame(self, frame):
+        self.frames.append(frame)
+        await asyncio.sleep(0.01)
+
+    async def close(self, code):
+        self.close_codes.append(code)
+
+
+class OutboundBufferTests(TestCase):
+    def test_messages_are_batched_in_order(self):
+        socket = RecordingSocket()
+        buffer = OutboundBuffer(socket.send_frame, socket.close, 'Test', window_ms=5, max_batch=3)
+
+        async def scenario():
+            for i in range(5):
+                buffer.push_message(json_codec.encode(i))
+            buffer.push_frame({'type': 'presence'})
+            buffer.push_message(json_codec.encode(5))
+            await asyncio.sleep(0.1)
+
+        async_to_sync(scenario)()
+        self.assertEqual([json.loads(frame) for frame in socket.frames], [
+            {'messages': [0, 1, 2]},
+            {'messages': [3, 4]},
+            {'type': 'presence'},
+            {'message': 5},
+        ])
+
+    def test_slow_socket_is_closed(self):
+        socket = RecordingSocket()
+        buffer = OutboundBuffer(socket.send_frame, socket.close, 'Test', window_ms=50, max_pending=10)
+
+        async def scenario():
+            for i in range(11):
+                buffer.push_message(i)
+            await asyncio.sleep(0.01)
+            buffer.push_message(11)
+
+        async_to_sync(scenario)()
+        self.assertEqual(socket.close_codes, [SLOW_CLIENT_CLOSE_CODE])
+        self.assertEqual(socket.frames, [])
+        self.assertTrue(buffer.closed)
+
+
+class SlowWriter(MessageWriter):
+    """
+    Writer that takes a while per batch and records the batches instead
+    of writing them; the first `failures` batches raise.
+    """
+
+    def __init__(self, seconds=0.0, failures=0, **kwargs):
+        super().__init__(**kwargs)
+        self.seconds = seconds
+        self.failures = failures
+        self.batches = []
+
+    def _write(self, batch):
+        if not batch:
+            return
+        time.sleep(self.seconds)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("boom")
+        self.batches.append([message.content for message in batch])
+        self.stats.record(len(batch), self.seconds)
+
+
+class MessageWriterTests(TransactionTestCase):
+    """
+    The writer flushes by size or interval, slows senders down when full
+    and survives failing rows and batches.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(email='writer@example.com', name='writer', is_verified=True)
+        self.room = Room.objects.create(name='Writer')
+
+    def message(self, content, room_id=None):
+        return Message(room_id=room_id or self.room.id, user_id=self.user.id, content=content)
+
+    def test_flushes_when_batch_is_full(self):
+        writer = MessageWriter(batch_size=3, flush_interval_ms=60000)
+
+        async def scenario():
+            for i in range(3):
+                await writer.submit(self.message(str(i)))
+            await asyncio.sleep(0.2)
+            written = await Message.objects.filter(room_id=self.room.id).acount()
+            await writer.close()
+            return written
+
+        self.assertEqual(async_to_sync(scenario)(), 3)
+        stats = writer.stats.as_dict()
+        self.assertEqual(stats['flushes'], 1)
+        self.assertEqual(stats['max_flush_size'], 3)
+
+    def test_flushes_after_interval(self):
+        writer = MessageWriter(batch_size=100, flush_interval_ms=20)
+
+        async def scenario():
+            for i in range(2):
+                await writer.submit(self.message(str(i)))
+            await asyncio.sleep(0.3)
+            written = await Message.objects.filter(room_id=self.room.id).acount()
+            await writer.close()
+            return written
+
+        self.assertEqual(async_to_sync(scenario)(), 2)
+        self.assertEqual(writer.stats.as_dict()['flushes'], 1)
+
+    def test_full_queue_makes_submit_wait(self):
+        writer = SlowWriter(seconds=0.3, batch_size=1, flush_interval_ms=0, max_queue=1)
+
+        async def scenario():
+            await writer.submit(self.message('being written'))
+            await asyncio.sleep(0.05)
+            await writer.submit(self.message('queued'))
+            started = time.monotonic()
+            await writer.submit(self.message('waits'))
+            waited = time.monotonic() - started
+            await writer.close()
+            return waited
+
+        self.assertGreater(async_to_sync(scenario)(), 0.15)
+        self.assertEqual(sum(writer.batches, []), ['being written', 'queued', 'waits'])
+
+    def test_bad_row_does_not_drop_batch(self):
+        writer = MessageWriter()
+
+        writer._write([self.message('first'), self.message('orphan', room_id=self.room.id + 1000), self.message('last')])
+
+        self.assertEqual(
+            sorted(Message.objects.filter(room_id=self.room.id).values_list('content', flat=True)),
+            ['first', 'last'],
+        )
+        stats = writer.stats.as_dict()
+        self.assertEqual((stats['messages'], stats['failed']), (2, 1))
+
+    def test_unexpected_error_does_not_stop_writer(self):
+        writer = SlowWriter(failures=1, batch_size=1, flush_interval_ms=0)
+
+        async def scenario():
+            await writer.submit(self.message('lost'))
+            await asyncio.sleep(0.1)
+            await writer.submit(self.message('kept'))
+            await asyncio.sleep(0.1)
+            running = not writer._task.done()
+            await writer.close()
+            return running
+
+        self.assertTrue(async_to_sync(scenario)())
+        self.assertEqual(writer.batches, [['kept']])
+        self.assertEqual(writer.stats.failed, 1)
+
+
+class CodecTests(TestCase):
+    def test_negotiation_prefers_the_clients_first_supported_protocol(self):
+        self.assertEqual(negotiate(['chat', MSGPACK_PROTOCOL]), (msgpack_codec, MSGPACK_PROTOCOL))
+        self.assertEqual(negotiate([]), (json_codec, None))
+
+    def test_wrapped_frames_match_plain_encoding(self):
+        messages = [{'user': 'u', 'message': str(i)} for i in range(20)]
+        encoded = [encode_message(message) for message in messages]
+
+        self.assertEqual(json.loads(json_codec.message_frame(encoded[0]['json'])), {'message': messages[0]})
+        self.assertEqual(
+            json.loads(json_codec.batch_frame([item['json'] for item in encoded])),
+            {'messages': messages},
+        )
+        self.assertEqual(msgpack.unpackb(msgpack_codec.message_frame(encoded[0]['msgpack'])), {'message': messages[0]})
+        for count in (2, 15, 16, 20):
+            self.assertEqual(
+                msgpack.unpackb(msgpack_codec.batch_frame([item['msgpack'] for item in encoded[:count]])),
+                {'messages': messages[:count]},
+            )
+
+
+class RoomPresenceViewTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.user = User(email='presence@example.com', name='presence', is_verified=True)
+        self.user.set_password('password')
+        self.user.save()
+        self.room = Room.objects.create(name='Presence')
+
+    def test_requires_authentication(self):
+        response = self.client.get(f'/room/{self.room.id}/presence/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_lists_connected_users(self):
+        async_to_sync(presence_module.presence.join)(self.room.id, 'socket', self.user.id, self.user.name)
+        self.addCleanup(async_to_sync(presence_module.presence.leave), self.room.id, 'socket')
+        self.client.cookies['jwt'] = jwt.encode({'id': self.user.id}, 'secret', algorithm='HS256')
+
+        response = self.client.get(f'/room/{self.room.id}/presence/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['users'], [{'id': self.user.id, 'name': 'presence'}])
+
+
+class ChatConsumerAuthTests(TransactionTestCase):
+    """
+    Consumers reach the database through database_sync_to_async, which
+    closes connections and so cannot run inside TestCase's transaction.
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        room_cache.clear()
+        self.user = User(email='chatter@example.com', name='chatter', is_verified=True)
+        self.user.set_password('password')
+        self.user.save()
+        self.room = Room.objects.create(name='Auth')
+        self.application = CookieMiddleware(URLRouter(ws_pattern))
+
+    def communicator(self, room_id, user=None, subprotocols=None):
+        headers = []
+        if user is not None:
+            token = jwt.encode({'id': user.id}, 'secret', algorithm='HS256')
+            headers.append((b'cookie', f'jwt={token}'.encode()))
+        return WebsocketCommunicator(
+            self.application, f'/ws/room/{room_id}/', headers=headers, subprotocols=subprotocols,
+        )
+
+    def test_anonymous_socket_is_rejected(self):
+        async def scenario():
+            connected, _ = await self.communicator(self.room.id).connect()
+            return connected
+
+        self.assertFalse(async_to_sync(scenario)())
+
+    def test_unknown_room_is_rejected(self):
+        async def scenario():
+            connected, _ = await self.communicator(self.room.id + 1000, self.user).connect()
+            return connected
+
+        self.assertFalse(async_to_sync(scenario)())
+
+    def test_messages_are_sent_as_the_signed_in_user(self):
+        async def scenario():
+            client = self.communicator(self.room.id, self.user)
+            connected, _ = await client.connect()
+            self.assertTrue(connected)
+            presence_frame = await client.receive_json_from(timeout=5)
+            await client.send_json_to({'message': 'hello', 'user': 'somebody else'})
+            frame = await client.receive_json_from(timeout=5)
+            await client.disconnect()
+            await message_writer.close()
+            return presence_frame, frame
+
+        presence_frame, frame = async_to_sync(scenario)()
+
+        self.assertEqual(presence_frame['users'], [{'id': self.user.id, 'name': 'chatter'}])
+        self.assertEqual(frame, {'message': {'user': 'chatter', 'message': 'hello'}})
+        message = Message.objects.get(room=self.room)
+        self.assertEqual(message.user_id, self.user.id)
+
+    def test_msgpack_subprotocol(self):
+        async def scenario():
+            client = self.communicator(self.room.id, self.user, subprotocols=[MSGPACK_PROTOCOL])
+            connected, subprotocol = await client.connect()
+            self.assertTrue(connected)
+            await client.receive_from(timeout=5)
+            await client.send_to(bytes_data=msgpack.packb({'message': 'packed'}))
+            frame = await client.receive_from(timeout=5)
+            await client.disconnect()
+            await message_writer.close()
+            return subprotocol, frame
+
+        subprotocol, frame = async_to_sync(scenario)()
+
+        self.assertEqual(subprotocol, MSGPACK_PROTOCOL)
+        self.assertEqual(msgpack.unpackb(frame), {'message': {'user': 'chatter', 'message': 'packed'}})
+
+
+class RoomHistoryViewTests(TestCase):
+    """
+    /room/<id>/history/ pages through a room's messages by (time_stamp, id).
+    """
+
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        self.user = User(email='history@example.com', name='history', is_verified=True)
+        self.user.set_password('password')
+        self.user.save()
+        self.room = Room.objects.create(name='History')
+        self.client.cookies['jwt'] = jwt.encode({'id': self.user.id}, 'secret', algorithm='HS256')
+
+    def create_messages(self, count, time_stamp=None):
+        messages = Message.objects.bulk_create([
+            Message(room=self.room, user=self.user, content=f'Message {i}') for i in range(count)
+        ])
+        if time_stamp is not None:
+            Message.objects.filter(id__in=[message.id for message in messages]).update(time_stamp=time_stamp)
+        return [message.id for message in messages]
+
+    def history(self, **params):
+        response = self.client.get(f'/room/{self.room.id}/history/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_first_page_is_newest_messages_oldest_first(self):
+        ids = self.create_messages(5)
+        Message.objects.create(room=Room.objects.create(name='Other'), user=self.user, content='Elsewhere')
+
+        page = self.history(limit=3)
+
+        self.assertEqual([message['id'] for message in page['messages']], ids[2:])
+        self.assertEqual(page['messages'][0]['user'], 'history')
+        self.assertEqual(page['messages'][0]['message'], 'Message 2')
+        self.assertIsNotNone(page['next'])
+
+    def test_cursor_walks_ties_without_duplicates_or_gaps(self):
+        now = timezone.now()
+        older = self.create_messages(3, time_stamp=now - timedelta(seconds=1))
+        newer = self.create_messages(4, time_stamp=now)
+
+        pages = []
+        params = {'limit': 2}
+        while True:
+            page = self.history(**params)
+            pages.append([message['id'] for message in page['messages']])
+            if page['next'] is None:
+                break
+            params['before'] = page['next']
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 2, 1])
+        self.assertEqual([message_id for page in reversed(pages) for message_id in page], older + newer)
+
+    def test_limit_is_clamped(self):
+        self.create_messages(HISTORY_MAX_PAGE_SIZE + 1)
+
+        self.assertEqual(len(self.history(limit=HISTORY_MAX_PAGE_SIZE * 5)['messages']), HISTORY_MAX_PAGE_SIZE)
+        self.assertEqual(len(self.history(limit=0)['messages']), 1)
+        self.assertEqual(len(self.history(limit='many')['messages']), HISTORY_PAGE_SIZE)
+
+    def test_malformed_cursor_is_rejected(self):
+        self.create_messages(1)
+
+        for cursor in ('not base64!', 'Zm9v', 'Zm9vfGJhcg=='):
+            response = self.client.get(f'/room/{self.room.id}/history/', {'before': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_requires_authentication(self):
+        del self.client.cookies['jwt']
+
+        response = self.client.get(f'/room/{self.room.id}/history/')
+
+        self.assertEqual(response.status_code, 401)
+
+
+class RoomLookupTests(TestCase):
+    def setUp(self):
+        token_cache.clear()
+        user_cache.clear()
+        room_cache.clear()
+
+    def test_chat_view_creates_a_room_once(self):
+        for _ in range(2):
+            response = self.client.post('/chat/', {'room_id': 987654})
+            self.assertRedirects(response, '/room/987654/', fetch_redirect_response=False)
+
+        self.assertEqual(list(Room.objects.filter(id=987654).values_list('name', flat=True)), ['Room 987654'])
+
+    def test_chat_view_rejects_invalid_room_ids(self):
+        for room_id in ('lobby', 0, -1, 2**31):
+            response = self.client.post('/chat/', {'room_id': room_id})
+            self.assertEqual(response.status_code, 400, room_id)
+
+        self.assertFalse(Room.objects.exists())
+        self.assertEqual(len(room_cache), 0)
+
+    def test_existing_room_is_not_overwritten(self):
+        room = Room.objects.create(name='Named')
+
+        self.assertEqual(ensure_room(room.id).name, 'Named')
+
+    def test_cached_room_costs_no_query(self):
+        with self.assertNumQueries(1):
+            ensure_room(987655)
+        with self.assertNumQueries(0):
+            self.assertEqual(ensure_room(987655).id, 987655)
+            self.assertEqual(get_room(987655).name, 'Room 987655')
+
+    def test_cache_follows_changes(self):
+        room = Room.objects.create(name='Before')
+        get_room(room.id)
+
+        room.name = 'After'
+        room.save()
+        self.assertEqual(get_room(room.id).name, 'After')
+
+        room.delete()
+        self.assertIsNone(get_room(room.id))
+
+    def test_room_view_returns_404_for_missing_room(self):
+        user = User(email='rooms@example.com', name='rooms', is_verified=True)
+        user.set_password('password')
+        user.save()
+        self.client.cookies['jwt'] = jwt.encode({'id': user.id}, 'secret', algorithm='HS256')
+
+        response = self.client.get('/room/987656/')
+
+        self.assertEqual(response.status_code, 404)
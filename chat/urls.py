@@ -1,8 +1,10 @@
 from django.urls import path
 
-from .views import ChatView, RoomView
+from .views import ChatView, RoomView, RoomHistoryView, RoomPresenceView
 
 urlpatterns = [
     path('chat/', ChatView, name="chat"),
     path('room/<int:room_id>/', RoomView, name="room"),
+    path('room/<int:room_id>/history/', RoomHistoryView, name="room-history"),
+    path('room/<int:room_id>/presence/', RoomPresenceView, name="room-presence"),
 ]
@@ -1,7 +1,21 @@
+import base64
+from datetime import datetime
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.db.models import Q
+from django.http import Http404, JsonResponse
 from django.shortcuts import render, redirect
 
 from apps.users.utils import get_user_from_cookie
-from chat.models import Room, Message
+from chat.models import Message
+from chat.presence import presence
+from chat.rooms import ensure_room, get_room
+
+HISTORY_PAGE_SIZE = 50
+HISTORY_MAX_PAGE_SIZE = 200
+# rooms.id is a PostgreSQL integer.
+MAX_ROOM_ID = 2**31 - 1
 
 def ChatView(request):
     """
@@ -9,7 +23,9 @@ def ChatView(request):
 
     If a POST request is made with a 'room_id', attempt to retrieve the
     corresponding chat room. If it does not exist, create a new room
-    with the given ID. Redirect the user to the chat room.
+    with the given ID. Redirect the user to the chat room. Both happen in
+    one idempotent query (none for a cached room, see chat/rooms.py), so
+    concurrent first joins of a room cannot conflict.
 
     For GET requests, render the chat room entry page.
 
@@ -18,15 +34,18 @@ def ChatView(request):
 
     Returns:
         HttpResponse: Redirects to the chat room if a valid 'room_id' is provided.
-        Otherwise, renders the chat.html template.
+        Otherwise, renders the chat.html template, with status 400 if the
+        'room_id' is not a number between 1 and MAX_ROOM_ID.
     """
     if request.method == 'POST':
-        room_id = request.POST.get('room_id')
-
         try:
-            room = Room.objects.get(id=room_id)
-        except Room.DoesNotExist:
-            room = Room.objects.create(id=room_id, name=f"Room {room_id}")
+            room_id = int(request.POST.get('room_id'))
+        except (TypeError, ValueError):
+            return render(request, 'chat.html', status=400)
+        if not 1 <= room_id <= MAX_ROOM_ID:
+            return render(request, 'chat.html', status=400)
+
+        room = ensure_room(room_id)
 
         return redirect('room', room_id=room.id)
 
@@ -34,11 +53,14 @@ def ChatView(request):
 
 def RoomView(request, room_id):
     """
-    Render a chat room with messages for a specific user.
+    Render a chat room for a specific user.
 
-    Retrieve the user from the request cookie and the room by 'room_id'.
-    If the user is not authenticated, redirect to the login page.
-    Otherwise, fetch messages for the room and user, and render the room.html template.
+    Retrieve the user from the request cookie and the room by 'room_id',
+    both from per-process caches. If the user is not authenticated,
+    redirect to the login page; if the room does not exist, return 404.
+    Otherwise, render the room.html template. The page does not embed the
+    room history; it loads it page by page from RoomHistoryView, so the
+    cost of opening a room does not depend on how many messages it holds.
 
     Args:
         request: The HTTP request object.
@@ -46,18 +68,132 @@ def RoomView(request, room_id):
 
     Returns:
         HttpResponse: Redirects to login if user is not authenticated.
-        Otherwise, renders the room.html template with room messages.
+        Otherwise, renders the room.html template.
     """
     user = get_user_from_cookie(request=request)
-    existing_room = Room.objects.get(id=room_id)
     
     if not user:
         return redirect('login')
+
+    existing_room = get_room(room_id)
+    if existing_room is None:
+        raise Http404("Room not found")
     
-    get_messages = Message.objects.filter(room=existing_room, user=user).all()
     context = {
-        'messages': get_messages,
-        'room_id': room_id,
+        'room_id': existing_room.id,
         'user': user.name,
+        'heartbeat_interval': settings.CHAT_PRESENCE["HEARTBEAT_INTERVAL"],
     }
     return render(request, 'room.html', context)
+
+
+def encode_history_cursor(message):
+    """
+    Encode the (time_stamp, id) position of a message as an opaque cursor.
+    """
+    raw = f"{message['time_stamp'].isoformat()}|{message['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_history_cursor(cursor):
+    """
+    Decode a cursor produced by encode_history_cursor.
+
+    Returns:
+        tuple: (time_stamp, id), or None if the cursor is malformed.
+    """
+    try:
+        time_stamp, message_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(time_stamp), int(message_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def RoomHistoryView(request, room_id):
+    """
+    Return one page of a room's message history as JSON.
+
+    Pages are keyset-paginated by (time_stamp, id), newest first, so every
+    page is an index range scan on messages_room_ts_id_idx no matter how
+    deep the client scrolls. Messages inside a page are ordered oldest
+    first, ready to be prepended to the chat.
+
+    Query params:
+        before: Cursor returned as 'next' by the previous page.
+        limit: Page size, at most HISTORY_MAX_PAGE_SIZE.
+
+    Args:
+        request: The HTTP request object.
+        room_id: The ID of the chat room.
+
+    Returns:
+        JsonResponse: {'messages': [...], 'next': cursor or None}, or 401
+        if the user is not authenticated.
+    """
+    user = get_user_from_cookie(request=request)
+
+    if not user:
+        return JsonResponse({"status": "Unauthorized"}, status=401)
+
+    try:
+        limit = min(int(request.GET.get('limit', HISTORY_PAGE_SIZE)), HISTORY_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = HISTORY_PAGE_SIZE
+    limit = max(limit, 1)
+
+    queryset = Message.objects.filter(room_id=room_id)
+
+    before = request.GET.get('before')
+    if before:
+        position = decode_history_cursor(before)
+        if position is None:
+            return JsonResponse({"status": "Invalid cursor"}, status=400)
+        time_stamp, message_id = position
+        queryset = queryset.filter(
+            Q(time_stamp__lt=time_stamp) | Q(time_stamp=time_stamp, id__lt=message_id)
+        )
+
+    page = list(
+        queryset.order_by('-time_stamp', '-id')
+        .values('id', 'content', 'time_stamp', 'user__name')[:limit + 1]
+    )
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    messages = [
+        {
+            "id": message['id'],
+            "user": message['user__name'],
+            "message": message['content'],
+            "time_stamp": message['time_stamp'].isoformat(),
+        }
+        for message in reversed(page)
+    ]
+    return JsonResponse({
+        "messages": messages,
+        "next": encode_history_cursor(page[-1]) if has_more else None,
+    })
+
+
+def RoomPresenceView(request, room_id):
+    """
+    Return the users currently connected to a room as JSON.
+
+    Reads the presence registry only (one Redis key with the redis
+    backend), so it neither touches the database nor messages the room.
+
+    Args:
+        request: The HTTP request object.
+        room_id: The ID of the chat room.
+
+    Returns:
+        JsonResponse: {'room_id', 'users': [{'id', 'name'}], 'count'}, or
+        401 if the user is not authenticated.
+    """
+    user = get_user_from_cookie(request=request)
+
+    if not user:
+        return JsonResponse({"status": "Unauthorized"}, status=401)
+
+    users = async_to_sync(presence.online)(room_id)
+    return JsonResponse({"room_id": room_id, "users": users, "count": len(users)})
@@ -0,0 +1,213 @@
+"""
+Background writer that persists chat messages in batches.
+
+Consumers hand rows to the writer instead of inserting them one by one.
+The writer collects them in a bounded queue and flushes them with a single
+``bulk_create`` whenever ``BATCH_SIZE`` rows are pending or ``FLUSH_INTERVAL_MS``
+milliseconds have passed since the first pending row, whichever comes first.
+
+A full queue makes ``submit`` wait, which slows down the sending sockets
+instead of growing memory without bound. On shutdown the ASGI lifespan
+handler (see trivial/asgi.py) awaits ``close``, which writes what is still
+queued; servers without lifespan support fall back to an ``atexit`` hook.
+"""
+
+import asyncio
+import atexit
+import logging
+import time
+
+from channels.db import database_sync_to_async
+from django.conf import settings
+from django.db import DatabaseError, transaction
+
+from .models import Message
+
+logger = logging.getLogger(__name__)
+
+
+class MessageWriterStats:
+    """
+    Counters describing the writer's flushes.
+
+    Attributes:
+        flushes (int): Number of flushes performed.
+        messages (int): Number of messages written.
+        failed (int): Number of messages that could not be written.
+        max_flush_size (int): Largest batch written in a single flush.
+        total_flush_seconds (float): Time spent inside flushes.
+        max_flush_seconds (float): Slowest single flush.
+    """
+
+    def __init__(self):
+        self.flushes = 0
+        self.messages = 0
+        self.failed = 0
+        self.max_flush_size = 0
+        self.total_flush_seconds = 0.0
+        self.max_flush_seconds = 0.0
+
+    def record(self, size, seconds):
+        """
+        Record a completed flush.
+
+        Args:
+            size (int): Number of messages written by the flush.
+            seconds (float): Duration of the flush.
+        """
+        self.flushes += 1
+        self.messages += size
+        self.max_flush_size = max(self.max_flush_size, size)
+        self.total_flush_seconds += seconds
+        self.max_flush_seconds = max(self.max_flush_seconds, seconds)
+
+    def as_dict(self):
+        """
+        Returns the counters together with derived averages.
+        """
+        return {
+            "flushes": self.flushes,
+            "messages": self.messages,
+            "failed": self.failed,
+            "max_flush_size": self.max_flush_size,
+            "avg_flush_size": self.messages / self.flushes if self.flushes else 0.0,
+            "avg_flush_ms": self.total_flush_seconds * 1000 / self.flushes if self.flushes else 0.0,
+            "max_flush_ms": self.max_flush_seconds * 1000,
+        }
+
+
+class MessageWriter:
+    """
+    Buffers ``Message`` rows and writes them with ``bulk_create``.
+
+    Args:
+        batch_size (int): Flush as soon as this many rows are pending.
+        flush_interval_ms (int): Flush at most this long after a row was queued.
+        max_queue (int): Capacity of the queue; ``submit`` waits when it is full.
+    """
+
+    def __init__(self, batch_size=100, flush_interval_ms=50, max_queue=10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_queue = max_queue
+        self.stats = MessageWriterStats()
+        self._queue = None
+        self._batch = []
+        self._task = None
+        self._loop = None
+
+    async def submit(self, message):
+        """
+        Queue an unsaved ``Message`` for writing.
+
+        Args:
+            message (Message): The message to persist.
+        """
+        self._ensure_started()
+        await self._queue.put(message)
+
+    async def close(self):
+        """
+        Stop the background task and write everything still queued.
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await database_sync_to_async(self._write)(self._drain())
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._task is not None and self._loop is loop and not self._task.done():
+            return
+        if self._loop is not loop:
+            # A new event loop (tests, server restart) needs its own queue;
+            # rows left in the old one go out with the next batch.
+            self._batch.extend(self._drain())
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+        elif self._task is not None and not self._task.cancelled() and self._task.exception() is not None:
+            logger.error("Chat message writer stopped, restarting", exc_info=self._task.exception())
+        self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        while True:
+            self._batch.append(await self._queue.get())
+            deadline = time.monotonic() + self.flush_interval
+
+            while len(self._batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    self._batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            batch, self._batch = self._batch, []
+            try:
+                await database_sync_to_async(self._write)(batch)
+            except Exception:
+                # _write already survives database errors; anything else
+                # must not stop the writer with rows still queued.
+                self.stats.failed += len(batch)
+                logger.exception("Dropping %d chat messages after an unexpected error", len(batch))
+
+    def _drain(self):
+        batch, self._batch = self._batch, []
+        if self._queue is None:
+            return batch
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    def _write(self, batch):
+        if not batch:
+            return
+        started = time.perf_counter()
+        try:
+            with transaction.atomic():
+                Message.objects.bulk_create(batch)
+        except DatabaseError:
+            # One bad row (e.g. a room that was deleted) must not take the
+            # rest of the batch down with it.
+            logger.exception("Bulk write of %d chat messages failed, retrying one by one", len(batch))
+            written = 0
+            for message in batch:
+                try:
+                    message.save()
+                    written += 1
+                except DatabaseError:
+                    self.stats.failed += 1
+                    logger.exception("Dropping chat message for room %s", message.room_id)
+            self.stats.record(written, time.perf_counter() - started)
+            return
+        self.stats.record(len(batch), time.perf_counter() - started)
+
+
+_config = getattr(settings, "CHAT_MESSAGE_WRITER", {})
+
+message_writer = MessageWriter(
+    batch_size=_config.get("BATCH_SIZE", 100),
+    flush_interval_ms=_config.get("FLUSH_INTERVAL_MS", 50),
+    max_queue=_config.get("MAX_QUEUE", 10000),
+)
+
+
+@atexit.register
+def _flush_on_exit():
+    """
+    Write rows that were still queued when the process exits.
+
+    Only a fallback for servers that do not send the ASGI lifespan
+    shutdown event (e.g. the development server); normally close() has
+    already emptied the queue.
+    """
+    try:
+        message_writer._write(message_writer._drain())
+    except Exception:
+        logger.exception("Could not flush pending chat messages on shutdown")
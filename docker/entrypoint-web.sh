@@ -8,5 +8,12 @@ done
 echo "Applying migrations..."
 python manage.py migrate
 
+# SERVER_MODE=dev: single process with autoreload (the default).
+# SERVER_MODE=prod: gunicorn with uvicorn workers, see docker/gunicorn.conf.py.
+if [ "${SERVER_MODE:-dev}" = "prod" ]; then
+  echo "Starting production server..."
+  exec gunicorn trivial.asgi:application -c docker/gunicorn.conf.py
+fi
+
 echo "Starting server..."
 python manage.py runserver 0.0.0.0:8000
@@ -0,0 +1,53 @@
+"""
+Gunicorn settings for the production server (SERVER_MODE=prod).
+
+Every value can be overridden from the environment. Send SIGHUP to the
+master process for a graceful reload: new workers are started and old ones
+finish their in-flight requests before exiting.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+worker_class = "trivial.workers.TrivialUvicornWorker"
+
+# One event loop per worker, so roughly one worker per core.
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count()))
+
+# Pending connections the kernel queues before refusing new ones.
+backlog = int(os.getenv("GUNICORN_BACKLOG", 2048))
+
+# Seconds an idle keep-alive connection stays open. Keep this above the
+# idle timeout of any load balancer in front of the app.
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+# A worker that does not heartbeat for this long is killed and replaced.
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+# Time given to in-flight requests on reload and shutdown.
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+
+# Recycle workers now and then to bound slow memory growth; the jitter
+# keeps them from restarting all at once.
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 10000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 1000))
+
+# Load the app once in the master so workers fork with it already imported.
+preload_app = os.getenv("GUNICORN_PRELOAD", "false").lower() == "true"
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG", None)
+errorlog = "-"
+loglevel = os.getenv("GUNICORN_LOG_LEVEL", "info")
+
+forwarded_allow_ips = os.getenv("FORWARDED_ALLOW_IPS", "127.0.0.1")
+
+
+def on_starting(server):
+    # The task feed cache and its generation counter live in the Django
+    # cache; with locmem every worker has its own, and a change seen by one
+    # worker leaves the others serving stale pages until they time out.
+    if workers > 1 and os.getenv("CACHE_BACKEND", "locmem") != "redis":
+        server.log.warning(
+            "Running %d workers with CACHE_BACKEND=locmem: the task feed cache is "
+            "not shared between them. Set CACHE_BACKEND=redis.", workers
+        )
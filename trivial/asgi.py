@@ -1,16 +1,48 @@
 
+import logging
 import os
 
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from chat.routing import ws_pattern
-from channels.auth import AuthMiddlewareStack
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'trivial.settings')
 
+# Set up Django before anything imports models (chat.routing -> consumers).
+django_asgi_app = get_asgi_application()
+
+from channels.auth import AuthMiddlewareStack  # noqa: E402
+from channels.routing import ProtocolTypeRouter, URLRouter  # noqa: E402
+
+from chat.routing import ws_pattern  # noqa: E402
+from chat.writer import message_writer  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+async def lifespan(scope, receive, send):
+    """
+    ASGI lifespan handler: writes the queued chat messages on shutdown.
+
+    The server sends the shutdown event once it stopped accepting
+    connections and the open ones are done, so nothing is queued after it.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            try:
+                await message_writer.close()
+            except Exception as error:
+                logger.exception("Could not flush chat messages on shutdown")
+                await send({"type": "lifespan.shutdown.failed", "message": str(error)})
+                return
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
 
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
+    "http": django_asgi_app,
+    "lifespan": lifespan,
     "websocket": AuthMiddlewareStack(
         URLRouter(
             ws_pattern
@@ -0,0 +1,49 @@
+"""
+Connection pool statistics for the default database.
+"""
+
+from django.conf import settings
+from django.db import connections
+
+
+def pool_stats(alias='default') -> dict:
+    """
+    Get the state and counters of this process's connection pool.
+
+    Counters are cumulative since the pool was opened.
+
+    Args:
+        alias: Database alias.
+
+    Returns:
+        dict: {'mode': DB_POOL_MODE} plus, in pool mode:
+            in_use: connections handed out right now
+            idle: open connections waiting in the pool
+            size / min_size / max_size: current and configured pool size
+            waiting: requests waiting for a connection right now
+            requests: connections requested so far
+            waits: requests that had to wait for a connection
+            wait_ms: total time spent waiting
+            timeouts: requests that failed (timed out or the queue was full)
+            connections_lost: broken connections found by the health check
+    """
+    stats = {'mode': getattr(settings, 'DB_POOL_MODE', 'off')}
+    pool = getattr(connections[alias], 'pool', None)
+    if pool is None:
+        return stats
+
+    raw = pool.get_stats()
+    stats.update({
+        'in_use': raw.get('pool_size', 0) - raw.get('pool_available', 0),
+        'idle': raw.get('pool_available', 0),
+        'size': raw.get('pool_size', 0),
+        'min_size': raw.get('pool_min', pool.min_size),
+        'max_size': raw.get('pool_max', pool.max_size),
+        'waiting': raw.get('requests_waiting', 0),
+        'requests': raw.get('requests_num', 0),
+        'waits': raw.get('requests_queued', 0),
+        'wait_ms': raw.get('requests_wait_ms', 0),
+        'timeouts': raw.get('requests_errors', 0),
+        'connections_lost': raw.get('connections_lost', 0) + raw.get('returns_bad', 0),
+    })
+    return stats
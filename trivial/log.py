@@ -0,0 +1,61 @@
+"""
+Sampled structured logging.
+
+log_event writes one line per event, 'event key=value ...', for a random
+LOG_SAMPLE_RATE share of the calls, so hot paths can log without flooding
+the output. With LOG_FORMAT=json, JSONFormatter writes the same fields as
+one JSON object per line.
+"""
+
+import json
+import logging
+import random
+
+from django.conf import settings
+
+
+def log_event(logger, event, level=logging.INFO, sample_rate=None, **fields):
+    """
+    Log an event with fields, for a sample of the calls.
+
+    Args:
+        logger: Logger to write to.
+        event (str): Dotted event name, e.g. 'http.request'.
+        level (int): Log level.
+        sample_rate (float, optional): Share of calls that are logged,
+            defaults to settings.LOG_SAMPLE_RATE.
+        **fields: Values logged with the event.
+    """
+    if not logger.isEnabledFor(level):
+        return
+
+    rate = getattr(settings, 'LOG_SAMPLE_RATE', 1.0) if sample_rate is None else sample_rate
+    if rate < 1.0 and random.random() >= rate:
+        return
+
+    message = ' '.join([event, *(f'{name}={value}' for name, value in fields.items())])
+    logger.log(level, message, extra={'event': event, 'fields': fields})
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    Format records as one JSON object per line.
+
+    Records from log_event carry their event name and fields as keys; other
+    records are written with their message.
+    """
+
+    def format(self, record):
+        payload = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+        }
+        if hasattr(record, 'event'):
+            payload['event'] = record.event
+            payload.update(record.fields)
+        else:
+            payload['message'] = record.getMessage()
+        if record.exc_info:
+            payload['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
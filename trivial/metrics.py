@@ -0,0 +1,385 @@
+"""
+In-process request metrics, exported in the Prometheus text format.
+
+MetricsMiddleware and InstrumentedConsumerMixin record, per endpoint or
+per consumer event, the latency, the number and total time of database
+queries and the time spent in serializers (see TimedSerializerMixin).
+MetricsView serves everything at /metrics.
+
+Metrics live in the memory of each server process. With several workers
+each scrape sees only the worker that answered, which the `pid` label
+tells apart; sum over it in queries.
+"""
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from trivial.db import pool_stats
+from trivial.log import log_event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels) -> str:
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels)
+
+
+class Metric:
+    """
+    A named family of samples, one per combination of label values.
+
+    Args:
+        name (str): Metric name.
+        documentation (str): HELP text.
+        labelnames (tuple): Label names every sample carries.
+    """
+    type = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key, **extra):
+        # Read at scrape time: workers forked from a preloaded master
+        # import this module before they get their own pid.
+        return [('pid', os.getpid()), *zip(self.labelnames, key), *extra.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        yield f'{self.name}{{{_format_labels(self._labels(key))}}} {value}'
+
+
+class Counter(Metric):
+    """
+    A value that only goes up.
+    """
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A value that goes up and down.
+    """
+    type = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    """
+    Counts observations into cumulative buckets, plus their sum and count.
+
+    Args:
+        buckets (tuple): Sorted upper bounds; +Inf is added.
+    """
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One slot per bucket, one for +Inf, then the sum.
+                counts = self._values[key] = [0] * (len(self.buckets) + 2)
+            counts[index] += 1
+            counts[-1] += value
+
+    def _render_sample(self, key, counts):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, '+Inf'), counts[:-1]):
+            cumulative += count
+            yield f'{self.name}_bucket{{{_format_labels(self._labels(key, le=bound))}}} {cumulative}'
+        yield f'{self.name}_sum{{{_format_labels(self._labels(key))}}} {counts[-1]}'
+        yield f'{self.name}_count{{{_format_labels(self._labels(key))}}} {cumulative}'
+
+
+class Registry:
+    """
+    All metrics of the process, plus collectors called at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def add_collector(self, collector):
+        """
+        Add a callable returning extra exposition lines on every scrape.
+        """
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception:
+                logger.exception("Metrics collector %r failed", collector)
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+http_request_duration = Histogram(
+    'trivial_http_request_duration_seconds', 'HTTP request latency.',
+    ('method', 'route', 'status'),
+)
+http_db_queries = Histogram(
+    'trivial_http_db_queries', 'Database queries per HTTP request.',
+    ('method', 'route'), buckets=QUERY_COUNT_BUCKETS,
+)
+http_db_duration = Histogram(
+    'trivial_http_db_duration_seconds', 'Time spent in database queries per HTTP request.',
+    ('method', 'route'),
+)
+http_serializer_duration = Histogram(
+    'trivial_http_serializer_duration_seconds', 'Time spent serializing per HTTP request.',
+    ('method', 'route'),
+)
+ws_event_duration = Histogram(
+    'trivial_ws_event_duration_seconds', 'Time spent handling a consumer event.',
+    ('consumer', 'event'),
+)
+ws_db_queries = Histogram(
+    'trivial_ws_db_queries', 'Database queries per consumer event.',
+    ('consumer', 'event'), buckets=QUERY_COUNT_BUCKETS,
+)
+ws_open_connections = Gauge(
+    'trivial_ws_open_connections', 'Open WebSocket connections.',
+    ('consumer',),
+)
+
+
+def collect_db_pool():
+    """
+    Export the connection pool statistics from trivial.db as gauges.
+    """
+    stats = pool_stats()
+    for name, value in stats.items():
+        if name == 'mode':
+            continue
+        metric = f'trivial_db_pool_{name}'
+        yield f'# TYPE {metric} gauge'
+        yield f'{metric}{{pid="{os.getpid()}"}} {value}'
+
+
+registry.add_collector(collect_db_pool)
+
+
+class RequestStats:
+    """
+    Database and serializer work done for one request or consumer event.
+    """
+    __slots__ = ('queries', 'db_seconds', 'serializer_seconds', 'serializing')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializing = False
+
+
+# Context variables follow the request into sync_to_async threads, so the
+# queries of sync views under ASGI are counted too.
+current_stats = ContextVar('trivial_request_stats', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding every query to the current stats.
+    """
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def install_query_counter(connection, **kwargs):
+    if count_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(count_queries)
+
+
+# Connections are per thread; new ones get the wrapper when they connect.
+connection_created.connect(install_query_counter, dispatch_uid='trivial.metrics.count_queries')
+
+
+def install_query_counters():
+    """
+    Add the wrapper to the connections this thread already has.
+    """
+    for connection in connections.all():
+        install_query_counter(connection)
+
+
+class TimedSerializerMixin:
+    """
+    Serializer mixin adding the time spent in to_representation to the
+    current request's stats. Nested serializers are counted once, as part
+    of their parent.
+    """
+
+    def to_representation(self, instance):
+        stats = current_stats.get()
+        if stats is None or stats.serializing:
+            return super().to_representation(instance)
+
+        stats.serializing = True
+        started = time.perf_counter()
+        try:
+            return super().to_representation(instance)
+        finally:
+            stats.serializer_seconds += time.perf_counter() - started
+            stats.serializing = False
+
+
+class MetricsMiddleware:
+    """
+    Record latency, database and serializer time for every HTTP request.
+
+    Requests are labelled by their URL pattern (e.g.
+    'api/v1/tasks/<int:task_id>/'), so the number of series stays bounded.
+    A sample of requests is also logged as an 'http.request' event.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        install_query_counters()
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        token = current_stats.set(RequestStats())
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            stats = current_stats.get()
+            current_stats.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    async def __acall__(self, request):
+        token = current_stats.set(RequestStats())
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stats = current_stats.get()
+            current_stats.reset(token)
+        self.record(request, response, time.perf_counter() - started, stats)
+        return response
+
+    def record(self, request, response, duration, stats):
+        match = getattr(request, 'resolver_match', None)
+        route = match.route if match is not None else 'unmatched'
+        method = request.method
+
+        http_request_duration.observe(duration, method=method, route=route, status=response.status_code)
+        http_db_queries.observe(stats.queries, method=method, route=route)
+        http_db_duration.observe(stats.db_seconds, method=method, route=route)
+        http_serializer_duration.observe(stats.serializer_seconds, method=method, route=route)
+
+        log_event(
+            logger, 'http.request',
+            method=method,
+            route=route,
+            status=response.status_code,
+            ms=round(duration * 1000, 2),
+            queries=stats.queries,
+            db_ms=round(stats.db_seconds * 1000, 2),
+            serializer_ms=round(stats.serializer_seconds * 1000, 2),
+        )
+
+
+class InstrumentedConsumerMixin:
+    """
+    Consumer mixin recording the time and database queries of every event
+    it handles (websocket.connect, websocket.receive, group messages, ...)
+    and the number of open connections.
+
+    Put it before the consumer base class.
+    """
+
+    async def dispatch(self, message):
+        consumer = type(self).__name__
+        event = message['type']
+        if event == 'websocket.connect':
+            ws_open_connections.inc(consumer=consumer)
+        elif event == 'websocket.disconnect':
+            ws_open_connections.dec(consumer=consumer)
+
+        token = current_stats.set(RequestStats())
+        started = time.perf_counter()
+        try:
+            await super().dispatch(message)
+        finally:
+            stats = current_stats.get()
+            current_stats.reset(token)
+            ws_event_duration.observe(time.perf_counter() - started, consumer=consumer, event=event)
+            ws_db_queries.observe(stats.queries, consumer=consumer, event=event)
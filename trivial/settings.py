@@ -30,6 +30,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     
     'rest_framework',
     "drf_spectacular",
@@ -41,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its latency covers the other middleware too.
+    'trivial.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -87,6 +90,37 @@ DATABASES = {
     }
 }
 
+# DB_POOL_MODE picks how server processes hold PostgreSQL connections:
+#   off         a new connection per request (Django's default)
+#   persistent  one connection per thread, reused for DB_CONN_MAX_AGE
+#               seconds and checked before reuse
+#   pool        a psycopg connection pool per process, shared by all
+#               threads; stats at /internal/db-pool/ (see trivial/db.py)
+# With the pool, DB_POOL_MAX_SIZE x WEB_CONCURRENCY must stay below the
+# server's max_connections.
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "off")
+
+if DB_POOL_MODE == "persistent":
+    DATABASES["default"]["CONN_MAX_AGE"] = int(os.getenv("DB_CONN_MAX_AGE", 60))
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+elif DB_POOL_MODE == "pool":
+    from psycopg_pool import ConnectionPool
+
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            # Seconds a request waits for a free connection before failing.
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+            # Connections are recycled after this many seconds.
+            "max_lifetime": float(os.getenv("DB_POOL_MAX_LIFETIME", 1800)),
+            # Idle connections above min_size are closed after this long.
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", 300)),
+            # Make sure a connection is alive before handing it out.
+            "check": ConnectionPool.check_connection,
+        },
+    }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -130,7 +164,19 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 10
+    'PAGE_SIZE': 10,
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'apps.users.authentication.JWTCookieAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+        'rest_framework.authentication.BasicAuthentication',
+    ],
+}
+
+# Per-process cache of verified jwt tokens and user snapshots,
+# see apps/users/authentication.py
+AUTH_CACHE = {
+    'MAX_SIZE': int(os.getenv("AUTH_CACHE_MAX_SIZE", 10000)),
+    'TTL': int(os.getenv("AUTH_CACHE_TTL", 300)),
 }
 
 AUTH_USER_MODEL = 'users.User'
@@ -173,15 +219,127 @@ SESSION_COOKIE_SAMESITE = 'Lax'  # Still limits GET across sites
 CSRF_COOKIE_SAMESITE = 'Lax'
 
 
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+# "memory" keeps chat inside one process (development only).
+# "redis" fans out through Redis pub/sub, so several server processes can
+# share rooms. REDIS_URL may point at the stand-in in benchmarks/ for tests.
+CHANNEL_LAYER = os.getenv("CHANNEL_LAYER", "memory")
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+if CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+            "CONFIG": {
+                "hosts": [REDIS_URL],
+            },
+        }
     }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
+    }
+
+# CACHE_BACKEND=redis shares the cache (and so the task feed cache and its
+# invalidation) between server processes; locmem is per process.
+if os.getenv("CACHE_BACKEND", "locmem") == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("CACHE_REDIS_URL", REDIS_URL),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Response cache for the public task feed, see apps/tasks/cache.py
+TASK_FEED_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": int(os.getenv("TASK_FEED_CACHE_TIMEOUT", 60)),
+}
+
+# Serve the task feed, task detail and /me/tasks/ from the async views in
+# apps/tasks/async_views.py, so one worker overlaps many database queries.
+ASYNC_TASK_VIEWS = os.getenv("ASYNC_TASK_VIEWS", "false").lower() == "true"
+
+# Batched writer for chat messages, see chat/writer.py
+CHAT_MESSAGE_WRITER = {
+    "BATCH_SIZE": int(os.getenv("CHAT_WRITER_BATCH_SIZE", 100)),
+    "FLUSH_INTERVAL_MS": int(os.getenv("CHAT_WRITER_FLUSH_INTERVAL_MS", 50)),
+    "MAX_QUEUE": int(os.getenv("CHAT_WRITER_MAX_QUEUE", 10000)),
 }
 
-EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
-EMAIL_HOST = 'smtp.gmail.com'
-EMAIL_PORT = 587
-EMAIL_USE_TLS = True
-EMAIL_HOST_USER = 'trivialapp6@gmail.com'
-EMAIL_HOST_PASSWORD = 'uwyr yavi qsnq coup'
+# Per-process cache of chat rooms, see chat/rooms.py
+CHAT_ROOM_CACHE = {
+    "MAX_SIZE": int(os.getenv("CHAT_ROOM_CACHE_MAX_SIZE", 10000)),
+    "TTL": int(os.getenv("CHAT_ROOM_CACHE_TTL", 300)),
+}
+
+# Outgoing chat frames per socket, see chat/outbound.py
+CHAT_OUTBOUND = {
+    "WINDOW_MS": int(os.getenv("CHAT_OUTBOUND_WINDOW_MS", 20)),
+    "MAX_BATCH": int(os.getenv("CHAT_OUTBOUND_MAX_BATCH", 50)),
+    "MAX_PENDING": int(os.getenv("CHAT_OUTBOUND_MAX_PENDING", 500)),
+}
+
+# Who is online in which chat room, see chat/presence.py. The redis backend
+# shares the registry between server processes, like the channel layer.
+CHAT_PRESENCE = {
+    "BACKEND": os.getenv("CHAT_PRESENCE_BACKEND", CHANNEL_LAYER),
+    "REDIS_URL": REDIS_URL,
+    "TTL": int(os.getenv("CHAT_PRESENCE_TTL", 60)),
+    "HEARTBEAT_INTERVAL": int(os.getenv("CHAT_PRESENCE_HEARTBEAT_INTERVAL", 20)),
+    "NOTIFY_WINDOW_MS": int(os.getenv("CHAT_PRESENCE_NOTIFY_WINDOW_MS", 1000)),
+}
+
+# Point EMAIL_HOST at the mailhog service (port 1025, EMAIL_USE_TLS=false)
+# to catch outgoing mail locally.
+EMAIL_BACKEND = os.getenv("EMAIL_BACKEND", 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv("EMAIL_HOST", 'smtp.gmail.com')
+EMAIL_PORT = int(os.getenv("EMAIL_PORT", 587))
+EMAIL_USE_TLS = os.getenv("EMAIL_USE_TLS", "true").lower() == "true"
+EMAIL_HOST_USER = os.getenv("EMAIL_HOST_USER", 'trivialapp6@gmail.com')
+EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", 'uwyr yavi qsnq coup')
+EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", 10))
+DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", 'trivial6@gmail.com')
+
+# Email outbox delivered by the send_outbox command, see apps/users/outbox.py
+EMAIL_OUTBOX = {
+    "BATCH_SIZE": int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", 100)),
+    "MAX_ATTEMPTS": int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 5)),
+    "BACKOFF_SECONDS": int(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", 30)),
+    "MAX_BACKOFF_SECONDS": int(os.getenv("EMAIL_OUTBOX_MAX_BACKOFF_SECONDS", 3600)),
+    "CLAIM_SECONDS": int(os.getenv("EMAIL_OUTBOX_CLAIM_SECONDS", 300)),
+}
+
+# Request metrics in the Prometheus text format at /metrics, see
+# trivial/metrics.py. Only these client addresses may scrape them.
+METRICS_ALLOWED_IPS = [ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(",") if ip.strip()]
+
+# Share of hot-path events (such as 'http.request') that are logged, see
+# trivial/log.py. LOG_FORMAT=json writes one JSON object per line.
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", 0.01))
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "formatters": {
+        "text": {"format": "%(asctime)s %(levelname)s %(name)s %(message)s"},
+        "json": {"()": "trivial.log.JSONFormatter"},
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "formatter": os.getenv("LOG_FORMAT", "text"),
+        },
+    },
+    "loggers": {
+        name: {"handlers": ["console"], "level": os.getenv("LOG_LEVEL", "INFO"), "propagate": False}
+        for name in ("apps", "chat", "trivial")
+    },
+}
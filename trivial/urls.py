@@ -3,6 +3,8 @@ from django.contrib import admin
 from django.urls import path, include
 from drf_spectacular.views import SpectacularAPIView, SpectacularRedocView, SpectacularSwaggerView
 
+from trivial.views import DBPoolStatsView, MetricsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/v1/',include('apps.users.urls')),
@@ -10,5 +12,7 @@ urlpatterns = [
     path("", include("chat.urls")),
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     path("swagger/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
+    path("internal/db-pool/", DBPoolStatsView, name="db-pool-stats"),
+    path("metrics", MetricsView, name="metrics"),
     path("redoc/", SpectacularRedocView.as_view(url_name="schema"), name="redoc-ui"),
 ]
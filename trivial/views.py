@@ -0,0 +1,125 @@
+"""
+Project-wide views: the base class for DRF views with async handlers, the
+database pool statistics endpoint and the metrics endpoint.
+"""
+
+import inspect
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from rest_framework.views import APIView
+
+from apps.users.utils import get_user_from_cookie
+from trivial.db import pool_stats
+from trivial.metrics import registry
+
+
+def render_response(response) -> HttpResponse:
+    """
+    Render a DRF Response into a plain HttpResponse.
+
+    Django renders anything with a render() method in a worker thread when
+    it runs an async view; rendering here keeps the request on the event
+    loop from start to finish.
+    """
+    response.render()
+    rendered = HttpResponse(response.content, status=response.status_code)
+    for header, value in response.items():
+        rendered[header] = value
+    rendered.cookies = response.cookies
+    return rendered
+
+
+class AsyncAPIView(APIView):
+    """
+    APIView whose handlers are coroutines.
+
+    When every handler is async, Django runs the view directly on the event
+    loop instead of in a thread, so a worker can have many requests waiting
+    on the database at once. Handlers must use the async ORM.
+
+    DRF's authenticators are synchronous and may query the database, so
+    request.user is not resolved here; handlers authenticate themselves
+    (see aget_user_from_cookie). Permission and throttle classes must not
+    touch request.user either.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Before Django 5.0 csrf_exempt wraps the view in a sync function.
+        if not iscoroutinefunction(view):
+            markcoroutinefunction(view)
+        return view
+
+    def perform_authentication(self, request):
+        pass
+
+    async def dispatch(self, request, *args, **kwargs):
+        """
+        Async version of APIView.dispatch.
+        """
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            self.initial(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            response = handler(request, *args, **kwargs)
+            # OPTIONS is answered by DRF's synchronous handler.
+            if inspect.isawaitable(response):
+                response = await response
+
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return render_response(self.response)
+
+
+def DBPoolStatsView(request):
+    """
+    Return this process's database pool statistics as JSON.
+
+    Only staff users may read them. Every server process has its own pool,
+    so the numbers describe the worker that answered.
+
+    Args:
+        request: The HTTP request object.
+
+    Returns:
+        JsonResponse: See trivial.db.pool_stats, or 403 for other users.
+    """
+    user = get_user_from_cookie(request=request)
+
+    if not user or not user.is_staff:
+        return JsonResponse({"status": "Forbidden"}, status=403)
+
+    return JsonResponse(pool_stats())
+
+
+def MetricsView(request):
+    """
+    Return this process's metrics in the Prometheus text format.
+
+    Only clients in METRICS_ALLOWED_IPS may read them.
+
+    Args:
+        request: The HTTP request object.
+
+    Returns:
+        HttpResponse: The exposition text, or 403 for other clients.
+    """
+    if request.META.get('REMOTE_ADDR') not in settings.METRICS_ALLOWED_IPS:
+        return JsonResponse({"status": "Forbidden"}, status=403)
+
+    return HttpResponse(registry.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,24 @@
+"""
+Gunicorn worker class serving trivial.asgi with uvicorn.
+
+Used by docker/gunicorn.conf.py. Keep-alive, max requests and the backlog
+come from the gunicorn config; the uvicorn-only knobs are read from the
+environment here.
+"""
+
+import os
+
+from uvicorn_worker import UvicornWorker
+
+
+class TrivialUvicornWorker(UvicornWorker):
+    CONFIG_KWARGS = {
+        **UvicornWorker.CONFIG_KWARGS,
+        # trivial.asgi handles lifespan shutdown to flush the chat writer.
+        "lifespan": "on",
+        # Answer 503 instead of queueing once a worker holds this many
+        # connections or tasks; 0 means no limit.
+        "limit_concurrency": int(os.getenv("UVICORN_LIMIT_CONCURRENCY", 0)) or None,
+        "ws_ping_interval": float(os.getenv("UVICORN_WS_PING_INTERVAL", 20)),
+        "ws_ping_timeout": float(os.getenv("UVICORN_WS_PING_TIMEOUT", 20)),
+    }